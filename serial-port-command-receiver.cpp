@@ -1,13 +1,41 @@
 #include <VarSpeedServo.h>
 
 #define gripper_speed 30
-#define rotating_base_speed 30 
+#define rotating_base_speed 30
 #define arms_speed 15
 #define arm1_pin 3
 #define arm2_pin 4
 #define rotating_base_pin 5
 #define gripper_pin 2
 
+// Frame layout, see serial_link/protocol.py on the host:
+// SYNC VERSION TYPE SEQ LENGTH PAYLOAD[LENGTH] CRC16_HI CRC16_LO
+// CRC-16/CCITT-FALSE over VERSION up to the end of the payload
+#define frame_sync 0xA5
+#define frame_version 1
+#define frame_header_bytes 5
+#define frame_max_payload 16
+#define frame_pose 0x01
+#define frame_baud_request 0x02
+#define frame_ping 0x03
+#define frame_state_request 0x04
+#define frame_baud_ack 0x82
+#define frame_pong 0x83
+#define frame_state 0x84
+
+// State report payload (see serial_link/telemetry.py): the base, gripper, arm1 and arm2 angles the
+// servos are at, the flags and the sequence number of the last pose frame received. It goes out
+// every state_interval, when the servos stop, on request and right after each pose as its echo
+#define state_payload_bytes 6
+#define state_motion_complete 0x01
+#define state_echo 0x02
+#define state_interval 100
+
+// The host asks for a faster rate at 9600 (see serial_link/link.py). The board answers at the old
+// rate, switches and goes back to 9600 unless a valid frame arrives at the new rate in time
+#define default_baud 9600
+#define baud_confirm_timeout 1000
+
 VarSpeedServo gripper;
 VarSpeedServo rotating_base;
 VarSpeedServo arm1;
@@ -17,29 +45,220 @@ int gripper_angle = 0;
 int arm1_angle = 0;
 int arm2_angle = 0;
 
+// Bytes of the frame being received, frame[0] is always the sync byte
+uint8_t frame[frame_header_bytes + frame_max_payload + 2];
+uint8_t frame_length = 0;
+uint8_t last_seq = 0;
+unsigned long received_frames = 0;
+unsigned long crc_errors = 0;
+uint8_t tx_seq = 0;
+uint8_t last_pose_seq = 0;
+bool servos_moving = false;
+unsigned long last_state_time = 0;
+
+const unsigned long supported_bauds[] = {9600, 115200, 250000, 500000, 1000000};
+unsigned long current_baud = default_baud;
+unsigned long baud_switch_time = 0;
+bool baud_confirmed = true;
+
+uint16_t crc16(const uint8_t *data, uint8_t length) {
+  uint16_t crc = 0xFFFF;
+  for (uint8_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Drops the first byte of the buffer and keeps whatever follows from the next sync byte on,
+// so a frame that started inside a corrupted one is not lost
+void resync() {
+  uint8_t start = 1;
+  while (start < frame_length && frame[start] != frame_sync) {
+    start++;
+  }
+  for (uint8_t i = start; i < frame_length; i++) {
+    frame[i - start] = frame[i];
+  }
+  frame_length -= start;
+}
+
+// Number of bytes the frame in the buffer needs, 0 while the header is incomplete
+uint8_t expected_length() {
+  if (frame_length < frame_header_bytes) {
+    return 0;
+  }
+  return frame_header_bytes + frame[4] + 2;
+}
+
+// 1 when the buffer holds a complete valid frame, 0 while more bytes are needed, -1 on garbage
+int check_frame() {
+  if (frame_length >= 2 && frame[1] != frame_version) {
+    return -1;
+  }
+  if (frame_length >= frame_header_bytes && frame[4] > frame_max_payload) {
+    return -1;
+  }
+  uint8_t length = expected_length();
+  if (length == 0 || frame_length < length) {
+    return 0;
+  }
+  uint16_t crc = ((uint16_t)frame[length - 2] << 8) | frame[length - 1];
+  if (crc16(frame + 1, length - 3) != crc) {
+    crc_errors++;
+    return -1;
+  }
+  return 1;
+}
+
+void send_frame(uint8_t type, const uint8_t *payload, uint8_t length) {
+  uint8_t out[frame_header_bytes + frame_max_payload + 2];
+  out[0] = frame_sync;
+  out[1] = frame_version;
+  out[2] = type;
+  out[3] = tx_seq++;
+  out[4] = length;
+  for (uint8_t i = 0; i < length; i++) {
+    out[frame_header_bytes + i] = payload[i];
+  }
+  uint16_t crc = crc16(out + 1, frame_header_bytes - 1 + length);
+  out[frame_header_bytes + length] = crc >> 8;
+  out[frame_header_bytes + length + 1] = crc & 0xFF;
+  Serial.write(out, frame_header_bytes + length + 2);
+}
+
+bool is_moving() {
+  return rotating_base.isMoving() || gripper.isMoving() || arm1.isMoving() || arm2.isMoving();
+}
+
+void send_state(uint8_t flags) {
+  uint8_t state[state_payload_bytes];
+  state[0] = rotating_base.read();
+  state[1] = gripper.read();
+  state[2] = arm1.read();
+  state[3] = arm2.read();
+  state[4] = flags | (is_moving() ? 0 : state_motion_complete);
+  state[5] = last_pose_seq;
+  send_frame(frame_state, state, state_payload_bytes);
+  last_state_time = millis();
+}
+
+bool is_supported_baud(unsigned long baud) {
+  for (uint8_t i = 0; i < sizeof(supported_bauds) / sizeof(supported_bauds[0]); i++) {
+    if (supported_bauds[i] == baud) {
+      return true;
+    }
+  }
+  return false;
+}
+
+void switch_baud(unsigned long baud) {
+  // The acknowledgement still leaves at the old rate
+  Serial.flush();
+  Serial.end();
+  Serial.begin(baud);
+  current_baud = baud;
+}
+
+void handle_baud_request() {
+  unsigned long baud = ((unsigned long)frame[5] << 24) | ((unsigned long)frame[6] << 16) |
+                       ((unsigned long)frame[7] << 8) | frame[8];
+  uint8_t reply[4] = {0, 0, 0, 0};
+  if (is_supported_baud(baud)) {
+    for (uint8_t i = 0; i < 4; i++) {
+      reply[i] = frame[5 + i];
+    }
+  }
+  send_frame(frame_baud_ack, reply, 4);
+
+  if (is_supported_baud(baud) && baud != current_baud) {
+    switch_baud(baud);
+    baud_confirmed = baud == default_baud;
+    baud_switch_time = millis();
+  }
+}
+
+void handle_frame() {
+  last_seq = frame[3];
+  received_frames++;
+  // Any valid frame proves the host follows at this rate
+  baud_confirmed = true;
+
+  if (frame[2] == frame_baud_request && frame[4] == 4) {
+    handle_baud_request();
+  } else if (frame[2] == frame_ping) {
+    send_frame(frame_pong, frame + frame_header_bytes, frame[4]);
+  } else if (frame[2] == frame_state_request) {
+    send_state(0);
+  } else if (frame[2] == frame_pose && frame[4] == 4) {
+    last_pose_seq = frame[3];
+    rotating_base_angle = frame[5];
+    gripper_angle = frame[6];
+    arm1_angle = frame[7];
+    arm2_angle = frame[8];
+
+    rotating_base.slowmove(rotating_base_angle, rotating_base_speed);
+    gripper.slowmove(gripper_angle, gripper_speed);
+    arm1.slowmove(arm1_angle, arms_speed);
+    arm2.slowmove(arm2_angle, arms_speed);
+    servos_moving = servos_moving || is_moving();
+
+    // The echo times the round trip on the host, skipped rather than stalling when the link is busy
+    if (Serial.availableForWrite() >= frame_header_bytes + state_payload_bytes + 2) {
+      send_state(state_echo);
+    }
+  }
+}
+
 void setup() {
   rotating_base.attach(rotating_base_pin);
   gripper.attach(gripper_pin);
   arm1.attach(arm1_pin);
   arm2.attach(arm2_pin);
 
-  Serial.begin(9600);
+  Serial.begin(default_baud);
 }
 
 void loop() {
 
-  if(Serial.available() >= 4){
+  if (!baud_confirmed && millis() - baud_switch_time > baud_confirm_timeout) {
+    switch_baud(default_baud);
+    baud_confirmed = true;
+    frame_length = 0;
+  }
+
+  // Reports the arm as soon as the servos stop, and periodically in between
+  bool moving = is_moving();
+  if ((servos_moving && !moving) || millis() - last_state_time >= state_interval) {
+    send_state(0);
+  }
+  servos_moving = moving;
 
-    rotating_base_angle = Serial.read();
-    gripper_angle = Serial.read();
-    arm1_angle = Serial.read();
-    arm2_angle = Serial.read();
+  while (Serial.available() > 0) {
+    uint8_t byte_read = Serial.read();
 
-    rotating_base.slowmove(rotating_base_angle, rotating_base_speed);
-    gripper.slowmove(gripper_angle, gripper_speed);
-    arm1.slowmove(arm1_angle, arms_speed);
-    arm2.slowmove(arm2_angle, arms_speed);
-    
+    // Outside a frame everything but the sync byte is skipped
+    if (frame_length == 0 && byte_read != frame_sync) {
+      continue;
+    }
+    frame[frame_length++] = byte_read;
+
+    int state = check_frame();
+    while (state != 0) {
+      if (state == 1) {
+        uint8_t length = expected_length();
+        handle_frame();
+        frame_length -= length;
+        for (uint8_t i = 0; i < frame_length; i++) {
+          frame[i] = frame[i + length];
+        }
+      } else {
+        resync();
+      }
+      state = frame_length > 0 ? check_frame() : 0;
+    }
   }
 
 }
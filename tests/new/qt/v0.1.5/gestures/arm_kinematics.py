@@ -0,0 +1,143 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+from gestures import robotic_arm
+
+
+# setup.txt keys read by from_settings()
+ARM_SETTINGS = ('upper_arm_mm', 'forearm_mm', 'arm1_offset', 'arm1_direction', 'arm2_offset', 'arm2_direction',
+                'arm1_limits', 'arm2_limits', 'reach_mm', 'height_mm', 'hand_area_px', 'grid_mm')
+
+
+# Two-link arm seen from the side. The shoulder joint angle is the elevation of the upper arm above
+# the horizontal and the elbow joint angle is the inner angle between upper arm and forearm (180 =
+# straight). Servo angle = offset + direction * joint angle, lengths are in millimetres
+@dataclass(frozen=True)
+class ArmGeometry:
+    upper_arm: float = 135.0
+    forearm: float = 147.0
+    arm1_offset: float = 0.0
+    arm1_direction: int = 1
+    arm2_offset: float = 0.0
+    arm2_direction: int = 1
+    arm1_limits: Tuple[float, float] = (0.0, 180.0)
+    arm2_limits: Tuple[float, float] = (60.0, 180.0)
+
+
+# Part of the arm plane the hand is mapped to. The image row gives the height of the gripper above
+# the shoulder axis (top of the image = highest) and the apparent hand size gives the reach, a
+# bigger hand being closer to the camera. grid is the cell size of the precomputed solutions
+@dataclass(frozen=True)
+class Workspace:
+    reach: Tuple[float, float] = (80.0, 260.0)
+    height: Tuple[float, float] = (-60.0, 180.0)
+    hand_area: Tuple[float, float] = (8000.0, 60000.0)
+    grid: float = 2.0
+
+
+# Inverse kinematics solved once for every grid cell of the workspace. Targets out of reach are
+# pulled back along their direction to the nearest reachable distance and joint angles out of
+# the servo limits are clamped, such cells are flagged in reachable
+class ArmKinematics:
+
+    def __init__(self, geometry: ArmGeometry = ArmGeometry(), workspace: Workspace = Workspace()):
+        self.geometry = geometry
+        self.workspace = workspace
+
+        reaches = np.arange(workspace.reach[0], workspace.reach[1] + workspace.grid / 2, workspace.grid)
+        heights = np.arange(workspace.height[0], workspace.height[1] + workspace.grid / 2, workspace.grid)
+        angles, self.reachable = solve(geometry, *np.meshgrid(reaches, heights, indexing='ij'))
+
+        # (reach, height, 2) uint8 arm1 and arm2 servo angles
+        self.solutions = np.rint(angles).astype(np.uint8)
+        self.solution_list = self.solutions.tolist()
+        self.last_reach = len(reaches) - 1
+        self.last_height = len(heights) - 1
+
+        # Image to workspace scaling, precomputed for the per-frame lookup
+        calibration = robotic_arm.angle_mapper.calibration
+        self.y_min = calibration.y_min
+        self.height_per_row = (workspace.height[0] - workspace.height[1]) / (calibration.y_max - calibration.y_min)
+        self.side_min = math.sqrt(workspace.hand_area[0])
+        self.reach_per_side = ((workspace.reach[1] - workspace.reach[0]) /
+                               (math.sqrt(workspace.hand_area[1]) - self.side_min))
+
+    def target(self, m_coord_y: float, area: float) -> Tuple[float, float]:
+        # Reach and height in millimetres for a hand centroid row and box area
+        height = self.workspace.height[1] + (m_coord_y - self.y_min) * self.height_per_row
+        reach = self.workspace.reach[0] + (math.sqrt(max(area, 0.0)) - self.side_min) * self.reach_per_side
+        return reach, height
+
+    def cell(self, m_coord_y: float, area: float) -> Tuple[int, int]:
+        reach, height = self.target(m_coord_y, area)
+        i = round((reach - self.workspace.reach[0]) / self.workspace.grid)
+        j = round((height - self.workspace.height[0]) / self.workspace.grid)
+        return min(max(i, 0), self.last_reach), min(max(j, 0), self.last_height)
+
+    def arm_angles(self, m_coord_y: float, area: float) -> Tuple[int, int]:
+        i, j = self.cell(m_coord_y, area)
+        arm1_angle, arm2_angle = self.solution_list[i][j]
+        return arm1_angle, arm2_angle
+
+    def angles(self, m_coord_x: float, m_coord_y: float, area: float) -> Tuple[int, int, int]:
+        arm1_angle, arm2_angle = self.arm_angles(m_coord_y, area)
+        return robotic_arm.angle_mapper.base_angle(m_coord_x), arm1_angle, arm2_angle
+
+    def is_reachable(self, m_coord_y: float, area: float) -> bool:
+        return bool(self.reachable[self.cell(m_coord_y, area)])
+
+    def forward(self, arm1_angle: float, arm2_angle: float) -> Tuple[float, float]:
+        # Reach and height of the gripper for two servo angles
+        g = self.geometry
+        shoulder = math.radians((arm1_angle - g.arm1_offset) / g.arm1_direction)
+        elbow = math.radians((arm2_angle - g.arm2_offset) / g.arm2_direction)
+        forearm_angle = shoulder - (math.pi - elbow)
+        return (g.upper_arm * math.cos(shoulder) + g.forearm * math.cos(forearm_angle),
+                g.upper_arm * math.sin(shoulder) + g.forearm * math.sin(forearm_angle))
+
+
+def solve(geometry: ArmGeometry, reach: np.ndarray, height: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Elbow-up solution for arrays of targets -> (..., 2) servo angles and the reachable mask
+    l1, l2 = geometry.upper_arm, geometry.forearm
+    distance = np.hypot(reach, height)
+    min_distance, max_distance = abs(l1 - l2) + 1e-6, l1 + l2 - 1e-6
+    in_reach = (distance >= min_distance) & (distance <= max_distance)
+    clamped = np.clip(distance, min_distance, max_distance)
+
+    elbow = np.arccos(np.clip((l1 ** 2 + l2 ** 2 - clamped ** 2) / (2 * l1 * l2), -1.0, 1.0))
+    shoulder = (np.arctan2(height, reach) +
+                np.arccos(np.clip((l1 ** 2 + clamped ** 2 - l2 ** 2) / (2 * l1 * clamped), -1.0, 1.0)))
+
+    arm1 = geometry.arm1_offset + geometry.arm1_direction * np.degrees(shoulder)
+    arm2 = geometry.arm2_offset + geometry.arm2_direction * np.degrees(elbow)
+    within_limits = ((arm1 >= geometry.arm1_limits[0]) & (arm1 <= geometry.arm1_limits[1]) &
+                     (arm2 >= geometry.arm2_limits[0]) & (arm2 <= geometry.arm2_limits[1]))
+    angles = np.stack([np.clip(arm1, *geometry.arm1_limits), np.clip(arm2, *geometry.arm2_limits)], axis=-1)
+    return angles, in_reach & within_limits
+
+
+def parse_range(text: str) -> Tuple[float, float]:
+    # "80,260" -> (80.0, 260.0)
+    low, high = text.replace(' ', '').split(',')
+    return float(low), float(high)
+
+
+def from_settings(settings: Dict[str, str]) -> ArmKinematics:
+    # Keys of setup.txt, every one of them optional
+    geometry, workspace = ArmGeometry(), Workspace()
+    geometry = ArmGeometry(float(settings.get('upper_arm_mm', geometry.upper_arm)),
+                           float(settings.get('forearm_mm', geometry.forearm)),
+                           float(settings.get('arm1_offset', geometry.arm1_offset)),
+                           int(settings.get('arm1_direction', geometry.arm1_direction)),
+                           float(settings.get('arm2_offset', geometry.arm2_offset)),
+                           int(settings.get('arm2_direction', geometry.arm2_direction)),
+                           parse_range(settings['arm1_limits']) if 'arm1_limits' in settings else geometry.arm1_limits,
+                           parse_range(settings['arm2_limits']) if 'arm2_limits' in settings else geometry.arm2_limits)
+    workspace = Workspace(parse_range(settings['reach_mm']) if 'reach_mm' in settings else workspace.reach,
+                          parse_range(settings['height_mm']) if 'height_mm' in settings else workspace.height,
+                          parse_range(settings['hand_area_px']) if 'hand_area_px' in settings else workspace.hand_area,
+                          float(settings.get('grid_mm', workspace.grid)))
+    return ArmKinematics(geometry, workspace)
@@ -0,0 +1,118 @@
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from serial_link import protocol
+
+# setup.txt keys read by from_settings()
+ARM_OUTPUT_SETTINGS = ('arm_tolerance', 'arm_max_rate')
+
+# Start bit, 8 data bits and a stop bit on the wire for every byte
+BITS_PER_BYTE = 10
+POSE_FRAME_BYTES = protocol.frame_bytes(4)
+
+
+def link_packet_rate(baudrate: int, packet_bytes: int = POSE_FRAME_BYTES) -> float:
+    # Pose frames per second the serial link can carry, 87 at 9600 baud and 1047 at 115200
+    return baudrate / (BITS_PER_BYTE * packet_bytes)
+
+
+# Sends the base, gripper, arm1, arm2 pose to the Arduino only when it changes. A pose within
+# tolerance degrees of the last sent one on every joint is suppressed, and poses arriving faster than
+# max_rate are merged so only the newest one goes out once the link is free again (poll() sends it).
+# The poses go to a serial_link.writer.SerialWriter, or anything else with submit(pose)
+class ArmOutput:
+
+    def __init__(self, writer: Any, tolerance: Union[int, Tuple[int, int, int, int]] = 1, max_rate: float = 0.0,
+                 baudrate: int = 9600):
+        self.writer = writer
+        self.tolerance = (tolerance,) * 4 if isinstance(tolerance, int) else tuple(tolerance)
+        self.requested_rate = max_rate
+        self.set_baudrate(baudrate)
+        self.last_pose = None
+        self.last_send_time = -self.min_interval
+        self.pending = None
+
+        # Counters
+        self.sent = 0
+        self.suppressed = 0
+        self.merged = 0
+        self.failed = 0
+
+    def set_baudrate(self, baudrate: int):
+        # The writer negotiates the rate after start, the limit follows the link it ends up with
+        self.baudrate = baudrate
+        link_rate = link_packet_rate(baudrate)
+        self.max_rate = min(self.requested_rate, link_rate) if self.requested_rate > 0 else link_rate
+        self.min_interval = 1.0 / self.max_rate
+
+    def changed(self, pose: Tuple[int, int, int, int]) -> bool:
+        if self.last_pose is None:
+            return True
+        return any(abs(new - old) > tolerance for new, old, tolerance in zip(pose, self.last_pose, self.tolerance))
+
+    def submit(self, pose: Tuple[int, int, int, int], now: Optional[float] = None) -> bool:
+        # True when the pose was written right away
+        now = time.perf_counter() if now is None else now
+        if not self.changed(pose):
+            # Back within tolerance of what the arm already has, a waiting pose is obsolete too
+            self.suppressed += 1
+            if self.pending is not None:
+                self.pending = None
+                self.merged += 1
+            return False
+
+        if now - self.last_send_time < self.min_interval:
+            if self.pending is not None:
+                self.merged += 1
+            self.pending = pose
+            return False
+
+        if self.pending is not None:
+            self.merged += 1
+            self.pending = None
+        return self.write(pose, now)
+
+    def poll(self, now: Optional[float] = None) -> bool:
+        # Sends the merged pose once the rate limit allows it, to be called on every frame
+        if self.pending is None:
+            return False
+        now = time.perf_counter() if now is None else now
+        if now - self.last_send_time < self.min_interval:
+            return False
+        pose, self.pending = self.pending, None
+        return self.write(pose, now)
+
+    def write(self, pose: Tuple[int, int, int, int], now: float) -> bool:
+        self.last_send_time = now
+        if self.writer is None or not self.writer.submit(pose):
+            self.failed += 1
+            return False
+        self.last_pose = tuple(pose)
+        self.sent += 1
+        return True
+
+    def reset(self):
+        # The arm state is unknown again, e.g. after switching to another writer
+        self.last_pose = None
+        self.pending = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'merged': self.merged,
+            'failed': self.failed,
+            'max_rate': round(self.max_rate, 1),
+            'baudrate': self.baudrate,
+        }
+
+
+def from_settings(writer: Any, settings: Dict[str, str], baudrate: int = 9600) -> ArmOutput:
+    # arm_tolerance is one value for every joint or four comma separated ones, arm_max_rate 0 = link capacity
+    tolerance = [int(value) for value in settings.get('arm_tolerance', '1').split(',')]
+    return ArmOutput(writer, tolerance[0] if len(tolerance) == 1 else tuple(tolerance),
+                     float(settings.get('arm_max_rate', 0)), baudrate)
+
+
+def describe(stats: Dict[str, Any]) -> str:
+    return f"{stats['sent']} sent, {stats['suppressed']} suppressed, {stats['merged']} merged"
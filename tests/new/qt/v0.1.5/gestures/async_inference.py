@@ -0,0 +1,98 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from runtime.thread_config import pin_current_thread
+
+
+# One processed frame, handed to the consumer in the order the frames were captured
+@dataclass
+class InferenceResult:
+    frame_index: int
+    frame: np.ndarray
+    frame_time: float
+    gesture: Any
+
+
+# Runs the gesture pipeline in its own thread, fed straight from the frame grabber. Up to depth frames
+# are in flight at once (in the model, waiting, or being drawn by the consumer), so with depth 2 the
+# next frame is already inside the model while the previous one is annotated and sent to the GUI.
+# A single worker keeps the pipeline state sequential and the results strictly in order. An exception
+# in the pipeline stops the worker and is raised by next_result() after the results before it.
+class AsyncInference(threading.Thread):
+
+    def __init__(self, pipeline: Any, grabber: Any, depth: int = 2, cores: Tuple[int, ...] = (),
+                 name: str = 'async-inference'):
+        super().__init__(name=name, daemon=True)
+        self.pipeline = pipeline
+        self.grabber = grabber
+        self.depth = max(1, depth)
+        self.cores = cores
+        self.slots = threading.Semaphore(self.depth)
+        self.lock = threading.Lock()
+        self.frames_in_flight = 0
+        self.results = queue.Queue()
+        self.running = True
+        self.source_finished = False
+        self.error = None
+
+        # Counters
+        self.processed_frames = 0
+
+    def run(self):
+        pin_current_thread(self.cores)
+        try:
+            while self.running:
+                # Waits until the consumer is done with one of the frames in flight
+                if not self.slots.acquire(timeout=0.5):
+                    continue
+                with self.lock:
+                    self.frames_in_flight += 1
+
+                frame, frame_time, frame_index = self.grabber.latest(timeout=0.5)
+                if frame is None:
+                    self.release()
+                    if self.grabber.exhausted():
+                        break
+                    continue
+
+                gesture = self.pipeline.process(frame, frame_time)
+                self.processed_frames += 1
+                self.results.put(InferenceResult(frame_index, frame, frame_time, gesture))
+        except Exception as e:
+            # Handed to the consumer behind the frames already processed
+            self.error = e
+            self.results.put(e)
+        finally:
+            self.source_finished = True
+
+    def next_result(self, timeout: float = 0.5) -> Optional[InferenceResult]:
+        # Raises the pipeline's exception when the worker stopped on one
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def release(self):
+        # The consumer finished the oldest frame, the worker may take a new one
+        with self.lock:
+            self.frames_in_flight -= 1
+        self.slots.release()
+
+    def finished(self) -> bool:
+        # True once the worker stopped and every result was handed over
+        return self.source_finished and self.results.empty()
+
+    def in_flight(self) -> int:
+        return self.frames_in_flight
+
+    def stop(self):
+        self.running = False
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2.0)
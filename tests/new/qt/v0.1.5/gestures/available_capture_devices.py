@@ -1,10 +1,173 @@
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
 import cv2
 
-def capture_devices():
-    found_devices = []
-    for i in range(10):
-        cap = cv2.VideoCapture(i)
-        if cap.read()[0]:
-            found_devices.append(i)
+MAX_DEVICES = 10
+PROBE_TIMEOUT = 3.0
+CACHE_FILE = 'capture_devices.txt'
+# Video capture interfaces (KSCATEGORY_VIDEO) Windows registers for every camera it has seen, the
+# connected ones have Linked=1 under #\Control
+WINDOWS_VIDEO_INTERFACES = r'SYSTEM\CurrentControlSet\Control\DeviceClasses\{65e8773d-8f56-11d0-a3b9-00a0c9119c65}'
+
+# Probe threads by index, a driver that hangs keeps its thread and the index is not probed again
+# until it returns
+probe_threads: Dict[int, threading.Thread] = {}
+probe_lock = threading.Lock()
+
+
+def candidate_indices() -> List[int]:
+    # On Linux only indexes with a /dev/videoN node can exist, elsewhere every index is tried
+    if sys.platform.startswith('linux'):
+        indices = []
+        for path in glob.glob('/dev/video*'):
+            suffix = path[len('/dev/video'):]
+            if suffix.isdigit() and int(suffix) < MAX_DEVICES:
+                indices.append(int(suffix))
+        return sorted(indices)
+    return list(range(MAX_DEVICES))
+
+
+def windows_video_interfaces() -> Optional[List[str]]:
+    # Connected camera interfaces from the registry, a few key reads instead of opening every index
+    try:
+        import winreg
+    except ImportError:
+        return None
+    interfaces = []
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, WINDOWS_VIDEO_INTERFACES) as classes:
+            for i in range(winreg.QueryInfoKey(classes)[0]):
+                name = winreg.EnumKey(classes, i)
+                try:
+                    with winreg.OpenKey(classes, name + r'\#\Control') as control:
+                        if winreg.QueryValueEx(control, 'Linked')[0]:
+                            interfaces.append(name)
+                except OSError:
+                    pass
+    except OSError:
+        return None
+    return sorted(interfaces)
+
+
+def device_signature() -> Optional[str]:
+    # Changes whenever a camera is plugged or unplugged, None where it cannot be told (no cache then)
+    if sys.platform.startswith('linux'):
+        nodes = []
+        for path in sorted(glob.glob('/dev/video*')):
+            try:
+                nodes.append(f'{path}:{int(os.stat(path).st_ctime)}')
+            except OSError:
+                pass
+        return ';'.join(nodes)
+    if sys.platform == 'win32':
+        interfaces = windows_video_interfaces()
+        return None if interfaces is None else ';'.join(interfaces)
+    return None
+
+
+def probe_device(index: int) -> bool:
+    cap = cv2.VideoCapture(index)
+    try:
+        return cap.read()[0]
+    finally:
         cap.release()
+
+
+def read_cache() -> Optional[List[int]]:
+    # Devices found last time, or None when there is no cache or the cameras changed since. Without a
+    # signature a plugged or unplugged camera would go unnoticed, so the cache is not used at all
+    current_signature = device_signature()
+    if current_signature is None or not os.path.exists(CACHE_FILE):
+        return None
+    try:
+        signature = None
+        devices = None
+        with open(CACHE_FILE, 'r') as cache_file:
+            for line in cache_file.readlines():
+                line = line.strip()
+                if line.startswith('signature='):
+                    signature = line.split('=', 1)[1]
+                elif line.startswith('devices='):
+                    value = line.split('=', 1)[1]
+                    devices = [int(i) for i in value.split(',') if i.isdigit()]
+        if devices is None or signature != current_signature:
+            return None
+        return devices
+    except Exception as e:
+        print("Error while reading capture devices cache:", e)
+        return None
+
+
+def write_cache(devices: List[int]):
+    signature = device_signature()
+    if signature is None:
+        return
+    try:
+        with open(CACHE_FILE, 'w') as cache_file:
+            cache_file.write(f'signature={signature}\n')
+            cache_file.write(f'devices={",".join(str(i) for i in devices)}')
+    except Exception as e:
+        print("Error while updating capture devices cache:", e)
+
+
+def discover_devices(on_found: Optional[Callable[[int], None]] = None, timeout: float = PROBE_TIMEOUT,
+                     known: Optional[List[int]] = None) -> List[int]:
+    # Probes every candidate at the same time. Each probe runs in a daemon thread, so a camera
+    # driver that hangs is given up after the timeout instead of blocking the others. An index whose
+    # probe did not answer keeps the state it had in known, the devices found last time
+    indices = candidate_indices()
+    answers = queue.Queue()
+
+    def probe(index: int):
+        try:
+            answers.put((index, probe_device(index)))
+        except Exception:
+            answers.put((index, False))
+
+    pending = set()
+    with probe_lock:
+        for index in indices:
+            previous = probe_threads.get(index)
+            if previous is not None and previous.is_alive():
+                # Still stuck in the driver since an earlier search
+                continue
+            thread = threading.Thread(target=probe, args=(index,), name=f'probe-camera-{index}', daemon=True)
+            probe_threads[index] = thread
+            pending.add(index)
+            thread.start()
+
+    found_devices = []
+    answered = set()
+    deadline = time.monotonic() + timeout
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            index, found = answers.get(timeout=remaining)
+        except queue.Empty:
+            break
+        pending.discard(index)
+        answered.add(index)
+        if found:
+            found_devices.append(index)
+            if on_found is not None:
+                on_found(index)
+
+    found_devices.extend(index for index in known or [] if index in indices and index not in answered)
+    found_devices.sort()
+    write_cache(found_devices)
     return found_devices
+
+
+def capture_devices() -> List[int]:
+    cached = read_cache()
+    if cached is not None:
+        return cached
+    return discover_devices()
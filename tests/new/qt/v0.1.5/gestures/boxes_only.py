@@ -0,0 +1,84 @@
+from typing import Any, Tuple
+
+import ultralytics
+from ultralytics.engine.results import Results
+from ultralytics.models.yolo.segment import SegmentationPredictor
+from ultralytics.utils import ops
+
+# Ultralytics releases (from, up to but not including) whose predictor internals this relies on:
+# preds[0] holding the detections, self.batch[0] the paths, ops.convert_torch2numpy_batch and a
+# predictor assigned to model.predictor being reused. Also pinned in requirements.txt
+SUPPORTED_VERSIONS = ((8, 3, 0), (8, 4, 0))
+REQUIRED_OPS = ('non_max_suppression', 'scale_boxes', 'convert_torch2numpy_batch')
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    parts = []
+    for part in version.split('.')[:3]:
+        digits = ''.join(c for c in part if c.isdigit())
+        parts.append(int(digits) if digits else 0)
+    return tuple(parts)
+
+
+def unsupported_reason() -> str:
+    # Empty when the installed ultralytics has everything the predictor below uses
+    version = parse_version(ultralytics.__version__)
+    if not SUPPORTED_VERSIONS[0] <= version < SUPPORTED_VERSIONS[1]:
+        return f'ultralytics {ultralytics.__version__} is not in the supported range'
+    missing = [name for name in REQUIRED_OPS if not hasattr(ops, name)]
+    if missing:
+        return f'ultralytics.utils.ops has no {", ".join(missing)}'
+    if not hasattr(SegmentationPredictor, 'setup_model'):
+        return 'SegmentationPredictor has no setup_model'
+    return ''
+
+
+# Segmentation predictor that stops after NMS: the mask coefficients are dropped, so the prototype
+# masks are never combined, cropped or upsampled and results[0].masks is None
+class BoxesOnlyPredictor(SegmentationPredictor):
+
+    fallback = False
+
+    def postprocess(self, preds, img, orig_imgs, **kwargs):
+        if not self.fallback:
+            try:
+                return self.boxes_only(preds, img, orig_imgs)
+            except (AttributeError, IndexError, TypeError) as e:
+                # The internals moved, the standard post-processing still gives correct results
+                print("Warning: boxes-only output is not available with this ultralytics version, "
+                      "masks are computed:", e)
+                self.fallback = True
+        return super().postprocess(preds, img, orig_imgs, **kwargs)
+
+    def boxes_only(self, preds, img, orig_imgs):
+        detections = ops.non_max_suppression(preds[0] if isinstance(preds, (list, tuple)) else preds,
+                                             self.args.conf, self.args.iou, agnostic=self.args.agnostic_nms,
+                                             max_det=self.args.max_det, nc=len(self.model.names),
+                                             classes=self.args.classes)
+
+        if not isinstance(orig_imgs, list):
+            orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
+
+        results = []
+        for detection, orig_img, img_path in zip(detections, orig_imgs, self.batch[0]):
+            detection[:, :4] = ops.scale_boxes(img.shape[2:], detection[:, :4], orig_img.shape)
+            results.append(Results(orig_img, path=img_path, names=self.model.names, boxes=detection[:, :6]))
+        return results
+
+
+def use_boxes_only(model: Any) -> Any:
+    # Installs the predictor on a YOLO model, later model(...) calls reuse it and only update its arguments.
+    # Where the installed ultralytics does not fit, the model keeps its standard predictor
+    reason = unsupported_reason()
+    if reason:
+        print("Warning: boxes-only output is not available, masks are computed:", reason)
+        return model
+    try:
+        predictor = BoxesOnlyPredictor(overrides={**model.overrides, 'mode': 'predict', 'save': False, 'batch': 1},
+                                       _callbacks=model.callbacks)
+        predictor.setup_model(model=model.model, verbose=False)
+    except Exception as e:
+        print("Warning: boxes-only output is not available, masks are computed:", e)
+        return model
+    model.predictor = predictor
+    return model
@@ -0,0 +1,119 @@
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+
+# Profiles offered in the setup window, "default" leaves every property to the driver
+PROFILES = [
+    'default',
+    '640x480@30 MJPG buf1',
+    '320x240@30 MJPG buf1',
+    '1280x720@30 MJPG buf1',
+    '640x480@30 YUYV buf1',
+    '640x480@60 MJPG buf1',
+]
+
+
+# Camera properties requested when the capture device is opened, 0 or '' means "driver default"
+@dataclass
+class CaptureProfile:
+    width: int = 0
+    height: int = 0
+    fps: int = 0
+    fourcc: str = ''
+    buffer_size: int = 0
+
+    def __str__(self) -> str:
+        parts = []
+        if self.width and self.height:
+            parts.append(f'{self.width}x{self.height}' + (f'@{self.fps}' if self.fps else ''))
+        elif self.fps:
+            parts.append(f'@{self.fps}')
+        if self.fourcc:
+            parts.append(self.fourcc)
+        if self.buffer_size:
+            parts.append(f'buf{self.buffer_size}')
+        return ' '.join(parts) or 'default'
+
+
+def parse_profile(text: str) -> CaptureProfile:
+    # "640x480@30 MJPG buf1", every part is optional, "default" is the empty profile
+    profile = CaptureProfile()
+    for part in text.strip().split():
+        if part == 'default':
+            continue
+        if part.startswith('buf') and part[3:].isdigit():
+            profile.buffer_size = int(part[3:])
+        elif 'x' in part or part.startswith('@'):
+            size, _, fps = part.partition('@')
+            if size:
+                width, height = size.split('x')
+                profile.width, profile.height = int(width), int(height)
+            if fps:
+                profile.fps = int(float(fps))
+        elif len(part) == 4:
+            profile.fourcc = part.upper()
+        else:
+            raise ValueError(f'Invalid capture profile: {text}')
+    return profile
+
+
+def decode_fourcc(value: float) -> str:
+    value = int(value)
+    text = ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4))
+    return text if text.isprintable() and text.strip() else ''
+
+
+def apply_profile(capture: Any, profile: CaptureProfile) -> CaptureProfile:
+    # The pixel format goes first, some drivers only offer certain sizes for a given format
+    if profile.fourcc:
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile.fourcc))
+    if profile.width and profile.height:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, profile.width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, profile.height)
+    if profile.fps:
+        capture.set(cv2.CAP_PROP_FPS, profile.fps)
+    if profile.buffer_size:
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, profile.buffer_size)
+    return granted_profile(capture)
+
+
+def granted_profile(capture: Any) -> CaptureProfile:
+    # What the device actually gave us, which may differ from what was requested
+    return CaptureProfile(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                          int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                          int(round(capture.get(cv2.CAP_PROP_FPS))),
+                          decode_fourcc(capture.get(cv2.CAP_PROP_FOURCC)),
+                          max(0, int(capture.get(cv2.CAP_PROP_BUFFERSIZE))))
+
+
+def probe_profile(device: int, profile: CaptureProfile, frames: int = 90, warmup: int = 10) -> dict:
+    # Opens the device with the profile and measures how fast frames really arrive
+    capture = cv2.VideoCapture(device)
+    try:
+        granted = apply_profile(capture, profile)
+        for _ in range(warmup):
+            capture.read()
+
+        read_times = []
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            read_start_time = time.perf_counter()
+            read, _ = capture.read()
+            if read:
+                read_times.append(time.perf_counter() - read_start_time)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        capture.release()
+
+    read_times = np.asarray(read_times) * 1000
+    return {
+        'requested': str(profile),
+        'granted': str(granted),
+        'frames': len(read_times),
+        'fps': round(len(read_times) / elapsed, 1) if elapsed > 0 else 0.0,
+        'read_p50_ms': round(float(np.percentile(read_times, 50)), 2) if len(read_times) else None,
+        'read_p99_ms': round(float(np.percentile(read_times, 99)), 2) if len(read_times) else None,
+    }
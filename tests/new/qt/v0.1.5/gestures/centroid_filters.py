@@ -0,0 +1,158 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from gestures.hand_tracker import CentroidKalman
+
+
+FILTERS = ['none', 'ema', 'one-euro', 'kalman']
+
+# setup.txt keys read by from_settings(), filter_<parameter> for the parameters of the selected filter
+FILTER_SETTINGS = ('centroid_filter', 'filter_alpha', 'filter_min_cutoff', 'filter_beta', 'filter_d_cutoff',
+                   'filter_process_noise', 'filter_measurement_noise')
+
+
+# Exponential moving average, alpha = 1 passes the raw centroid through
+class EmaFilter:
+    name = 'ema'
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.y = None
+
+    def params(self) -> Dict[str, float]:
+        return {'alpha': self.alpha}
+
+    def set_params(self, alpha: Optional[float] = None):
+        if alpha is not None:
+            self.alpha = alpha
+
+    def filter(self, x: float, y: float, t: float) -> Tuple[float, float]:
+        if self.x is None:
+            self.x, self.y = x, y
+        else:
+            self.x += self.alpha * (x - self.x)
+            self.y += self.alpha * (y - self.y)
+        return self.x, self.y
+
+
+# One-Euro filter (Casiez et al.): a low cutoff frequency while the hand holds still removes the
+# jitter, the cutoff grows with the speed so fast moves are followed without lag. Timestamps in seconds
+class OneEuroFilter:
+    name = 'one-euro'
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.02, d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.y = None
+        self.dx = 0.0
+        self.dy = 0.0
+        self.t = None
+
+    def params(self) -> Dict[str, float]:
+        return {'min_cutoff': self.min_cutoff, 'beta': self.beta, 'd_cutoff': self.d_cutoff}
+
+    def set_params(self, min_cutoff: Optional[float] = None, beta: Optional[float] = None,
+                   d_cutoff: Optional[float] = None):
+        if min_cutoff is not None:
+            self.min_cutoff = min_cutoff
+        if beta is not None:
+            self.beta = beta
+        if d_cutoff is not None:
+            self.d_cutoff = d_cutoff
+
+    @staticmethod
+    def smoothing(cutoff: float, dt: float) -> float:
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def filter(self, x: float, y: float, t: float) -> Tuple[float, float]:
+        if self.x is None:
+            self.x, self.y, self.t = x, y, t
+            return x, y
+
+        dt = max(t - self.t, 1e-6)
+        self.t = t
+
+        # Smoothed speed, it sets the cutoff of the position filter
+        a_d = self.smoothing(self.d_cutoff, dt)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        self.dy += a_d * ((y - self.y) / dt - self.dy)
+        a = self.smoothing(self.min_cutoff + self.beta * math.hypot(self.dx, self.dy), dt)
+
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y
+
+
+# Constant velocity Kalman filter, one step per frame as in the hand tracker
+class KalmanFilter:
+    name = 'kalman'
+
+    def __init__(self, process_noise: float = 0.05, measurement_noise: float = 4.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.kalman = CentroidKalman(process_noise, measurement_noise)
+        self.initialized = False
+
+    def reset(self):
+        self.initialized = False
+
+    def params(self) -> Dict[str, float]:
+        return {'process_noise': self.process_noise, 'measurement_noise': self.measurement_noise}
+
+    def set_params(self, process_noise: Optional[float] = None, measurement_noise: Optional[float] = None):
+        if process_noise is not None:
+            self.process_noise = process_noise
+            self.kalman.filter.processNoiseCov = np.eye(4, dtype=np.float32) * process_noise
+        if measurement_noise is not None:
+            self.measurement_noise = measurement_noise
+            self.kalman.filter.measurementNoiseCov = np.eye(2, dtype=np.float32) * measurement_noise
+
+    def filter(self, x: float, y: float, t: float) -> Tuple[float, float]:
+        if not self.initialized:
+            self.kalman.reset(x, y)
+            self.initialized = True
+            return x, y
+        return self.kalman.update(x, y)
+
+
+FILTER_CLASSES = {'ema': EmaFilter, 'one-euro': OneEuroFilter, 'kalman': KalmanFilter}
+
+
+def filter_params(settings: Dict[str, str]) -> Dict[str, float]:
+    # filter_<parameter>=value keys -> parameters, the filter picks the ones it knows
+    return {key[len('filter_'):]: float(value) for key, value in settings.items()
+            if key.startswith('filter_') and key in FILTER_SETTINGS}
+
+
+def make_filter(name: str, params: Optional[Dict[str, float]] = None):
+    # None for 'none', the pipeline then uses the raw centroid
+    if name not in FILTER_CLASSES:
+        return None
+    centroid_filter = FILTER_CLASSES[name]()
+    centroid_filter.set_params(**{key: value for key, value in (params or {}).items()
+                                  if key in centroid_filter.params()})
+    return centroid_filter
+
+
+def from_settings(settings: Dict[str, str], current=None):
+    # Keeps the running filter and its state when only the parameters changed
+    name = settings.get('centroid_filter', 'none')
+    params = filter_params(settings)
+    if current is not None and current.name == name:
+        # A parameter no longer in the settings goes back to its default
+        defaults = FILTER_CLASSES[name]().params()
+        current.set_params(**{**defaults, **{key: value for key, value in params.items() if key in defaults}})
+        return current
+    return make_filter(name, params)
@@ -1,10 +1,59 @@
+from dataclasses import dataclass
+
+import numpy as np
+
 rect_top_left_x = 100
 rect_top_left_y = 90
 rect_bottom_right_x = 540
 rect_bottom_right_y = 390
 
+# Classes of the hand model: closed and open hand
+HAND_CLASSES = (0, 1)
+
+
+# Per-hand values of one frame, computed for all hands at once. Arrays are indexed like hands
+@dataclass
+class DetectionSummary:
+    hands: np.ndarray  # (N, 6) x1, y1, x2, y2, conf, cls of the open/closed hands
+    areas: np.ndarray
+    scores: np.ndarray
+    centroids: np.ndarray  # (N, 2) int
+    in_range: np.ndarray  # (N,) bool
+    best: int  # index of the hand with the highest score, -1 when there is none
+
+
+def calculate_areas(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def in_range_mask(m_coord_x, m_coord_y):
+    # Works on scalars and on arrays of centroids
+    return ((m_coord_x > rect_top_left_x) & (m_coord_x < rect_bottom_right_x) &
+            (m_coord_y > rect_top_left_y) & (m_coord_y < rect_bottom_right_y))
+
+
+def summarize_detections(detections: np.ndarray) -> DetectionSummary:
+    if not len(detections):
+        # Frames without a hand skip the array operations
+        return DetectionSummary(detections, detections[:, 0], detections[:, 0], np.zeros((0, 2), dtype=np.int32),
+                                np.zeros(0, dtype=bool), -1)
+    classes = detections[:, 5]
+    hands = detections[(classes == HAND_CLASSES[0]) | (classes == HAND_CLASSES[1])]
+    areas = calculate_areas(hands)
+    scores = calculate_score(areas, hands[:, 4])
+    # Truncated like int() so the centroid matches the scalar helpers
+    centroids = ((hands[:, 0:2] + hands[:, 2:4]) * 0.5).astype(np.int32)
+    in_range = in_range_mask(centroids[:, 0], centroids[:, 1])
+    best = -1
+    if len(hands):
+        best = int(scores.argmax())
+        if scores[best] <= 0:
+            best = -1
+    return DetectionSummary(hands, areas, scores, centroids, in_range, best)
+
+
 def calculate_area(rect: list[float]) -> float:
-    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+    return float(calculate_areas(np.asarray(rect, dtype=np.float64)[None, :4])[0])
 
 
 def calculate_score(area: float, conf: float) -> float:
@@ -42,7 +91,4 @@ def calculate_direction(pixel_threshold: int, curr_x: float, curr_y: float, prev
     return "Still"
 
 def is_in_range(m_coord_x: float, m_coord_y: float) -> bool:
-    if m_coord_x > rect_top_left_x and m_coord_x < rect_bottom_right_x and m_coord_y > rect_top_left_y and m_coord_y < rect_bottom_right_y:
-        return True
-    else:
-        return False
+    return bool(in_range_mask(m_coord_x, m_coord_y))
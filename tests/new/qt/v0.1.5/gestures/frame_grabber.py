@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from runtime.thread_config import pin_current_thread
+
+
+# Keeps reading a capture device in its own thread and only ever holds the newest frame,
+# so the consumer never works on frames that piled up in the driver buffer
+class FrameGrabber(threading.Thread):
+
+    def __init__(self, capture: Any, name: str = 'frame-grabber', cores: Tuple[int, ...] = ()):
+        super().__init__(name=name, daemon=True)
+        self.capture = capture
+        self.cores = cores
+        self.condition = threading.Condition()
+        self.running = True
+
+        # Latest frame slot
+        self.frame = None
+        self.frame_time = 0.0
+        self.frame_index = 0
+        self.consumed_index = 0
+
+        # Counters
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.failed_reads = 0
+
+    def run(self):
+        # Optionally kept off the cores the inference runs on
+        pin_current_thread(self.cores)
+        while self.running:
+            read, frame = self.capture.read()
+            frame_time = time.perf_counter()
+
+            if not read:
+                self.failed_reads += 1
+                if getattr(self.capture, 'finished', False):
+                    # End of a video file or image sequence
+                    with self.condition:
+                        self.running = False
+                        self.condition.notify_all()
+                    break
+                time.sleep(0.005)
+                continue
+
+            with self.condition:
+                # The previous frame was never picked up, it is overwritten
+                if self.frame_index > self.consumed_index:
+                    self.dropped_frames += 1
+                self.frame = frame
+                self.frame_time = frame_time
+                self.frame_index += 1
+                self.captured_frames += 1
+                self.condition.notify_all()
+
+    def latest(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float, int]:
+        # Waits for a frame newer than the last one returned and hands it over
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_index > self.consumed_index or not self.running, timeout)
+            if self.frame_index == self.consumed_index:
+                return None, 0.0, self.frame_index
+            self.consumed_index = self.frame_index
+            return self.frame, self.frame_time, self.frame_index
+
+    def exhausted(self) -> bool:
+        # True once the source ended and its last frame was handed over
+        with self.condition:
+            return not self.running and self.frame_index == self.consumed_index
+
+    def frame_age(self) -> float:
+        # Seconds since the newest frame in the slot was read
+        with self.condition:
+            if self.frame_index == 0:
+                return 0.0
+            return time.perf_counter() - self.frame_time
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                'captured_frames': self.captured_frames,
+                'dropped_frames': self.dropped_frames,
+                'failed_reads': self.failed_reads,
+            }
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=1.0)
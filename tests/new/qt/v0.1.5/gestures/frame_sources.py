@@ -0,0 +1,220 @@
+import os
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from gestures.capture_profiles import CaptureProfile, apply_profile, granted_profile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+# Common interface of everything thread_1 can read frames from. It behaves like cv2.VideoCapture
+# (read/release), so FrameGrabber and the benchmark tools accept any of them.
+# With realtime=True the offline sources are paced at their nominal frame rate, with realtime=False
+# they are replayed as fast as possible and always give the same frames in the same order.
+class FrameSource:
+    kind = 'source'
+
+    def __init__(self, fps: float = 30.0, realtime: bool = True, loop: bool = False):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.loop = loop
+        self.finished = False
+        self.frames_read = 0
+        self.next_frame_time = None
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.finished:
+            return False, None
+
+        read, frame = self.read_frame()
+        if not read and self.loop and self.frames_read > 0:
+            self.rewind()
+            read, frame = self.read_frame()
+        if not read:
+            self.finished = True
+            return False, None
+
+        self.frames_read += 1
+        if self.realtime:
+            self.pace()
+        return True, frame
+
+    def pace(self):
+        # Sleeps until the nominal time of the next frame
+        now = time.perf_counter()
+        if self.next_frame_time is None:
+            self.next_frame_time = now
+        self.next_frame_time += 1 / self.fps
+        delay = self.next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self.next_frame_time = now
+
+    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def rewind(self):
+        pass
+
+    def release(self):
+        pass
+
+    def isOpened(self) -> bool:
+        return not self.finished
+
+    def description(self) -> str:
+        return self.kind
+
+
+class CameraSource(FrameSource):
+    kind = 'camera'
+
+    def __init__(self, device: int, realtime: bool = True, profile: Optional[CaptureProfile] = None):
+        super().__init__(realtime=realtime)
+        self.device = device
+        self.capture = cv2.VideoCapture(device)
+        if profile is not None:
+            self.granted = apply_profile(self.capture, profile)
+        else:
+            self.granted = granted_profile(self.capture)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        # The camera paces itself and a failed read is not the end of the stream
+        read, frame = self.capture.read()
+        if read:
+            self.frames_read += 1
+        return read, frame
+
+    def release(self):
+        self.capture.release()
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def description(self) -> str:
+        return f'camera {self.device}'
+
+
+class VideoFileSource(FrameSource):
+    kind = 'video'
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f'Could not open video file {path}')
+        super().__init__(fps=self.capture.get(cv2.CAP_PROP_FPS), realtime=realtime, loop=loop)
+
+    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.capture.read()
+
+    def rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self.capture.release()
+
+    def description(self) -> str:
+        return f'video {os.path.basename(self.path)}'
+
+
+class ImageDirectorySource(FrameSource):
+    kind = 'images'
+
+    def __init__(self, path: str, fps: float = 30.0, realtime: bool = True, loop: bool = False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.path = path
+        self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise ValueError(f'No images found in {path}')
+        self.position = 0
+
+    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        while self.position < len(self.files):
+            frame = cv2.imread(self.files[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def rewind(self):
+        self.position = 0
+
+    def description(self) -> str:
+        return f'images {os.path.basename(os.path.normpath(self.path))} ({len(self.files)})'
+
+
+# Deterministic frames with a skin coloured blob moving over a textured background,
+# used when there is neither a camera nor a recorded clip
+class SyntheticSource(FrameSource):
+    kind = 'synthetic'
+
+    def __init__(self, width: int = 640, height: int = 480, frames: int = 300, fps: float = 30.0,
+                 seed: int = 0, realtime: bool = True, loop: bool = False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.position = 0
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+
+    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.frames and self.position >= self.frames:
+            return False, None
+
+        t = self.position / self.fps
+        center_x = int(self.width / 2 + self.width * 0.3 * np.sin(2 * np.pi * 0.2 * t))
+        center_y = int(self.height / 2 + self.height * 0.25 * np.sin(2 * np.pi * 0.3 * t))
+        axes = (self.width // 12, self.height // 7) if (self.position // 45) % 2 else (self.width // 10, self.height // 8)
+
+        frame = self.background.copy()
+        cv2.ellipse(frame, (center_x, center_y), axes, 0, 0, 360, (120, 160, 220), -1)
+        self.position += 1
+        return True, frame
+
+    def rewind(self):
+        self.position = 0
+
+    def description(self) -> str:
+        return f'synthetic {self.width}x{self.height}'
+
+
+def parse_capture_device(value: str) -> Union[int, str]:
+    # Values saved in setup.txt: camera indexes are numbers, every other source is a string
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+def is_offline_source(spec: Union[int, str]) -> bool:
+    if isinstance(spec, int) or str(spec).isdigit():
+        return False
+    spec = str(spec)
+    return spec.startswith('synthetic') or os.path.isdir(spec) or os.path.isfile(spec)
+
+
+def open_frame_source(spec: Union[int, str], realtime: bool = True, loop: bool = False,
+                      profile: Optional[CaptureProfile] = None) -> FrameSource:
+    # spec is a camera index, a video file, a directory of images or "synthetic[:WIDTHxHEIGHT[:FRAMES]]",
+    # the capture profile only applies to cameras
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), realtime=realtime, profile=profile)
+
+    spec = str(spec)
+    if spec.startswith('synthetic'):
+        options = spec.split(':')[1:]
+        width, height = (int(v) for v in options[0].split('x')) if options and options[0] else (640, 480)
+        frames = int(options[1]) if len(options) > 1 else 300
+        return SyntheticSource(width, height, frames, realtime=realtime, loop=loop)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime, loop=loop)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, realtime=realtime, loop=loop)
+
+    raise ValueError(f'Unknown frame source: {spec}')
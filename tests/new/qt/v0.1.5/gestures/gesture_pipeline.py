@@ -0,0 +1,258 @@
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from gestures import arm_kinematics
+from gestures import centroid_filters
+from gestures import detection_infos
+from gestures import robotic_arm
+from gestures.arm_kinematics import ArmKinematics
+from gestures.hand_tracker import HandTracker
+from gestures.motion_gate import MotionGate
+from gestures.roi_inference import FULL_FRAME_IMGSZ, RoiInference, to_full_frame
+
+
+# Everything thread_1 needs from one processed frame
+@dataclass
+class GestureResult:
+    results: Any
+    detected: bool
+    in_range: bool
+    hand_class: str
+    state: str
+    direction: str
+    hand_position: Tuple[int, int]
+    m_coord_x: int
+    m_coord_y: int
+    area: float
+    area_location: List[int]
+    packets: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    inference_time: float = 0.0
+    postprocess_time: float = 0.0
+    # Crop the model ran on, None when it saw the full frame
+    window: Optional[Tuple[int, int, int, int]] = None
+    # True when the scene did not change and the previous detection was reused
+    reused: bool = False
+    # True when the hand box comes from the tracker instead of the model
+    tracked: bool = False
+    # (N, 6) detections used for this frame, in full frame coordinates
+    detections: Optional[np.ndarray] = None
+
+
+# Hand segmentation model + per-frame post-processing, without any Qt or serial port,
+# so the same code runs inside thread_1 and in the offline benchmark tools
+class GesturePipeline:
+
+    def __init__(self, model: Any, conf: float = 0.6, pixel_threshold: int = 5, roi: Optional[RoiInference] = None,
+                 motion_gate: Optional[MotionGate] = None, tracker: Optional[HandTracker] = None,
+                 output_mode: str = 'masks', imgsz: int = FULL_FRAME_IMGSZ, kinematics: Optional[ArmKinematics] = None,
+                 area_threshold: float = 0.1, centroid_filter: Any = None):
+        self.model = model
+        self.imgsz = imgsz
+        self.output_mode = output_mode
+        self.conf = conf
+        self.pixel_threshold = pixel_threshold
+        self.roi = roi
+        self.motion_gate = motion_gate
+        self.tracker = tracker
+        # With inverse kinematics the hand area sets the reach, a relative change above area_threshold moves the arm
+        self.kinematics = kinematics
+        self.area_threshold = area_threshold
+        # Smooths the best hand centroid before the dead-band and the angle mapping, None uses it raw
+        self.centroid_filter = centroid_filter
+        # Filter settings changed while running, picked up by the thread calling process() between two frames
+        self.settings_lock = threading.Lock()
+        self.pending_filter_settings = None
+        self.last_gesture = None
+
+        # Counters
+        self.inference_runs = 0
+        self.reused_frames = 0
+        self.tracked_frames = 0
+
+        # State carried from one frame to the next
+        self.prev_m_coord_x = 0
+        self.prev_m_coord_y = 0
+        self.prev_area = 0.0
+        self.rotating_base_angle = None
+        self.gripper_angle = None
+        self.arm1_angle = None
+        self.arm2_angle = None
+        self.detected = False
+        self.in_range = False
+        self.hand_class = 'None'
+        self.state = 'None'
+        self.direction = 'Still'
+        self.hand_position = (0, 0)
+        self.m_coord_x = 0
+        self.m_coord_y = 0
+        self.area = 0.0
+        self.area_location = [0, 0]
+        self.summary = None
+
+    def infer(self, frame: np.ndarray) -> Tuple[Any, Optional[Tuple[int, int, int, int]]]:
+        if self.roi is not None:
+            return self.roi.infer(self.model, frame, conf=self.conf)
+        return self.model(source=frame, imgsz=self.imgsz, conf=self.conf), None
+
+    def request_filter_settings(self, filter_settings: Dict[str, str]):
+        # Safe from any thread, raises ValueError for settings the filter cannot use
+        centroid_filters.from_settings(filter_settings)
+        with self.settings_lock:
+            self.pending_filter_settings = dict(filter_settings)
+
+    def apply_pending_settings(self):
+        with self.settings_lock:
+            filter_settings, self.pending_filter_settings = self.pending_filter_settings, None
+        if filter_settings is not None:
+            self.centroid_filter = centroid_filters.from_settings(filter_settings, self.centroid_filter)
+
+    def process(self, frame: np.ndarray, frame_time: Optional[float] = None) -> GestureResult:
+        # frame_time is when the frame was captured, the centroid filter uses the current time without it
+        start_time = time.perf_counter()
+        self.apply_pending_settings()
+
+        # Nothing moved since the last inference, the previous detection still holds
+        if self.motion_gate is not None and self.last_gesture is not None and not self.motion_gate.should_infer(frame):
+            self.direction = "Still"
+            self.reused_frames += 1
+            return replace(self.last_gesture, direction=self.direction, packets=[], inference_time=0.0,
+                           postprocess_time=time.perf_counter() - start_time, reused=True)
+
+        # Between two model runs the tracker moves the last hand box
+        if self.tracker is not None and not self.tracker.needs_detection():
+            detections = self.tracker.track(frame)
+            if len(detections):
+                tracking_end_time = time.perf_counter()
+                packets = self.postprocess(detections, frame_time)
+                self.tracked_frames += 1
+                self.last_gesture = self.make_result(self.last_gesture.results, packets, tracking_end_time - start_time,
+                                                     time.perf_counter() - tracking_end_time, None, detections, True)
+                return self.last_gesture
+
+        results, window = self.infer(frame)
+        self.inference_runs += 1
+        inference_end_time = time.perf_counter()
+
+        # (N, 6) array of x1, y1, x2, y2, conf, cls in full frame coordinates
+        detections = to_full_frame(results[0].boxes.data.cpu().numpy(), window)
+        packets = self.postprocess(detections, frame_time)
+        if self.roi is not None:
+            self.roi.update(self.detected, self.in_range)
+        if self.tracker is not None:
+            self.tracker.seed(frame, self.best_hand())
+        end_time = time.perf_counter()
+
+        self.last_gesture = self.make_result(results, packets, inference_end_time - start_time,
+                                             end_time - inference_end_time, window, detections, False)
+        return self.last_gesture
+
+    def make_result(self, results: Any, packets: List[Tuple[int, int, int, int]], inference_time: float,
+                    postprocess_time: float, window: Optional[Tuple[int, int, int, int]],
+                    detections: np.ndarray, tracked: bool) -> GestureResult:
+        return GestureResult(results, self.detected, self.in_range, self.hand_class, self.state, self.direction,
+                             self.hand_position, self.m_coord_x, self.m_coord_y, self.area, self.area_location,
+                             packets, inference_time, postprocess_time, window, False, tracked, detections)
+
+    def best_hand(self) -> Optional[np.ndarray]:
+        # Open or closed hand with the highest area * confidence score in the last post-processed frame
+        summary = self.summary
+        return summary.hands[summary.best] if summary is not None and summary.best >= 0 else None
+
+    def annotate(self, frame: np.ndarray, gesture: GestureResult) -> np.ndarray:
+        if self.output_mode == 'control':
+            # Nothing to draw besides the control rectangle and centroid, which thread_1 adds
+            return frame
+
+        if self.output_mode == 'boxes':
+            # The frame is not used after this, the boxes go straight onto it
+            for x1, y1, x2, y2, _, cls in gesture.detections.astype(int):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0) if cls == 1 else (255, 0, 0), 2)
+            return frame
+
+        if gesture.tracked:
+            # The last mask no longer matches the hand, only the tracked box is drawn
+            annotated_frame = frame.copy()
+            for x1, y1, x2, y2 in gesture.detections[:, :4].astype(int):
+                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+            return annotated_frame
+
+        # Segmentation overlay as a new BGR image the size of the frame
+        annotated_frame = gesture.results[0].plot(boxes=False)
+        if gesture.window is None:
+            return annotated_frame
+        x0, y0, x1, y1 = gesture.window
+        full_frame = frame.copy()
+        full_frame[y0:y1, x0:x1] = annotated_frame
+        return full_frame
+
+    def postprocess(self, detections: np.ndarray, frame_time: Optional[float] = None) -> List[Tuple[int, int, int, int]]:
+        # Areas, scores, centroids and in-range flags of every hand in one pass, the best hand drives the arm
+        summary = detection_infos.summarize_detections(detections)
+        self.summary = summary
+        if summary.best < 0:
+            if self.centroid_filter is not None:
+                # The next hand starts a new track instead of sliding in from the last position
+                self.centroid_filter.reset()
+            self.detected = False
+            self.in_range = False
+            if len(summary.hands):
+                self.hand_class = 'None'
+                self.state = self.hand_class
+            return []
+
+        pixel_threshold = self.pixel_threshold
+        best_detection = summary.hands[summary.best]
+        self.area = float(summary.areas[summary.best])
+        self.m_coord_x, self.m_coord_y = (int(v) for v in summary.centroids[summary.best])
+        centroid_filter = self.centroid_filter
+        if centroid_filter is not None:
+            filtered_x, filtered_y = centroid_filter.filter(self.m_coord_x, self.m_coord_y,
+                                                            time.perf_counter() if frame_time is None else frame_time)
+            self.m_coord_x, self.m_coord_y = int(round(filtered_x)), int(round(filtered_y))
+        self.area_location = [int(best_detection[0]), int(best_detection[3])]
+        self.hand_position = (self.m_coord_x, self.m_coord_y)
+        self.in_range = bool(summary.in_range[summary.best])
+        self.direction = detection_infos.calculate_direction(pixel_threshold, self.m_coord_x, self.m_coord_y,
+                                                             self.prev_m_coord_x, self.prev_m_coord_y)
+
+        if robotic_arm.is_moving_axis_x(pixel_threshold, self.prev_m_coord_x, self.m_coord_x):
+            self.rotating_base_angle = robotic_arm.calculate_rotating_base_angle(self.m_coord_x)
+            self.prev_m_coord_x = self.m_coord_x
+        if self.kinematics is None:
+            if robotic_arm.is_moving_axis_y(pixel_threshold, self.prev_m_coord_y, self.m_coord_y):
+                self.arm1_angle, self.arm2_angle = robotic_arm.calculate_angle_hastes(self.m_coord_y)
+                self.prev_m_coord_y = self.m_coord_y
+        elif (robotic_arm.is_moving_axis_y(pixel_threshold, self.prev_m_coord_y, self.m_coord_y) or
+              abs(self.area - self.prev_area) > self.area_threshold * self.prev_area):
+            self.arm1_angle, self.arm2_angle = self.kinematics.arm_angles(self.m_coord_y, self.area)
+            self.prev_m_coord_y = self.m_coord_y
+            self.prev_area = self.area
+
+        self.detected = True
+        self.gripper_angle, self.state = robotic_arm.calculate_gripper_angle(int(best_detection[5]))
+        self.hand_class = 'Closed Hand' if best_detection[5] == 0 else 'Open Hand'
+
+        if self.in_range and self.rotating_base_angle is not None and self.arm1_angle is not None:
+            return [(self.rotating_base_angle, self.gripper_angle, self.arm1_angle, self.arm2_angle)]
+        return []
+
+
+def build_pipeline(model: Any, inference_region: str = 'full', motion_gating: str = 'off', detect_every: int = 1,
+                   conf: float = 0.6, pixel_threshold: int = 5, output_mode: str = 'masks',
+                   inference_size: int = FULL_FRAME_IMGSZ, arm_mapping: str = 'heuristic',
+                   arm_settings: Optional[Dict[str, str]] = None,
+                   filter_settings: Optional[Dict[str, str]] = None) -> GesturePipeline:
+    # Pipeline configured from the setup.txt values
+    roi = RoiInference(margin=20, full_imgsz=inference_size) if inference_region == 'roi' else None
+    motion_gate = MotionGate() if motion_gating == 'on' else None
+    tracker = HandTracker(detect_every=detect_every) if detect_every > 1 else None
+    kinematics = arm_kinematics.from_settings(arm_settings or {}) if arm_mapping == 'ik' else None
+    centroid_filter = centroid_filters.from_settings(filter_settings or {})
+    return GesturePipeline(model, conf=conf, pixel_threshold=pixel_threshold, roi=roi,
+                           motion_gate=motion_gate, tracker=tracker, output_mode=output_mode, imgsz=inference_size,
+                           kinematics=kinematics, centroid_filter=centroid_filter)
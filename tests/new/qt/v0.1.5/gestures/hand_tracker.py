@@ -0,0 +1,115 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Constant velocity Kalman filter over the hand centroid (state x, y, vx, vy)
+class CentroidKalman:
+
+    def __init__(self, process_noise: float = 1.0, measurement_noise: float = 1.0):
+        self.filter = cv2.KalmanFilter(4, 2)
+        self.filter.transitionMatrix = np.array([[1, 0, 1, 0],
+                                                 [0, 1, 0, 1],
+                                                 [0, 0, 1, 0],
+                                                 [0, 0, 0, 1]], dtype=np.float32)
+        self.filter.measurementMatrix = np.array([[1, 0, 0, 0],
+                                                  [0, 1, 0, 0]], dtype=np.float32)
+        self.filter.processNoiseCov = np.eye(4, dtype=np.float32) * process_noise
+        self.filter.measurementNoiseCov = np.eye(2, dtype=np.float32) * measurement_noise
+
+    def reset(self, x: float, y: float):
+        self.filter.statePost = np.array([[x], [y], [0], [0]], dtype=np.float32)
+        self.filter.errorCovPost = np.eye(4, dtype=np.float32)
+
+    def update(self, x: float, y: float) -> Tuple[float, float]:
+        self.filter.predict()
+        state = self.filter.correct(np.array([[x], [y]], dtype=np.float32))
+        return float(state[0, 0]), float(state[1, 0])
+
+
+# Follows the best hand between two detector runs with sparse optical flow on corners found inside
+# its box, smoothed by the Kalman filter. The detector has to run again after detect_every frames,
+# or earlier when too few corners survive the forward-backward check.
+class HandTracker:
+
+    def __init__(self, detect_every: int = 5, min_confidence: float = 0.5, max_points: int = 40):
+        self.detect_every = max(1, detect_every)
+        self.min_confidence = min_confidence
+        self.max_points = max_points
+        self.kalman = CentroidKalman()
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.reset()
+
+        # Counters
+        self.tracked_frames = 0
+        self.lost_tracks = 0
+
+    def reset(self):
+        self.detection = None
+        self.points = None
+        self.seed_points = 0
+        self.prev_gray = None
+        self.confidence = 0.0
+        self.frames_since_detection = 0
+
+    def needs_detection(self) -> bool:
+        return (self.detection is None or self.frames_since_detection + 1 >= self.detect_every
+                or self.confidence < self.min_confidence)
+
+    def seed(self, frame: np.ndarray, detection: Optional[np.ndarray]):
+        # Starts following a fresh detection (x1, y1, x2, y2, conf, cls)
+        if detection is None:
+            self.reset()
+            return
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        x1, y1, x2, y2 = (int(v) for v in detection[:4])
+        mask = np.zeros_like(gray)
+        mask[max(0, y1):max(0, y2), max(0, x1):max(0, x2)] = 255
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 5, mask=mask)
+
+        self.detection = np.asarray(detection, dtype=np.float32).copy()
+        self.points = points
+        self.seed_points = 0 if points is None else len(points)
+        self.prev_gray = gray
+        self.confidence = 1.0 if self.seed_points >= 4 else 0.0
+        self.frames_since_detection = 0
+        self.kalman.reset((x1 + x2) / 2, (y1 + y2) / 2)
+
+    def track(self, frame: np.ndarray) -> np.ndarray:
+        # Moves the last box to where the hand is now, returns a (1, 6) detections array (empty when lost)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.frames_since_detection += 1
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **self.lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, new_points, None, **self.lk_params)
+        error = np.linalg.norm((self.points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < 1.0)
+
+        self.confidence = float(good.sum()) / max(1, self.seed_points)
+        self.prev_gray = gray
+        if good.sum() < 4:
+            self.lost_tracks += 1
+            self.confidence = 0.0
+            return np.zeros((0, 6), dtype=np.float32)
+
+        shift = np.median((new_points - self.points).reshape(-1, 2)[good], axis=0)
+        self.points = new_points[good].reshape(-1, 1, 2)
+
+        width = self.detection[2] - self.detection[0]
+        height = self.detection[3] - self.detection[1]
+        measured_x = (self.detection[0] + self.detection[2]) / 2 + shift[0]
+        measured_y = (self.detection[1] + self.detection[3]) / 2 + shift[1]
+        center_x, center_y = self.kalman.update(measured_x, measured_y)
+
+        self.detection[:4] = (center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2)
+        self.tracked_frames += 1
+        return self.detection[None, :].copy()
+
+    def stats(self) -> dict:
+        return {
+            'tracked_frames': self.tracked_frames,
+            'lost_tracks': self.lost_tracks,
+        }
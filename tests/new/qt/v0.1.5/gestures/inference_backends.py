@@ -0,0 +1,66 @@
+import hashlib
+import os
+import shutil
+from typing import Any
+
+# Backends offered in the setup window, every one of them returns the same ultralytics Results.
+# onnx-int8 is the reduced precision variant made by gestures.quantization
+BACKENDS = ['pytorch', 'onnx', 'openvino', 'onnx-int8']
+
+# What the model has to produce: masks for the segmentation overlay, or only boxes when the operator
+# just needs control (boxes draws a cheap box overlay, control draws nothing but the centroid)
+OUTPUT_MODES = ['masks', 'boxes', 'control']
+
+# Exported models are kept next to the weights, one directory per weight file content
+CACHE_DIR = './src/misc/exported'
+
+
+def weights_hash(weights: str) -> str:
+    digest = hashlib.sha256()
+    with open(weights, 'rb') as weights_file:
+        for chunk in iter(lambda: weights_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def exported_path(weights: str, backend: str, cache_dir: str = CACHE_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    name = f'{stem}.onnx' if backend == 'onnx' else f'{stem}_openvino_model'
+    return os.path.join(cache_dir, weights_hash(weights), name)
+
+
+def export_weights(weights: str, backend: str, cache_dir: str = CACHE_DIR) -> str:
+    # One-time conversion of the .pt weights, later calls find the exported model in the cache
+    target = exported_path(weights, backend, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    # Dynamic input shapes so the ROI mode can keep feeding smaller images
+    print(f"Exporting {weights} for {backend}, this only happens once")
+    exported = YOLO(weights).export(format=backend, dynamic=True)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(str(exported), target)
+    return target
+
+
+def load_model(weights: str, backend: str = 'pytorch', output_mode: str = 'masks', cache_dir: str = CACHE_DIR) -> Any:
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f'Invalid inference backend: {backend}')
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f'Invalid output mode: {output_mode}')
+    if backend == 'pytorch':
+        model = YOLO(weights)
+    elif backend == 'onnx-int8':
+        from gestures.quantization import find_quantized
+        model = YOLO(find_quantized(weights, cache_dir), task='segment')
+    else:
+        model = YOLO(export_weights(weights, backend, cache_dir), task='segment')
+
+    if output_mode != 'masks':
+        from gestures.boxes_only import use_boxes_only
+        use_boxes_only(model)
+    return model
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+from gestures.roi_inference import roi_window
+
+
+# Cheap change detector that runs before the hand model. The control rectangle is downsampled to a
+# small grayscale image and compared with the one from the last frame the model actually ran on.
+# While less than change_threshold of its pixels moved by more than pixel_delta, the previous
+# detection is reused, but never for more than max_reuse frames in a row.
+class MotionGate:
+
+    def __init__(self, change_threshold: float = 0.01, pixel_delta: int = 12, max_reuse: int = 15,
+                 margin: int = 20, scale: float = 0.125):
+        self.change_threshold = change_threshold
+        self.pixel_delta = pixel_delta
+        self.max_reuse = max_reuse
+        self.margin = margin
+        self.scale = scale
+        self.reference = None
+        self.reused_frames = 0
+
+        # Counters
+        self.executed = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi_window(width, height, self.margin)
+        small = cv2.resize(frame[y0:y1, x0:x1], None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def changed_fraction(self, thumbnail: np.ndarray) -> float:
+        if self.reference is None or self.reference.shape != thumbnail.shape:
+            return 1.0
+        difference = cv2.absdiff(thumbnail, self.reference)
+        return float(np.count_nonzero(difference > self.pixel_delta)) / difference.size
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        thumbnail = self.thumbnail(frame)
+        if self.reused_frames < self.max_reuse and self.changed_fraction(thumbnail) < self.change_threshold:
+            self.reused_frames += 1
+            self.skipped += 1
+            return False
+
+        self.reference = thumbnail
+        self.reused_frames = 0
+        self.executed += 1
+        return True
+
+    def reset(self):
+        self.reference = None
+        self.reused_frames = 0
+
+    def stats(self) -> dict:
+        return {
+            'executed': self.executed,
+            'skipped': self.skipped,
+        }
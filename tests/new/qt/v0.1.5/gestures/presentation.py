@@ -0,0 +1,99 @@
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DISPLAY_WIDTH = 640
+DISPLAY_HEIGHT = 480
+
+
+def fit_size(width: int, height: int, display_width: int = DISPLAY_WIDTH, display_height: int = DISPLAY_HEIGHT) -> Tuple[int, int]:
+    # Same result as QImage.scaled(display_width, display_height, KeepAspectRatio)
+    scale = min(display_width / width, display_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+# Turns the annotated BGR frame into the RGB image shown in the camera feed widget in one pass,
+# writing into a small pool of preallocated buffers instead of allocating new frames every time.
+# A buffer handed to the GUI stays reserved until the GUI calls release(), so the worker never
+# overwrites memory a QImage is still pointing to. When the GUI falls behind and every buffer is
+# in use, the frame is not presented at all.
+class FramePresenter:
+
+    def __init__(self, display_width: int = DISPLAY_WIDTH, display_height: int = DISPLAY_HEIGHT, buffers: int = 3):
+        self.display_width = display_width
+        self.display_height = display_height
+        self.buffer_count = buffers
+        self.lock = threading.Lock()
+        self.size = None
+        self.buffers: List[np.ndarray] = []
+        self.free: List[int] = []
+        self.resized = None
+
+        # Counters
+        self.presented_frames = 0
+        self.skipped_frames = 0
+
+    def allocate(self, width: int, height: int):
+        # Only happens on the first frame or when the source resolution changes
+        self.size = (width, height)
+        self.buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.buffer_count)]
+        self.free = list(range(self.buffer_count))
+        self.resized = None
+
+    def acquire(self, size: Tuple[int, int]) -> Optional[int]:
+        with self.lock:
+            if size != self.size:
+                self.allocate(*size)
+            if not self.free:
+                self.skipped_frames += 1
+                return None
+            return self.free.pop(0)
+
+    def present(self, frame: np.ndarray) -> Optional[Tuple[int, np.ndarray]]:
+        height, width = frame.shape[:2]
+        size = fit_size(width, height, self.display_width, self.display_height)
+
+        index = self.acquire(size)
+        if index is None:
+            return None
+        buffer = self.buffers[index]
+
+        if size == (width, height):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+        else:
+            # Nearest neighbour, like the Qt FastTransformation default it replaces
+            if self.resized is None:
+                self.resized = np.empty_like(buffer)
+            cv2.resize(frame, size, dst=self.resized, interpolation=cv2.INTER_NEAREST)
+            cv2.cvtColor(self.resized, cv2.COLOR_BGR2RGB, dst=buffer)
+
+        self.presented_frames += 1
+        return index, buffer
+
+    def present_rgb(self, image: np.ndarray) -> Optional[Tuple[int, np.ndarray]]:
+        # Image already converted and scaled elsewhere (process pipeline), only copied into the pool
+        index = self.acquire((image.shape[1], image.shape[0]))
+        if index is None:
+            return None
+        buffer = self.buffers[index]
+        np.copyto(buffer, image)
+        self.presented_frames += 1
+        return index, buffer
+
+    def release(self, index: int):
+        with self.lock:
+            if 0 <= index < len(self.buffers) and index not in self.free:
+                self.free.append(index)
+
+    def reset(self):
+        # Called when the worker restarts, buffers of a previous run are no longer displayed
+        with self.lock:
+            self.free = list(range(len(self.buffers)))
+
+    def stats(self) -> dict:
+        return {
+            'presented_frames': self.presented_frames,
+            'skipped_frames': self.skipped_frames,
+        }
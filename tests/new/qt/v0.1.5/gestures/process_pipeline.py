@@ -0,0 +1,529 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from gestures import arm_output
+from gestures import detection_infos
+from gestures.presentation import fit_size
+from serial_link import link
+from serial_link import telemetry
+from serial_link import writer
+
+# Per-slot header: sequence number, height, width, capture timestamp, references
+HEADER_FIELDS = 5
+REFERENCES = 4
+STATUS_INTERVAL = 0.5
+# End of a recorded clip, passed down the frame queues behind the last frame
+END_OF_STREAM = None
+
+
+# Fixed number of frame slots in one shared memory block. The writer fills slots round robin and only
+# sends (slot, sequence) through a queue, frames themselves are never pickled. Every queue entry and
+# every stage working on a frame holds a reference to its slot: begin_write() gives the new frame one
+# reference that travels with the queue entry, and whoever drops or finishes the frame calls release().
+# The writer skips slots that are still referenced, so a slow stage never has its frame overwritten;
+# when every slot is in use the new frame is dropped instead.
+class SharedFrameRing:
+
+    def __init__(self, slots: int, max_height: int, max_width: int, name: Optional[str] = None,
+                 lock: Optional[Any] = None):
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.slot_bytes = max_height * max_width * 3
+        header_bytes = slots * HEADER_FIELDS * 8
+        size = header_bytes + slots * self.slot_bytes
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Child processes attach by name, only the creating process unlinks the block
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((slots, HEADER_FIELDS), dtype=np.float64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if self.owner:
+            self.header[:] = -1
+            self.header[:, REFERENCES] = 0
+        # Guards the reference counts, shared by every process attached to the ring
+        self.lock = lock if lock is not None else mp.get_context('spawn').Lock()
+        self.next_slot = 0
+
+    def spec(self) -> Tuple[int, int, int, str, Any]:
+        # Arguments for attaching to the same ring from another process
+        return self.slots, self.max_height, self.max_width, self.shm.name, self.lock
+
+    @classmethod
+    def attach(cls, spec: Tuple[int, int, int, str, Any]) -> 'SharedFrameRing':
+        slots, max_height, max_width, name, lock = spec
+        return cls(slots, max_height, max_width, name=name, lock=lock)
+
+    def slot_view(self, slot: int, height: int, width: int) -> np.ndarray:
+        return self.data[slot, :height * width * 3].reshape(height, width, 3)
+
+    def begin_write(self, height: int, width: int) -> Tuple[Optional[int], Optional[np.ndarray]]:
+        # Reserves the next free slot with one reference and returns a view to draw or copy into,
+        # (None, None) while every slot is still in use downstream
+        if height > self.max_height or width > self.max_width:
+            raise ValueError(f'Frame {width}x{height} does not fit in the ring ({self.max_width}x{self.max_height})')
+        with self.lock:
+            for step in range(self.slots):
+                slot = (self.next_slot + step) % self.slots
+                if self.header[slot, REFERENCES] == 0:
+                    break
+            else:
+                return None, None
+            self.header[slot, 0] = -1
+            self.header[slot, REFERENCES] = 1
+        self.next_slot = (slot + 1) % self.slots
+        return slot, self.slot_view(slot, height, width)
+
+    def end_write(self, slot: int, seq: int, height: int, width: int, timestamp: float):
+        self.header[slot, 1:REFERENCES] = (height, width, timestamp)
+        self.header[slot, 0] = seq
+
+    def write(self, frame: np.ndarray, seq: int, timestamp: float) -> Optional[int]:
+        height, width = frame.shape[:2]
+        slot, view = self.begin_write(height, width)
+        if slot is None:
+            return None
+        np.copyto(view, frame)
+        self.end_write(slot, seq, height, width, timestamp)
+        return slot
+
+    def release(self, slot: int):
+        # The frame in slot was dropped or is done with, the writer may reuse it once nothing else holds it
+        with self.lock:
+            self.header[slot, REFERENCES] = max(0, self.header[slot, REFERENCES] - 1)
+
+    def in_use(self) -> int:
+        return int(np.count_nonzero(self.header[:, REFERENCES]))
+
+    def read(self, slot: int, seq: int) -> Optional[np.ndarray]:
+        # View of the frame, valid until the reference to slot is released
+        if self.header[slot, 0] != seq:
+            return None
+        height, width = int(self.header[slot, 1]), int(self.header[slot, 2])
+        return self.slot_view(slot, height, width)
+
+    def valid(self, slot: int, seq: int) -> bool:
+        return self.header[slot, 0] == seq
+
+    def close(self):
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def put_latest(target: Any, item: Any, on_drop: Optional[Callable[[Any], None]] = None):
+    # Queues the item, dropping the oldest pending one when the consumer is behind. on_drop gets the
+    # dropped item, to release the ring slot it referenced
+    while True:
+        try:
+            target.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                dropped = target.get_nowait()
+            except queue.Empty:
+                continue
+            if on_drop is not None and dropped is not END_OF_STREAM:
+                on_drop(dropped)
+
+
+def put_end_of_stream(target: Any, stop_event: Any):
+    # Waits for room instead of dropping, the consumer has to see every frame before the end
+    while not stop_event.is_set():
+        try:
+            target.put(END_OF_STREAM, timeout=0.2)
+            return
+        except queue.Full:
+            pass
+
+
+# Busy time and throughput of one stage, sent to the parent every STATUS_INTERVAL seconds
+class StageMeter:
+
+    def __init__(self, stage: str, status_queue: Any):
+        self.stage = stage
+        self.status_queue = status_queue
+        self.busy_time = 0.0
+        self.items = 0
+        self.dropped = 0
+        self.window_start_time = time.perf_counter()
+        self.busy_start_time = None
+
+    def start(self):
+        self.busy_start_time = time.perf_counter()
+
+    def stop(self):
+        now = time.perf_counter()
+        self.busy_time += now - self.busy_start_time
+        self.items += 1
+        self.report(now)
+
+    def drop(self):
+        # A frame given up because the ring had no free slot
+        self.dropped += 1
+
+    def report(self, now: Optional[float] = None):
+        now = now or time.perf_counter()
+        elapsed = now - self.window_start_time
+        if elapsed >= STATUS_INTERVAL:
+            put_latest(self.status_queue, ('stage', self.stage, {
+                'fps': self.items / elapsed,
+                'busy': min(1.0, self.busy_time / elapsed),
+                'ms_per_item': 1000 * self.busy_time / self.items if self.items else 0.0,
+                'dropped': self.dropped,
+            }))
+            self.busy_time = 0.0
+            self.items = 0
+            self.dropped = 0
+            self.window_start_time = now
+
+
+def capture_stage(source_spec: Any, profile: Any, ring_spec: tuple, frame_queue: Any, event_queue: Any,
+                  status_queue: Any, stop_event: Any, thread_config: Optional[Any] = None):
+    from gestures import frame_sources
+    from runtime.thread_config import pin_current_thread
+
+    cv2.setNumThreads(1)
+    if thread_config is not None:
+        pin_current_thread(thread_config.capture_cores)
+    ring = SharedFrameRing.attach(ring_spec)
+    source = frame_sources.open_frame_source(source_spec, profile=profile)
+    event_queue.put(('source', str(getattr(source, 'granted', source.description()))))
+    meter = StageMeter('capture', status_queue)
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            read, frame = source.read()
+            if not read:
+                if source.finished:
+                    put_end_of_stream(frame_queue, stop_event)
+                    break
+                continue
+            meter.start()
+            seq += 1
+            timestamp = time.time()
+            slot = ring.write(frame, seq, timestamp)
+            if slot is None:
+                # Every slot is still being processed or displayed downstream
+                meter.drop()
+                continue
+            put_latest(frame_queue, (slot, seq, timestamp), on_drop=lambda item: ring.release(item[0]))
+            meter.stop()
+    finally:
+        source.release()
+        event_queue.put(('finished', 'capture'))
+        ring.close()
+
+
+def inference_stage(weights: str, backend: str, settings: Dict[str, Any], ring_spec: tuple, frame_queue: Any,
+                    overlay_queue: Any, arm_queue: Any, status_queue: Any, stop_event: Any,
+                    thread_config: Optional[Any] = None):
+    from gestures.gesture_pipeline import build_pipeline
+    from gestures.inference_backends import load_model
+    from runtime.thread_config import apply_library_threads, pin_current_thread
+
+    if thread_config is not None:
+        apply_library_threads(thread_config)
+        pin_current_thread(thread_config.inference_cores)
+
+    ring = SharedFrameRing.attach(ring_spec)
+    output_mode = settings.get('output_mode', 'masks')
+    pipeline = build_pipeline(load_model(weights, backend, output_mode), **settings)
+    meter = StageMeter('inference', status_queue)
+    try:
+        while not stop_event.is_set():
+            try:
+                entry = frame_queue.get(timeout=0.2)
+            except queue.Empty:
+                meter.report()
+                continue
+            if entry is END_OF_STREAM:
+                put_end_of_stream(overlay_queue, stop_event)
+                break
+
+            # The slot stays referenced until the annotation stage is done with it
+            slot, seq, timestamp = entry
+            meter.start()
+            frame = ring.read(slot, seq)
+            if frame is None:
+                ring.release(slot)
+                continue
+            gesture = pipeline.process(frame, timestamp)
+
+            if gesture.packets:
+                put_latest(arm_queue, gesture.packets)
+            put_latest(overlay_queue, (slot, seq, timestamp, overlay_of(gesture, output_mode), {
+                'detected': gesture.detected,
+                'in_range': gesture.in_range,
+                'hand_position': tuple(int(v) for v in gesture.hand_position),
+                'state': gesture.state,
+                'direction': gesture.direction,
+            }), on_drop=lambda item: ring.release(item[0]))
+            meter.stop()
+    finally:
+        ring.close()
+
+
+def overlay_of(gesture: Any, output_mode: str = 'masks') -> Dict[str, Any]:
+    # Small picklable description of what to draw: mask outlines and the centroid, in frame coordinates
+    polygons = []
+    if not gesture.tracked and not gesture.reused and gesture.results[0].masks is not None:
+        offset = np.array(gesture.window[:2] if gesture.window is not None else (0, 0), dtype=np.float32)
+        polygons = [(polygon + offset).astype(np.int32) for polygon in gesture.results[0].masks.xy if len(polygon)]
+    boxes = None
+    if (gesture.tracked or output_mode == 'boxes') and gesture.detections is not None:
+        boxes = gesture.detections[:, :4].astype(np.int32)
+    return {
+        'polygons': polygons,
+        'boxes': boxes,
+        'centroid': (gesture.m_coord_x, gesture.m_coord_y),
+        'still': gesture.direction == 'Still',
+    }
+
+
+def annotation_stage(capture_ring_spec: tuple, display_ring_spec: tuple, overlay_queue: Any, display_queue: Any,
+                     status_queue: Any, stop_event: Any, display_width: int, display_height: int):
+    cv2.setNumThreads(1)
+    capture_ring = SharedFrameRing.attach(capture_ring_spec)
+    display_ring = SharedFrameRing.attach(display_ring_spec)
+    meter = StageMeter('annotation', status_queue)
+    try:
+        while not stop_event.is_set():
+            try:
+                entry = overlay_queue.get(timeout=0.2)
+            except queue.Empty:
+                meter.report()
+                continue
+            if entry is END_OF_STREAM:
+                put_end_of_stream(display_queue, stop_event)
+                break
+
+            slot, seq, timestamp, overlay, info = entry
+            meter.start()
+            frame = capture_ring.read(slot, seq)
+            if frame is None:
+                capture_ring.release(slot)
+                continue
+            height, width = frame.shape[:2]
+            size = fit_size(width, height, display_width, display_height)
+            display_slot, display_image = display_ring.begin_write(size[1], size[0])
+            if display_slot is None:
+                # The parent still holds every display slot
+                capture_ring.release(slot)
+                meter.drop()
+                continue
+
+            # Resize and convert straight into the shared display slot, then draw at display scale
+            if size == (width, height):
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=display_image)
+            else:
+                cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_NEAREST), cv2.COLOR_BGR2RGB,
+                             dst=display_image)
+            capture_ring.release(slot)
+            draw_overlay(display_image, overlay, size[0] / width, size[1] / height)
+
+            display_ring.end_write(display_slot, seq, size[1], size[0], timestamp)
+            put_latest(display_queue, (display_slot, seq, timestamp, info),
+                       on_drop=lambda item: display_ring.release(item[0]))
+            meter.stop()
+    finally:
+        capture_ring.close()
+        display_ring.close()
+
+
+def draw_overlay(image: np.ndarray, overlay: Dict[str, Any], scale_x: float, scale_y: float):
+    scale = np.array([scale_x, scale_y], dtype=np.float32)
+    for polygon in overlay['polygons']:
+        cv2.polylines(image, [(polygon * scale).astype(np.int32)], True, (255, 56, 56), 2)
+    if overlay['boxes'] is not None:
+        for x1, y1, x2, y2 in overlay['boxes']:
+            cv2.rectangle(image, (int(x1 * scale_x), int(y1 * scale_y)), (int(x2 * scale_x), int(y2 * scale_y)),
+                          (255, 255, 0), 2)
+    cv2.rectangle(image,
+                  (int(detection_infos.rect_top_left_x * scale_x), int(detection_infos.rect_top_left_y * scale_y)),
+                  (int(detection_infos.rect_bottom_right_x * scale_x), int(detection_infos.rect_bottom_right_y * scale_y)),
+                  (255, 0, 0), 3)
+    centroid = (int(overlay['centroid'][0] * scale_x), int(overlay['centroid'][1] * scale_y))
+    cv2.circle(image, centroid, 3, (255, 255, 255) if overlay['still'] else (0, 255, 0), 2)
+
+
+def arm_stage(com_port: int, arm_queue: Any, status_queue: Any, stop_event: Any,
+              output_settings: Optional[Dict[str, str]] = None, baud_rates: Tuple[int, ...] = link.FAST_BAUD_RATES):
+    # The port is opened, negotiated, written and reopened by the writer thread
+    arm_writer = writer.SerialWriter(f'COM{com_port}', baud_rates)
+    arm_writer.start()
+
+    arm_commands = arm_output.from_settings(arm_writer, output_settings or {}, arm_writer.baudrate)
+    meter = StageMeter('arm', status_queue)
+    status_time = time.perf_counter()
+    try:
+        while not stop_event.is_set():
+            try:
+                # A merged pose waits for the rate limit, the queue is polled more often meanwhile
+                packets = arm_queue.get(timeout=arm_commands.min_interval if arm_commands.pending else 0.2)
+            except queue.Empty:
+                packets = None
+
+            if packets is None:
+                arm_commands.poll()
+                meter.report()
+            else:
+                meter.start()
+                if arm_writer.baudrate != arm_commands.baudrate:
+                    arm_commands.set_baudrate(arm_writer.baudrate)
+                for packet in packets:
+                    arm_commands.submit(packet)
+                arm_commands.poll()
+                meter.stop()
+
+            # Sent while idle too, the arm keeps moving and reporting after the last pose
+            if time.perf_counter() - status_time >= STATUS_INTERVAL:
+                status_time = time.perf_counter()
+                put_latest(status_queue, ('arm_output', dict(arm_commands.stats(), writer=arm_writer.stats(),
+                                                              arm_state=arm_writer.arm_state.stats())))
+    finally:
+        arm_writer.stop()
+
+
+# Capture, inference, annotation and arm output in four processes so they do not share one GIL.
+# The parent only receives ready-to-display RGB frames (through a second shared ring) and status.
+class ProcessPipeline:
+
+    def __init__(self, source_spec: Any, profile: Any, weights: str, backend: str, settings: Dict[str, Any],
+                 com_port: int, display_width: int = 640, display_height: int = 480, max_height: int = 1080,
+                 max_width: int = 1920, slots: int = 8, thread_config: Optional[Any] = None,
+                 arm_output_settings: Optional[Dict[str, str]] = None,
+                 baud_rates: Tuple[int, ...] = link.FAST_BAUD_RATES):
+        self.context = mp.get_context('spawn')
+        self.capture_ring = SharedFrameRing(slots, max_height, max_width, lock=self.context.Lock())
+        self.display_ring = SharedFrameRing(slots, display_height, display_width, lock=self.context.Lock())
+        self.stop_event = self.context.Event()
+        self.status_queue = self.context.Queue(maxsize=64)
+        # Source description and end of capture, never dropped unlike the status updates
+        self.event_queue = self.context.Queue()
+        self.display_queue = self.context.Queue(maxsize=2)
+        frame_queue = self.context.Queue(maxsize=1)
+        overlay_queue = self.context.Queue(maxsize=2)
+        arm_queue = self.context.Queue(maxsize=4)
+
+        stages = [
+            ('capture', capture_stage, (source_spec, profile, self.capture_ring.spec(), frame_queue,
+                                        self.event_queue)),
+            ('inference', inference_stage, (weights, backend, settings, self.capture_ring.spec(), frame_queue,
+                                            overlay_queue, arm_queue)),
+            ('annotation', annotation_stage, (self.capture_ring.spec(), self.display_ring.spec(), overlay_queue,
+                                              self.display_queue)),
+            ('arm', arm_stage, (com_port, arm_queue)),
+        ]
+        self.processes = []
+        for name, target, args in stages:
+            if name == 'annotation':
+                args = args + (self.status_queue, self.stop_event, display_width, display_height)
+            else:
+                args = args + (self.status_queue, self.stop_event)
+            kwargs = {'thread_config': thread_config} if name in ('capture', 'inference') else {}
+            if name == 'arm':
+                kwargs = {'output_settings': arm_output_settings, 'baud_rates': baud_rates}
+            self.processes.append(self.context.Process(target=target, args=args, kwargs=kwargs, name=f'gestures-{name}',
+                                                       daemon=True))
+
+        self.stage_status: Dict[str, Dict[str, float]] = {}
+        self.arm_output_status: Optional[Dict[str, Any]] = None
+        self.source_description = ''
+        self.capture_finished = False
+        self.finished = False
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def next_frame(self, timeout: float = 0.5) -> Optional[Tuple[np.ndarray, int, int, float, Dict[str, Any]]]:
+        # Newest display frame as a view into shared memory, release() it once copied. None on timeout
+        # and at the end of a clip, after every frame already captured was shown (finished is set then)
+        self.poll_status()
+        try:
+            entry = self.display_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if entry is END_OF_STREAM:
+            self.finished = True
+            return None
+        display_slot, seq, timestamp, info = entry
+        image = self.display_ring.read(display_slot, seq)
+        if image is None:
+            self.display_ring.release(display_slot)
+            return None
+        return image, display_slot, seq, timestamp, info
+
+    def release(self, display_slot: int):
+        # The display frame was copied out, annotation may draw into the slot again
+        self.display_ring.release(display_slot)
+
+    def poll_status(self):
+        while True:
+            try:
+                message = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'source':
+                self.source_description = message[1]
+            elif message[0] == 'finished':
+                self.capture_finished = True
+        while True:
+            try:
+                message = self.status_queue.get_nowait()
+            except queue.Empty:
+                return
+            if message[0] == 'stage':
+                self.stage_status[message[1]] = message[2]
+            elif message[0] == 'arm_output':
+                self.arm_output_status = message[1]
+
+    def bottleneck(self) -> str:
+        # Stage with the highest busy fraction, the one that bounds the frame rate
+        if not self.stage_status:
+            return 'None'
+        return max(self.stage_status, key=lambda stage: self.stage_status[stage]['busy'])
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {}
+        for stage in ('capture', 'inference', 'annotation', 'arm'):
+            status = self.stage_status.get(stage)
+            if status is not None:
+                text = f"{status['fps']:.1f} fps, {status['busy'] * 100:.0f}% busy"
+                if status['dropped']:
+                    text += f", {status['dropped']} dropped (ring full)"
+                stats[f'{stage.capitalize()} stage'] = text
+        stats['Bottleneck'] = self.bottleneck()
+        if self.arm_output_status is not None:
+            writer_stats = self.arm_output_status['writer']
+            stats['Arm packets'] = arm_output.describe(self.arm_output_status)
+            stats['Serial writer'] = writer.describe(writer_stats)
+            stats['Arm pose (commanded/actual)'] = telemetry.describe_pose(self.arm_output_status['arm_state'])
+            stats['Arm round trip'] = telemetry.describe_round_trip(self.arm_output_status['arm_state'])
+            stats['Serial baud rate'] = writer_stats['baudrate'] if writer_stats['connected'] else 'not connected'
+        return stats
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            # A start() that failed part way leaves the later stages unstarted
+            if process.pid is None:
+                continue
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.capture_ring.close()
+        self.display_ring.close()
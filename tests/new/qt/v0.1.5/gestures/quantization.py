@@ -0,0 +1,112 @@
+import os
+from typing import Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+from gestures import frame_sources
+from gestures.inference_backends import CACHE_DIR, export_weights, weights_hash
+
+QUANTIZATION_MODES = ['dynamic', 'static']
+
+# Input size of the exported model, calibration frames are letterboxed to it like ultralytics does
+CALIBRATION_IMGSZ = 640
+
+
+def quantized_path(weights: str, mode: str, cache_dir: str = CACHE_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(cache_dir, weights_hash(weights), f'{stem}-int8-{mode}.onnx')
+
+
+def letterbox(frame: np.ndarray, imgsz: int = CALIBRATION_IMGSZ) -> np.ndarray:
+    # Same preprocessing as the ultralytics predictor: keep the aspect ratio, pad with gray, RGB, CHW, 0..1
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    image = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_height) // 2, (imgsz - new_width) // 2
+    image[top:top + new_height, left:left + new_width] = resized
+    return np.ascontiguousarray(image[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def calibration_frames(source_spec, count: int = 100, stride: int = 5) -> List[np.ndarray]:
+    # Every stride-th frame of a recorded clip or image directory, so the set covers the whole recording
+    source = frame_sources.open_frame_source(source_spec, realtime=False)
+    frames, index = [], 0
+    try:
+        while len(frames) < count:
+            read, frame = source.read()
+            if not read:
+                break
+            if index % stride == 0:
+                frames.append(frame)
+            index += 1
+    finally:
+        source.release()
+    return frames
+
+
+class FrameCalibrationReader:
+    # onnxruntime CalibrationDataReader over letterboxed frames
+
+    def __init__(self, input_name: str, frames: Iterable[np.ndarray]):
+        self.input_name = input_name
+        self.frames = iter(list(frames))
+
+    def get_next(self) -> Optional[dict]:
+        frame = next(self.frames, None)
+        return None if frame is None else {self.input_name: letterbox(frame)}
+
+    def rewind(self):
+        pass
+
+
+def copy_metadata(source: str, target: str):
+    # ultralytics reads class names, stride and task from the ONNX metadata, the quantizer drops it
+    import onnx
+
+    source_model = onnx.load(source)
+    target_model = onnx.load(target)
+    del target_model.metadata_props[:]
+    for prop in source_model.metadata_props:
+        target_model.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(target_model, target)
+
+
+def quantize_weights(weights: str, mode: str = 'dynamic', frames: Optional[List[np.ndarray]] = None,
+                     cache_dir: str = CACHE_DIR) -> str:
+    # INT8 variant of the ONNX export. Dynamic mode quantizes the weights only, static mode also fixes
+    # the activation ranges from the calibration frames
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f'Invalid quantization mode: {mode}')
+    target = quantized_path(weights, mode, cache_dir)
+    onnx_model = export_weights(weights, 'onnx', cache_dir)
+
+    if mode == 'dynamic':
+        quantize_dynamic(onnx_model, target, weight_type=QuantType.QUInt8)
+    else:
+        if not frames:
+            raise ValueError('Static quantization needs calibration frames')
+        import onnxruntime
+
+        input_name = onnxruntime.InferenceSession(onnx_model, providers=['CPUExecutionProvider']).get_inputs()[0].name
+        quantize_static(onnx_model, target, FrameCalibrationReader(input_name, frames),
+                        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8, per_channel=True)
+    copy_metadata(onnx_model, target)
+    return target
+
+
+def find_quantized(weights: str, cache_dir: str = CACHE_DIR) -> str:
+    # A calibrated (static) model is preferred, the dynamic one needs no calibration and is made on demand
+    static_model = quantized_path(weights, 'static', cache_dir)
+    if os.path.exists(static_model):
+        return static_model
+    dynamic_model = quantized_path(weights, 'dynamic', cache_dir)
+    if os.path.exists(dynamic_model):
+        return dynamic_model
+    print(f"Quantizing {weights} (dynamic INT8), run tools.quantize_model for a calibrated model")
+    return quantize_weights(weights, 'dynamic', cache_dir=cache_dir)
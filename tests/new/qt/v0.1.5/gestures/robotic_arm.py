@@ -1,21 +1,85 @@
-import struct
-import serial
-from PyQt6.QtSerialPort import QSerialPort
-from PyQt6.QtCore import QByteArray
 import numpy as np
-from typing import Tuple, Any
-from numpy import ndarray, dtype, floating, float_
-from numpy._typing import _64Bit
+from dataclasses import dataclass
+from typing import Tuple
+
+
+# Pixel ranges of the hand centroid and the angle ranges they are mapped to
+@dataclass(frozen=True)
+class ArmCalibration:
+    x_min: int = 110
+    x_max: int = 530
+    base_min: int = 0
+    base_max: int = 180
+    y_min: int = 80
+    y_max: int = 400
+    arm2_min: int = 95
+    arm2_max: int = 180
+
+
+# Pixel to angle lookup tables, built once per calibration. np.interp clamps outside the calibrated
+# range, so the tables stop at x_max and y_max and larger coordinates read the last entry
+class AngleMapper:
+
+    def __init__(self, calibration: ArmCalibration = ArmCalibration()):
+        self.calibration = calibration
+
+    @property
+    def calibration(self) -> ArmCalibration:
+        return self._calibration
+
+    @calibration.setter
+    def calibration(self, calibration: ArmCalibration):
+        # A new calibration rebuilds the tables
+        self._calibration = calibration
+        self.build_tables()
+
+    def build_tables(self):
+        c = self._calibration
+        columns = np.arange(max(c.x_min, c.x_max) + 1)
+        rows = np.arange(max(c.y_min, c.y_max) + 1)
+        arm2_angles = np.interp(rows, [c.y_min, c.y_max], [c.arm2_min, c.arm2_max])
+
+        self.base_table = np.interp(columns, [c.x_min, c.x_max], [c.base_min, c.base_max]).astype(np.uint8)
+        self.arm1_table = ((c.arm2_min * c.arm2_max) // arm2_angles).astype(np.uint8)
+        self.arm2_table = arm2_angles.astype(np.uint8)
+
+        # Python lists for the one-centroid-per-frame path, indexing them avoids numpy scalars
+        self.base_list = self.base_table.tolist()
+        self.arm1_list = self.arm1_table.tolist()
+        self.arm2_list = self.arm2_table.tolist()
+        self.last_column = len(self.base_list) - 1
+        self.last_row = len(self.arm2_list) - 1
+
+    def base_angle(self, m_coord_x: float) -> int:
+        return self.base_list[min(max(int(m_coord_x), 0), self.last_column)]
+
+    def arm_angles(self, m_coord_y: float) -> Tuple[int, int]:
+        row = min(max(int(m_coord_y), 0), self.last_row)
+        return self.arm1_list[row], self.arm2_list[row]
+
+    def base_angles(self, m_coords_x: np.ndarray) -> np.ndarray:
+        return self.base_table[np.clip(np.asarray(m_coords_x).astype(np.intp), 0, self.last_column)]
+
+    def arm_angles_batch(self, m_coords_y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.clip(np.asarray(m_coords_y).astype(np.intp), 0, self.last_row)
+        return self.arm1_table[rows], self.arm2_table[rows]
+
+    def angles(self, centroids: np.ndarray) -> np.ndarray:
+        # (N, 2) pixel centroids -> (N, 3) uint8 base, arm1 and arm2 angles
+        centroids = np.asarray(centroids)
+        arm1_angles, arm2_angles = self.arm_angles_batch(centroids[:, 1])
+        return np.stack([self.base_angles(centroids[:, 0]), arm1_angles, arm2_angles], axis=1)
+
+
+angle_mapper = AngleMapper()
+
 
 def calculate_rotating_base_angle(m_coord_x: float) -> int:
-    rotating_base_angle = map(m_coord_x, 110, 530, 0, 180)
-    return int(rotating_base_angle)
+    return angle_mapper.base_angle(m_coord_x)
 
 
 def calculate_angle_hastes(m_coord_y: float) -> Tuple[int, int]:
-    arm2_angle = map(m_coord_y, 80, 400, 95, 180)
-    aux_h1 = (180 * 95) // arm2_angle
-    return int(aux_h1), int(arm2_angle)
+    return angle_mapper.arm_angles(m_coord_y)
 
 
 def calculate_gripper_angle(garra_state: bool) -> Tuple[int, str]:
@@ -37,6 +101,5 @@ def is_moving_axis_y(pixel_threshold: int, prev_m_coord_y: float, m_coord_y: flo
     return False
 
 
-def map(value: float, min_val: float, max_val: float, min_target: float, max_target: float) -> ndarray[
-    Any, dtype[floating[_64Bit] | float_]]:
+def map(value: float, min_val: float, max_val: float, min_target: float, max_target: float) -> np.ndarray:
     return np.interp(value, [min_val, max_val], [min_target, max_target])
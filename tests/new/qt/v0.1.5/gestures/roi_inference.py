@@ -0,0 +1,84 @@
+import math
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from gestures import detection_infos
+
+STRIDE = 32
+FULL_FRAME_IMGSZ = 640
+
+
+def roi_window(frame_width: int, frame_height: int, margin: int) -> Tuple[int, int, int, int]:
+    # Control rectangle grown by the margin and clipped to the frame
+    x0 = max(0, detection_infos.rect_top_left_x - margin)
+    y0 = max(0, detection_infos.rect_top_left_y - margin)
+    x1 = min(frame_width, detection_infos.rect_bottom_right_x + margin)
+    y1 = min(frame_height, detection_infos.rect_bottom_right_y + margin)
+    return x0, y0, x1, y1
+
+
+def roi_imgsz(crop_width: int, crop_height: int, frame_width: int, frame_height: int,
+              full_imgsz: int = FULL_FRAME_IMGSZ) -> int:
+    # Keeps the pixel scale the model sees on the full frame, so the letterboxed
+    # input shrinks with the crop instead of being upscaled back to full size
+    scale = min(1.0, full_imgsz / max(frame_width, frame_height))
+    return max(STRIDE, int(math.ceil(max(crop_width, crop_height) * scale / STRIDE)) * STRIDE)
+
+
+# Runs the hand model only on the control rectangle (plus a margin) while a hand is being followed,
+# and goes back to searching the whole frame once the hand has been missing for lost_frames frames
+class RoiInference:
+
+    def __init__(self, margin: int = 20, lost_frames: int = 5, full_imgsz: int = FULL_FRAME_IMGSZ):
+        self.margin = margin
+        self.lost_frames = lost_frames
+        self.full_imgsz = full_imgsz
+        self.full_frame_search = True
+        self.frames_without_hand = 0
+
+        # Counters
+        self.roi_runs = 0
+        self.full_frame_runs = 0
+
+    def infer(self, model: Any, frame: np.ndarray, **kwargs) -> Tuple[Any, Optional[Tuple[int, int, int, int]]]:
+        # Returns the model results and the crop window they refer to (None for the full frame)
+        height, width = frame.shape[:2]
+        if self.full_frame_search:
+            self.full_frame_runs += 1
+            return model(source=frame, imgsz=self.full_imgsz, **kwargs), None
+
+        x0, y0, x1, y1 = roi_window(width, height, self.margin)
+        crop = frame[y0:y1, x0:x1]
+        imgsz = roi_imgsz(x1 - x0, y1 - y0, width, height, self.full_imgsz)
+        self.roi_runs += 1
+        return model(source=crop, imgsz=imgsz, **kwargs), (x0, y0, x1, y1)
+
+    def update(self, hand_found: bool, hand_in_range: bool):
+        if self.full_frame_search:
+            # A hand inside the control rectangle was found, follow it with the crop
+            if hand_in_range:
+                self.full_frame_search = False
+                self.frames_without_hand = 0
+        elif hand_found:
+            self.frames_without_hand = 0
+        else:
+            self.frames_without_hand += 1
+            if self.frames_without_hand >= self.lost_frames:
+                self.full_frame_search = True
+
+    def stats(self) -> dict:
+        return {
+            'roi_runs': self.roi_runs,
+            'full_frame_runs': self.full_frame_runs,
+        }
+
+
+def to_full_frame(detections: np.ndarray, window: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+    # Shifts (N, 6) xyxy/conf/cls detections from crop coordinates back to the full frame
+    if window is None or len(detections) == 0:
+        return detections
+    detections = detections.copy()
+    detections[:, [0, 2]] += window[0]
+    detections[:, [1, 3]] += window[1]
+    return detections
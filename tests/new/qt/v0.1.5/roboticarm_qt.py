@@ -2,20 +2,28 @@ import os
 import sys
 import time
 import webbrowser
-import serial
 import struct
 import pyaudio
 import cv2
-import librosa
 import numpy as np
-import tensorflow as tf
-from IPython.display import clear_output
+from gestures import arm_kinematics
+from gestures import arm_output
 from gestures import detection_infos
-from gestures import robotic_arm
 from gestures import available_capture_devices
-from audio.file_operations import create_temp_audio_file, create_temp_image_file
-from audio.audio_helpers import butter_bandpass_filter
-from ultralytics import YOLO
+from gestures import capture_profiles
+from gestures import centroid_filters
+from gestures import frame_sources
+from gestures import inference_backends
+from gestures.async_inference import AsyncInference
+from gestures.frame_grabber import FrameGrabber
+from gestures.gesture_pipeline import build_pipeline
+from gestures.presentation import FramePresenter
+from gestures.process_pipeline import ProcessPipeline
+from runtime.model_registry import registry
+from serial_link import link
+from serial_link import telemetry
+from serial_link import writer
+from runtime import thread_config
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
@@ -23,6 +31,8 @@ from PyQt6 import uic
 from PyQt6.QtSerialPort import QSerialPort, QSerialPortInfo
 
 VERSION = "0.1.5"
+HAND_WEIGHTS = './src/misc/weight-hand-segmentation-v14.pt'
+VOICE_MODEL = './src/misc/model.keras'
 
 # Default values
 detected = False
@@ -66,8 +76,16 @@ class RoboticArmMenu(QWidget):
 
         # Start button loads execution window and hides the menu window
         self.execution_window = None
+        self.execution_windows = {}
         self.start_button.clicked.connect(self.show_execution_window)
 
+        # Thread pools are sized before any model runs, inter-op threads can only be set once
+        thread_config.apply_library_threads(thread_config.from_settings(self.setup_window.extra_settings))
+
+        # The model of the configured control method loads in the background meanwhile
+        register_models()
+        self.preload_model(self.setup_window.get_control_method())
+
     def redirect_to_github(self):
         webbrowser.open('https://github.com/heltonmaia/ECT-proj-roboticArm/')
 
@@ -75,23 +93,35 @@ class RoboticArmMenu(QWidget):
         self.setup_window.show()
         self.hide()
 
+    def preload_model(self, control_method):
+        # In the process pipeline the hand model lives in the inference process instead
+        if control_method == "gestures" and self.setup_window.extra_settings.get('pipeline_mode') != "process":
+            registry.preload(hand_model_name(self.setup_window.inference_backend, self.setup_window.output_mode))
+        elif control_method == "voice":
+            registry.preload('voice')
+
     def show_execution_window(self):
         # Reads setup values again before showing execution window
         control_method = self.setup_window.get_control_method()
+        self.preload_model(control_method)
 
-        if control_method == "gestures":
-            self.execution_window = RoboticArmGesturesExecution()
-        elif control_method == "voice":
-            self.execution_window = RoboticArmAudioExecution()
-        else:
-            self.execution_window = None
+        # Execution windows and their threads are built once and shown again on later clicks
+        if control_method not in self.execution_windows:
+            if control_method == "gestures":
+                self.execution_windows[control_method] = RoboticArmGesturesExecution()
+            elif control_method == "voice":
+                self.execution_windows[control_method] = RoboticArmAudioExecution()
+        self.execution_window = self.execution_windows.get(control_method)
 
         if self.execution_window:
             self.execution_window.show()
             self.hide()
 
 class RoboticArmSetup(QWidget):
-    available_devices = available_capture_devices.capture_devices()
+
+    # setup.txt keys edited in this window, the other keys belong to the tools and the execution threads
+    SETUP_KEYS = ('com_port', 'capture_device', 'control_method', 'inference_region', 'capture_profile',
+                  'inference_backend', 'output_mode')
 
     def __init__(self):
         super().__init__()
@@ -103,6 +133,12 @@ class RoboticArmSetup(QWidget):
         self.COM = 3
         self.cap_device = 0
         self.control_method = "gestures"
+        self.inference_region = "full"
+        self.capture_profile = "default"
+        self.inference_backend = "pytorch"
+        self.output_mode = "masks"
+        # Settings without a widget in this window, kept as they are when the file is rewritten
+        self.extra_settings = {}
         self.read_setup_file()
 
         # Set default values for the items
@@ -110,15 +146,79 @@ class RoboticArmSetup(QWidget):
         self.capture_device_text.setText(str(self.cap_device))
         self.control_method_box.addItems(["gestures", "voice"])
         self.control_method_box.setCurrentText(self.control_method)
+        self.inference_region_box.addItems(["full", "roi"])
+        self.inference_region_box.setCurrentText(self.inference_region)
+        self.capture_profile_box.addItems(capture_profiles.PROFILES)
+        if self.capture_profile not in capture_profiles.PROFILES:
+            self.capture_profile_box.addItem(self.capture_profile)
+        self.capture_profile_box.setCurrentText(self.capture_profile)
+        self.inference_backend_box.addItems(inference_backends.BACKENDS)
+        self.inference_backend_box.setCurrentText(self.inference_backend)
+        self.output_mode_box.addItems(inference_backends.OUTPUT_MODES)
+        self.output_mode_box.setCurrentText(self.output_mode)
 
         # Connect signals to change the default values for the items
         self.com_port_text.textChanged.connect(self.validate_com_port)
         self.capture_device_text.textChanged.connect(self.validate_capture_device)
         self.control_method_box.currentTextChanged.connect(self.update_control_method)
+        self.inference_region_box.currentTextChanged.connect(self.update_inference_region)
+        self.capture_profile_box.currentTextChanged.connect(self.update_capture_profile)
+        self.inference_backend_box.currentTextChanged.connect(self.update_inference_backend)
+        self.output_mode_box.currentTextChanged.connect(self.update_output_mode)
 
         # Ok button closes the setup window, saves the values and shows the menu window again
         self.ok_button.clicked.connect(self.show_menu_window)
 
+        # The cached list holds while the cameras are the same as when it was written, otherwise the
+        # capture devices are searched in the background
+        cached_devices = available_capture_devices.read_cache()
+        self.available_devices = cached_devices or []
+        self.device_signature = available_capture_devices.device_signature()
+        self.device_discovery = DeviceDiscoveryThread()
+        self.device_discovery.device_found_signal.connect(self.device_found_slot)
+        self.device_discovery.discovery_finished_signal.connect(self.discovery_finished_slot)
+        if cached_devices is None:
+            self.start_device_discovery()
+        else:
+            self.update_available_devices_info(searching=False)
+
+        # Searches again when a camera is plugged or unplugged, where the platform lets us tell
+        self.hotplug_timer = QTimer(self)
+        self.hotplug_timer.timeout.connect(self.check_hotplug)
+        if self.device_signature is not None:
+            self.hotplug_timer.start(2000)
+
+    def start_device_discovery(self):
+        if not self.device_discovery.isRunning():
+            self.update_available_devices_info(searching=True)
+            # Cameras whose probe does not answer in time keep the state they have now
+            self.device_discovery.known_devices = list(self.available_devices)
+            self.device_discovery.start()
+
+    def check_hotplug(self):
+        signature = available_capture_devices.device_signature()
+        if signature != self.device_signature:
+            self.device_signature = signature
+            self.start_device_discovery()
+
+    def device_found_slot(self, device_id):
+        if device_id not in self.available_devices:
+            self.available_devices.append(device_id)
+            self.available_devices.sort()
+        self.update_available_devices_info(searching=True)
+        self.validate_capture_device(self.capture_device_text.text())
+
+    def discovery_finished_slot(self, devices):
+        self.available_devices = list(devices)
+        self.update_available_devices_info(searching=False)
+        self.validate_capture_device(self.capture_device_text.text())
+
+    def update_available_devices_info(self, searching):
+        devices = ', '.join(str(i) for i in self.available_devices) or 'None'
+        info = f'Available cameras: {devices}' + (' (searching...)' if searching else '')
+        self.capture_device_label.setToolTip(info)
+        self.capture_device_text.setToolTip(info)
+
     def read_setup_file(self):
         if os.path.exists('setup.txt'):
             with open('setup.txt', 'r') as setup_file:
@@ -128,9 +228,20 @@ class RoboticArmSetup(QWidget):
                     if line.startswith('com_port='):
                         self.COM = int(line.split('=')[1])
                     elif line.startswith('capture_device='):
-                        self.cap_device = int(line.split('=')[1])
+                        self.cap_device = frame_sources.parse_capture_device(line.split('=')[1])
                     elif line.startswith('control_method='):
                         self.control_method = str(line.split('=')[1])
+                    elif line.startswith('inference_region='):
+                        self.inference_region = str(line.split('=')[1])
+                    elif line.startswith('capture_profile='):
+                        self.capture_profile = str(line.split('=')[1])
+                    elif line.startswith('inference_backend='):
+                        self.inference_backend = str(line.split('=')[1])
+                    elif line.startswith('output_mode='):
+                        self.output_mode = str(line.split('=')[1])
+                    elif '=' in line:
+                        key, value = line.split('=', 1)
+                        self.extra_settings[key] = value
 
     def get_capture_device(self):
         return self.cap_device
@@ -140,10 +251,16 @@ class RoboticArmSetup(QWidget):
 
     def show_menu_window(self):
         if self.com_port_text.text() != '' and self.capture_device_text.text() != '':
-            if int(self.capture_device_text.text()) in self.available_devices:
+            if self.is_valid_capture_device(self.capture_device_text.text()):
                 menu_window.show()
                 self.close()
 
+    def is_valid_capture_device(self, text):
+        # Camera indexes must have answered, recorded clips and synthetic sources must exist
+        if text.isdigit():
+            return int(text) in self.available_devices
+        return frame_sources.is_offline_source(text)
+
     def validate_com_port(self, text):
         try:
             if not text:
@@ -162,18 +279,16 @@ class RoboticArmSetup(QWidget):
         try:
             if not text:
                 self.capture_device_label.setStyleSheet("QLabel { color: red; }")
-            elif not text.isdigit():
+            elif self.is_valid_capture_device(text):
                 self.capture_device_label.setStyleSheet("QLabel { color: white; }")
-                self.capture_device_text.setText(text[:-1])
-            else:
-                device_id = int(text)
-                if device_id in self.available_devices:
-                    self.capture_device_label.setStyleSheet("QLabel { color: white; }")
-                    self.cap_device = int(text)
+                # Discovery results validate the same text again, only a different device is saved
+                cap_device = frame_sources.parse_capture_device(text)
+                if cap_device != self.cap_device:
+                    self.cap_device = cap_device
                     self.update_setup_file()
-                else:
-                    self.capture_device_label.setStyleSheet("QLabel { color: red; }")
-                    print("Device not available")
+            else:
+                self.capture_device_label.setStyleSheet("QLabel { color: red; }")
+                print("Device not available")
         except Exception as e:
             print("Error while updating capture device:", e)
 
@@ -181,12 +296,48 @@ class RoboticArmSetup(QWidget):
         self.control_method = text
         self.update_setup_file()
 
+    def update_inference_region(self, text):
+        self.inference_region = text
+        self.update_setup_file()
+
+    def update_capture_profile(self, text):
+        self.capture_profile = text
+        self.update_setup_file()
+
+    def update_inference_backend(self, text):
+        self.inference_backend = text
+        self.update_setup_file()
+
+    def update_output_mode(self, text):
+        self.output_mode = text
+        self.update_setup_file()
+
+    def read_extra_settings(self):
+        # Keys without a widget here as the file holds them now, the tools and the execution threads
+        # may have saved some since this window read it
+        extra_settings = {}
+        if os.path.exists('setup.txt'):
+            with open('setup.txt', 'r') as setup_file:
+                for line in setup_file:
+                    line = line.strip()
+                    if '=' in line and line.split('=', 1)[0] not in self.SETUP_KEYS:
+                        key, value = line.split('=', 1)
+                        extra_settings[key] = value
+        return extra_settings
+
     def update_setup_file(self):
         try:
+            self.extra_settings = self.read_extra_settings()
             with open('setup.txt', 'w') as setup_file:
                 setup_file.write(f'com_port={self.COM}\n')
                 setup_file.write(f'capture_device={self.cap_device}\n')
-                setup_file.write(f'control_method={self.control_method}')
+                setup_file.write(f'control_method={self.control_method}\n')
+                setup_file.write(f'inference_region={self.inference_region}\n')
+                setup_file.write(f'capture_profile={self.capture_profile}\n')
+                setup_file.write(f'inference_backend={self.inference_backend}\n')
+                setup_file.write(f'output_mode={self.output_mode}')
+                for key, value in self.extra_settings.items():
+                    setup_file.write(f'\n{key}={value}')
         except Exception as e:
             print("Error while updating setup.txt:", e)
 
@@ -213,6 +364,7 @@ class RoboticArmGesturesExecution(QWidget):
         self.thread_1 = thread_1()
         self.thread_1.image_update_signal.connect(self.image_update_slot)
         self.thread_1.info_update_signal.connect(self.info_update_slot)
+        self.thread_1.stats_update_signal.connect(self.stats_update_slot)
 
         # Camera feed widget
         self.camera_feed_widget = self.findChild(QWidget, 'camera_feed_widget')
@@ -228,6 +380,7 @@ class RoboticArmGesturesExecution(QWidget):
             self.state_info.setText("None")
             self.direction_info.setText("None")
             self.fps_info.setText("None")
+            self.stats_info.setText("None")
         else:
             self.start_stop_button.setText("Stop")
 
@@ -249,7 +402,10 @@ class RoboticArmGesturesExecution(QWidget):
         self.direction_info.setText(str(direction))
         self.fps_info.setText(str(fps))
 
-    def image_update_slot(self, image):
+    def stats_update_slot(self, stats):
+        self.stats_info.setText('\n'.join(f'{key}: {value}' for key, value in stats.items()))
+
+    def image_update_slot(self, image, buffer_index):
         try:
             if image is not None and not image.isNull():
                 self.camera_feed_widget.setPixmap(QPixmap.fromImage(image))
@@ -257,9 +413,15 @@ class RoboticArmGesturesExecution(QWidget):
                 print("Invalid image")
         except Exception as e:
             print("Error while updating image:", e)
+        finally:
+            # The pixmap holds its own copy, the frame buffer can be reused by thread_1
+            self.thread_1.presenter.release(buffer_index)
 
     def start_stop_feed_slot(self):
         if not self.thread_1.isRunning():
+            # The window is reused, settings may have changed since the last run
+            self.thread_1.read_setup_file()
+            self.thread_1.ThreadActive = True
             self.thread_1.start()
             self.start_stop_button.setText("Stop")
         else:
@@ -297,6 +459,9 @@ class RoboticArmAudioExecution(QWidget):
 
     def start_stop_feed_slot(self):
         if not self.thread_2.isRunning():
+            # The window is reused, settings may have changed since the last run
+            self.thread_2.read_setup_file()
+            self.thread_2.ThreadActive = True
             self.thread_2.start()
             self.start_stop_button.setText("Stop")
         else:
@@ -314,6 +479,61 @@ class RoboticArmAudioExecution(QWidget):
         self.confidence.setText(str(confidence))
 
 
+# Models shared by every execution window, registered once and loaded on first use
+def hand_model_name(backend, output_mode):
+    return f'hand-{backend}-{output_mode}'
+
+
+def load_hand_model(backend, output_mode):
+    return inference_backends.load_model(HAND_WEIGHTS, backend, output_mode)
+
+
+def warm_up_hand_model(model):
+    # The first call also builds the ultralytics predictor
+    model(source=np.zeros((480, 640, 3), dtype=np.uint8), conf=0.6, verbose=False)
+
+
+def load_voice_model():
+    # TensorFlow is only imported by the voice control, the pipeline processes re-import this module
+    import tensorflow as tf
+    return tf.keras.models.load_model(VOICE_MODEL)
+
+
+def warm_up_voice_model(model):
+    model.predict(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), verbose=0)
+
+
+def describe_filter(centroid_filter):
+    if centroid_filter is None:
+        return 'none'
+    return centroid_filter.name + ' ' + ', '.join(f'{key} {value:g}' for key, value in centroid_filter.params().items())
+
+
+def register_models():
+    for backend in inference_backends.BACKENDS:
+        for output_mode in inference_backends.OUTPUT_MODES:
+            registry.register(hand_model_name(backend, output_mode),
+                              lambda backend=backend, output_mode=output_mode: load_hand_model(backend, output_mode),
+                              warm_up_hand_model)
+    registry.register('voice', load_voice_model, warm_up_voice_model)
+
+
+# Thread to search the available capture devices without blocking the GUI
+class DeviceDiscoveryThread(QThread):
+
+    device_found_signal = pyqtSignal(int)
+    discovery_finished_signal = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.known_devices = []
+
+    def run(self):
+        devices = available_capture_devices.discover_devices(on_found=self.device_found_signal.emit,
+                                                             known=self.known_devices)
+        self.discovery_finished_signal.emit(devices)
+
+
 # Thread to handle the camera feed
 class thread_1(QThread):
 
@@ -322,7 +542,27 @@ class thread_1(QThread):
 
         self.ThreadActive = True
         self.mutex = QMutex()
+        self.presenter = FramePresenter(640, 480)
+        self.setup_time = None
+        self.read_setup_file()
 
+    def read_setup_file(self):
+        # Defaults on every read, a key removed from setup.txt since the last Start goes back to its default
+        self.inference_region = "full"
+        self.capture_profile = "default"
+        self.motion_gating = "off"
+        self.detect_every = 1
+        self.pipeline_mode = "thread"
+        self.inference_backend = "pytorch"
+        self.output_mode = "masks"
+        self.inference_size = 640
+        self.inference_depth = 2
+        self.arm_mapping = "heuristic"
+        self.thread_settings = {}
+        self.arm_settings = {}
+        self.filter_settings = {}
+        self.arm_output_settings = {}
+        self.baud_rates = link.FAST_BAUD_RATES
         if os.path.exists('setup.txt'):
             with open('setup.txt', 'r') as setup_file:
                 lines = setup_file.readlines()
@@ -331,52 +571,123 @@ class thread_1(QThread):
                     if line.startswith('com_port='):
                         self.COM = int(line.split('=')[1])
                     elif line.startswith('capture_device='):
-                        self.cap_device = int(line.split('=')[1])
+                        self.cap_device = frame_sources.parse_capture_device(line.split('=')[1])
                     elif line.startswith('control_method='):
                         self.control_method = str(line.split('=')[1])
+                    elif line.startswith('inference_region='):
+                        self.inference_region = str(line.split('=')[1])
+                    elif line.startswith('capture_profile='):
+                        self.capture_profile = str(line.split('=')[1])
+                    elif line.startswith('motion_gating='):
+                        self.motion_gating = str(line.split('=')[1])
+                    elif line.startswith('detect_every='):
+                        self.detect_every = int(line.split('=')[1])
+                    elif line.startswith('pipeline_mode='):
+                        self.pipeline_mode = str(line.split('=')[1])
+                    elif line.startswith('inference_backend='):
+                        self.inference_backend = str(line.split('=')[1])
+                    elif line.startswith('output_mode='):
+                        self.output_mode = str(line.split('=')[1])
+                    elif line.startswith('inference_size='):
+                        self.inference_size = int(line.split('=')[1])
+                    elif line.startswith('inference_depth='):
+                        self.inference_depth = int(line.split('=')[1])
+                    elif line.startswith('arm_mapping='):
+                        self.arm_mapping = str(line.split('=')[1])
+                    elif line.split('=')[0] in thread_config.THREAD_SETTINGS:
+                        self.thread_settings[line.split('=')[0]] = line.split('=')[1]
+                    elif line.split('=')[0] in arm_kinematics.ARM_SETTINGS:
+                        self.arm_settings[line.split('=')[0]] = line.split('=')[1]
+                    elif line.split('=')[0] in centroid_filters.FILTER_SETTINGS:
+                        self.filter_settings[line.split('=')[0]] = line.split('=')[1]
+                    elif line.split('=')[0] in arm_output.ARM_OUTPUT_SETTINGS:
+                        self.arm_output_settings[line.split('=')[0]] = line.split('=')[1]
+                    elif line.startswith('baud_rates='):
+                        self.baud_rates = link.parse_baud_rates(line.split('=')[1])
         else:
             # Default values
             self.COM = 3
             self.cap_device = 0
             self.control_method = "gestures"
 
-    image_update_signal = pyqtSignal(QImage)
-    info_update_signal = pyqtSignal(int, int, bool, bool, tuple, str, str, int)
+    image_update_signal = pyqtSignal(QImage, int)
+    info_update_signal = pyqtSignal(str, int, bool, bool, tuple, str, str, int)
+    stats_update_signal = pyqtSignal(dict)
 
     def run(self):
 
-        # Serial port configuration
-        try:
-            self.arm = serial.Serial(f'COM{self.COM}', 9600, timeout=0.2)
-            if not self.arm.isOpen():
-                self.arm.open()
-        except Exception as e:
-            pass
+        threads = thread_config.from_settings(self.thread_settings)
+        if self.pipeline_mode == "process":
+            self.run_process_pipeline(threads)
+            return
+
+        # Thread pools. Only the capture and inference workers are pinned, this thread just draws and
+        # would compete with the model on the inference cores
+        thread_config.apply_library_threads(threads)
+
+        # Loaded and warmed up once per process, later runs get the same instance
+        model_name = hand_model_name(self.inference_backend, self.output_mode)
+        model = registry.get(model_name)
+        model_stats = registry.stats(model_name)
+        pipeline = build_pipeline(model, self.inference_region, self.motion_gating, self.detect_every,
+                                  conf=0.6, pixel_threshold=pixel_threshold, output_mode=self.output_mode,
+                                  inference_size=self.inference_size, arm_mapping=self.arm_mapping,
+                                  arm_settings=self.arm_settings, filter_settings=self.filter_settings)
+        self.setup_time = os.path.getmtime('setup.txt') if os.path.exists('setup.txt') else None
+        setup_check_time = time.perf_counter()
+        cap = frame_sources.open_frame_source(self.cap_device,
+                                              profile=capture_profiles.parse_profile(self.capture_profile))
+        granted_profile = str(getattr(cap, 'granted', cap.description()))
+
+        # The writer thread opens the port at the fastest rate the firmware agrees to, writes and reconnects,
+        # the loop below only hands it poses. Started once the model and the source are ready
+        self.arm = writer.SerialWriter(f'COM{self.COM}', self.baud_rates)
+        self.arm.start()
+
+        # Only poses that differ from the last sent one go out, at most as fast as the link carries them
+        arm_commands = arm_output.from_settings(self.arm, self.arm_output_settings, self.arm.baudrate)
+
+        # Capture runs in its own thread, inference always takes the newest frame
+        grabber = FrameGrabber(cap, cores=threads.capture_cores)
+
+        # Inference runs in its own thread, with depth 2 the next forward pass overlaps the drawing below
+        inference = AsyncInference(pipeline, grabber, depth=self.inference_depth, cores=threads.inference_cores)
 
-        model = YOLO('./src/misc/weight-hand-segmentation-v14.pt')
-        cap = cv2.VideoCapture(self.cap_device)
-        prev_m_coord_x = 0
-        prev_m_coord_y = 0
         prev_frame_time = 0
         new_frame_time = 0
-        pixel_threshold = 5
         rtlx = detection_infos.rect_top_left_x
         rtly = detection_infos.rect_top_left_y
         rbrx = detection_infos.rect_bottom_right_x
         rbry = detection_infos.rect_bottom_right_y
 
-        while self.ThreadActive:
+        try:
+            grabber.start()
+            inference.start()
+            self.presenter.reset()
+
+            while self.ThreadActive:
 
-            read, frame = cap.read()
+                # Oldest finished frame, the worker is already running the model on the next one
+                try:
+                    result = inference.next_result(timeout=0.5)
+                except Exception as e:
+                    print("Error while running inference:", e)
+                    break
 
-            if read:
+                if result is None:
+                    if inference.finished():
+                        # End of a recorded clip
+                        break
+                    continue
 
-                # Uses our model in the frame
-                results = model(source=frame, conf=0.6)
-                boxes = results[0].boxes.cpu().numpy()
+                frame = result.frame
+                frame_time = result.frame_time
+                gesture = result.gesture
 
-                best_detection = None
-                best_score = 0
+                # Centroid filter changes in setup.txt are picked up while running
+                if time.perf_counter() - setup_check_time > 1.0:
+                    setup_check_time = time.perf_counter()
+                    self.reload_filter_settings(pipeline)
 
                 # FPS counter
                 new_frame_time = time.time()
@@ -384,94 +695,189 @@ class thread_1(QThread):
                 prev_frame_time = new_frame_time
                 fps = int(fps)
 
-                # Process individual information for every hand in the frame
-                for box in boxes:
-
-                    if box.cls in [0, 1]:
-
-                        # Calculates most of the needed information
-                        rect_coord = box.data[0][:4]
-                        conf = box.data[0][4]
-                        area = detection_infos.calculate_area(rect_coord)
-                        m_coord_x = int((box.xyxy[0][2] + box.xyxy[0][0]) / 2)
-                        m_coord_y = int((box.xyxy[0][1] + box.xyxy[0][3]) / 2)
-                        area_location = [int(box.xyxy[0][0]), int(box.xyxy[0][3])]
-                        hand_position = (m_coord_x, m_coord_y)
-                        in_range = detection_infos.is_in_range(m_coord_x, m_coord_y)
-                        score = detection_infos.calculate_score(area, conf)
-                        direction = detection_infos.calculate_direction(pixel_threshold, m_coord_x, m_coord_y, prev_m_coord_x, prev_m_coord_y)
-
-                        if robotic_arm.is_moving_axis_x(pixel_threshold, prev_m_coord_x, m_coord_x):
-                            rotating_base_angle = robotic_arm.calculate_rotating_base_angle(m_coord_x)
-                            prev_m_coord_x = m_coord_x
-                        if robotic_arm.is_moving_axis_y(pixel_threshold, prev_m_coord_y, m_coord_y):
-                            arm1_angle, arm2_angle = robotic_arm.calculate_angle_hastes(m_coord_y)
-                            prev_m_coord_y = m_coord_y
-
-                        if score > best_score:
-                            best_score = score
-                            best_detection = box
-
-                        if best_detection is not None:
-                            detected = True
-                            gripper_angle, state = robotic_arm.calculate_gripper_angle(best_detection.cls)
-                            detected = True
-                            if best_detection.cls == 0:
-                                hand_class = 'Closed Hand'
-                                state = "Closed"
-                            elif best_detection.cls == 1:
-                                hand_class = 'Open Hand'
-                                state = "Open"
-                        else:
-                            detected = False
-                            in_range = False
-                            hand_class = 'None'
-                            state = hand_class
-
-                        if in_range:
-                            self.arm.write(struct.pack('BBBB', rotating_base_angle, gripper_angle, arm1_angle, arm2_angle))
-
-                if best_detection is None:
-                    detected = False
-                    in_range = False
-
-                # Image processing
-                annotated_frame = results[0].plot(boxes=False)
-                flipped_annotated_frame = cv2.flip(annotated_frame, 1)
-                image = cv2.cvtColor(flipped_annotated_frame, cv2.COLOR_BGR2RGB)
-                flipped_image = cv2.flip(image, 1)
+                if self.arm.baudrate != arm_commands.baudrate:
+                    arm_commands.set_baudrate(self.arm.baudrate)
+                for packet in gesture.packets:
+                    arm_commands.submit(packet)
+                arm_commands.poll()
+
+                detected = gesture.detected
+                in_range = gesture.in_range
+                hand_position = gesture.hand_position
+                state = gesture.state
+                direction = gesture.direction
+                m_coord_x = gesture.m_coord_x
+                m_coord_y = gesture.m_coord_y
+
+                # Image processing, masks from plot(), boxes or nothing depending on the output mode
+                annotation_start_time = time.perf_counter()
+                annotated_frame = pipeline.annotate(frame, gesture)
+                annotation_time = time.perf_counter() - annotation_start_time
 
                 try:
-                    if in_range:
-                        cv2.rectangle(flipped_image, (rtlx, rtly), (rbrx, rbry), (255, 0, 0), 3)
-                        cv2.putText(frame, f'Area: {area:.2f}', (area_location[0], area_location[1]),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
-                    else:
-                        cv2.rectangle(flipped_image, (rtlx, rtly), (rbrx, rbry), (255, 0, 0), 3)
+                    cv2.rectangle(annotated_frame, (rtlx, rtly), (rbrx, rbry), (0, 0, 255), 3)
 
                     if direction != "Still":
-                        cv2.circle(flipped_image, (m_coord_x, m_coord_y), 3, (0, 255, 0), 2)
+                        cv2.circle(annotated_frame, (m_coord_x, m_coord_y), 3, (0, 255, 0), 2)
                     else:
-                        cv2.circle(flipped_image, (m_coord_x, m_coord_y), 3, (255, 255, 255), 2)
+                        cv2.circle(annotated_frame, (m_coord_x, m_coord_y), 3, (255, 255, 255), 2)
 
                 except Exception as e:
                     print(e)
 
-                converted_image = QImage(flipped_image.data,
-                                         flipped_image.shape[1],
-                                         flipped_image.shape[0],
-                                         QImage.Format.Format_RGB888)
-                final_image = converted_image.scaled(640, 480, Qt.AspectRatioMode.KeepAspectRatio)
+                # Converts to RGB at display size into a reused buffer shared with the QImage
+                presented = self.presenter.present(annotated_frame)
+                if presented is not None:
+                    buffer_index, display_image = presented
+                    converted_image = QImage(display_image.data,
+                                             display_image.shape[1],
+                                             display_image.shape[0],
+                                             display_image.strides[0],
+                                             QImage.Format.Format_RGB888)
+                    self.image_update_signal.emit(converted_image, buffer_index)
+                try:
+                    self.info_update_signal.emit(str(self.cap_device), self.COM, detected, in_range, hand_position, state, direction, fps)
+                except Exception as e:
+                    print(e)
+
+                grabber_stats = grabber.stats()
+                writer_stats = self.arm.stats()
+                arm_state_stats = self.arm.arm_state.stats()
+                self.stats_update_signal.emit({
+                    'Capture profile': granted_profile,
+                    'Captured frames': grabber_stats['captured_frames'],
+                    'Dropped frames': grabber_stats['dropped_frames'],
+                    'Frame latency (ms)': int((time.perf_counter() - frame_time) * 1000),
+                    'Inference (ms)': round(gesture.inference_time * 1000, 1),
+                    'Post-processing (ms)': round(gesture.postprocess_time * 1000, 1),
+                    'Annotation (ms)': round(annotation_time * 1000, 1),
+                    'Skipped display frames': self.presenter.skipped_frames,
+                    'Inference backend': self.inference_backend,
+                    'Output mode': self.output_mode,
+                    'Inference size': self.inference_size,
+                    'Inference depth': inference.depth,
+                    'Arm mapping': self.arm_mapping,
+                    'Arm packets': arm_output.describe(arm_commands.stats()),
+                    'Serial writer': writer.describe(writer_stats),
+                    'Arm pose (commanded/actual)': telemetry.describe_pose(arm_state_stats),
+                    'Arm round trip': telemetry.describe_round_trip(arm_state_stats),
+                    'Serial baud rate': writer_stats['baudrate'] if writer_stats['connected'] else 'not connected',
+                    'Centroid filter': describe_filter(pipeline.centroid_filter),
+                    'Frames in flight': inference.in_flight(),
+                    'Intra/inter-op threads': f'{threads.intra_op_threads or "default"}/{threads.inter_op_threads or "default"}',
+                    'OpenCV threads': cv2.getNumThreads(),
+                    'Capture/inference cores': f'{thread_config.format_cores(threads.capture_cores)}/'
+                                               f'{thread_config.format_cores(threads.inference_cores)}',
+                    'Model load (s)': model_stats['load_time'],
+                    'Model warm-up (s)': model_stats['warmup_time'],
+                    'Inference region': 'full' if gesture.window is None else 'roi',
+                    'Inference runs': pipeline.inference_runs,
+                    'Inference skipped': pipeline.reused_frames,
+                    'Tracked frames': pipeline.tracked_frames,
+                })
+
+                # Drawing is done, the worker may take the next frame
+                inference.release()
+        finally:
+            # Release the camera access and the serial port, also when the loop above stopped on an error
+            inference.stop()
+            grabber.stop()
+            cap.release()
+            self.arm.stop()
+
+    def reload_filter_settings(self, pipeline):
+        # Only the centroid filter is applied on the fly, every other key waits for the next start
+        try:
+            setup_time = os.path.getmtime('setup.txt')
+        except OSError:
+            return
+        if setup_time == self.setup_time:
+            return
+        self.setup_time = setup_time
+
+        filter_settings = {}
+        with open('setup.txt', 'r') as setup_file:
+            for line in setup_file:
+                line = line.strip()
+                if line.split('=')[0] in centroid_filters.FILTER_SETTINGS:
+                    filter_settings[line.split('=')[0]] = line.split('=')[1]
+        try:
+            # Swapped in by the inference worker between two frames, never while it filters one
+            pipeline.request_filter_settings(filter_settings)
+            self.filter_settings = filter_settings
+        except ValueError as e:
+            print("Error while reading the centroid filter settings:", e)
+
+    def run_process_pipeline(self, threads):
+
+        # Capture, inference, annotation and the serial port each run in their own process
+        pipeline = ProcessPipeline(self.cap_device, capture_profiles.parse_profile(self.capture_profile),
+                                   HAND_WEIGHTS, self.inference_backend,
+                                   {'inference_region': self.inference_region,
+                                    'motion_gating': self.motion_gating,
+                                    'detect_every': self.detect_every,
+                                    'pixel_threshold': pixel_threshold,
+                                    'output_mode': self.output_mode,
+                                    'inference_size': self.inference_size,
+                                    'arm_mapping': self.arm_mapping,
+                                    'arm_settings': self.arm_settings,
+                                    'filter_settings': self.filter_settings},
+                                   self.COM, thread_config=threads, arm_output_settings=self.arm_output_settings,
+                                   baud_rates=self.baud_rates)
+
+        prev_frame_time = 0
+        try:
+            pipeline.start()
+            self.presenter.reset()
 
+            while self.ThreadActive:
 
-                self.image_update_signal.emit(final_image)
+                ready = pipeline.next_frame(timeout=0.5)
+
+                if ready is None:
+                    if pipeline.finished:
+                        # End of a recorded clip, every captured frame was shown
+                        break
+                    continue
+
+                image, display_slot, seq, frame_time, info = ready
+
+                # The frame is drawn already, it only has to leave shared memory so the slot can be reused
+                presented = self.presenter.present_rgb(image)
+                pipeline.release(display_slot)
+                if presented is None:
+                    continue
+                buffer_index, display_image = presented
+
+                # FPS counter
+                new_frame_time = time.time()
+                fps = int(1 / (new_frame_time - prev_frame_time))
+                prev_frame_time = new_frame_time
+
+                converted_image = QImage(display_image.data,
+                                         display_image.shape[1],
+                                         display_image.shape[0],
+                                         display_image.strides[0],
+                                         QImage.Format.Format_RGB888)
+                self.image_update_signal.emit(converted_image, buffer_index)
                 try:
-                    self.info_update_signal.emit(self.cap_device, self.COM, detected, in_range, hand_position, state, direction, fps)
+                    self.info_update_signal.emit(str(self.cap_device), self.COM, info['detected'], info['in_range'],
+                                                 info['hand_position'], info['state'], info['direction'], fps)
                 except Exception as e:
                     print(e)
-                   
-        # Release the camera access
-        cap.release()
+
+                stats = {
+                    'Pipeline': 'process',
+                    'Capture source': pipeline.source_description,
+                    'Inference backend': self.inference_backend,
+                    'Frame latency (ms)': int((time.time() - frame_time) * 1000),
+                    'Skipped display frames': self.presenter.skipped_frames,
+                }
+                stats.update(pipeline.stats())
+                self.stats_update_signal.emit(stats)
+        finally:
+            # Joins or terminates the stage processes and frees the shared memory, also after an error
+            pipeline.stop()
 
     def stop(self):
         with QMutexLocker(self.mutex):
@@ -504,7 +910,10 @@ class thread_2(QThread):
         self.ThreadActive = True
         self.mutex = QMutex()
         self.state = "None"
+        self.baud_rates = link.FAST_BAUD_RATES
+        self.read_setup_file()
 
+    def read_setup_file(self):
         if os.path.exists('setup.txt'):
             with open('setup.txt', 'r') as setup_file:
                 lines = setup_file.readlines()
@@ -513,9 +922,11 @@ class thread_2(QThread):
                     if line.startswith('com_port='):
                         self.COM = int(line.split('=')[1])
                     elif line.startswith('capture_device='):
-                        self.cap_device = int(line.split('=')[1])
+                        self.cap_device = frame_sources.parse_capture_device(line.split('=')[1])
                     elif line.startswith('control_method='):
                         self.control_method = str(line.split('=')[1])
+                    elif line.startswith('baud_rates='):
+                        self.baud_rates = link.parse_baud_rates(line.split('=')[1])
         else:
             # Default values
             self.COM = 3
@@ -524,299 +935,339 @@ class thread_2(QThread):
 
     def run(self):
 
-        # Serial port configuration
-        try:
-            self.arm = serial.Serial(f'COM{self.COM}', 9600, timeout=0.2)
-            if not self.arm.isOpen():
-                self.arm.open()
-        except Exception as e:
-            pass
-
-        model = tf.keras.models.load_model('./src/misc/model.keras')
-
-        def predict(model, audio_data, sample_width, channels, rate):
-            self.state = "Predicting"
-            audio_file = create_temp_audio_file(audio_data, sample_width, channels, rate)
-            print(audio_file)
-            y_1, sr_1 = librosa.load(audio_file)
-            y_1_f = butter_bandpass_filter(y_1, 100, 10000, sr_1, order=5)
-            y_1_f_trimmed, _ = librosa.effects.trim(y_1_f, top_db=20)
-            amp_y_1 = librosa.stft(y_1_f_trimmed)
-            y_1_db = librosa.amplitude_to_db(np.abs(amp_y_1), ref=np.max)
-
-            temp_image_filename = create_temp_image_file(y_1_db)
-
-            image = cv2.imread(temp_image_filename)
-            image_tensor = tf.convert_to_tensor(image, dtype=tf.float32) / 255.0
-            image_tensor = tf.expand_dims(image_tensor, axis=0)
-            prediction = model.predict(image_tensor)
-            confidence = np.max(prediction)
-            label_pred = np.argmax(prediction, axis=1)
-            command = self.commands[label_pred[0]]
-            os.remove(temp_image_filename)
-            os.remove(audio_file)
-            return command, confidence
-
-        def move_arm(arm: serial, COM: int, pos: tuple):
-            data = struct.pack('BBBB', *pos)
-            arm.write(data)
-
-        def set_gripper_angle(current_position: tuple, predicted_class: str) -> tuple:
-            if predicted_class == "open":
-                self.current_position= (current_position[0], 120, current_position[2], current_position[3])
-            elif predicted_class == "close":
-                self.current_position= (current_position[0], 10, current_position[2], current_position[3])
-            return current_position
-
-        def voice_activity_detection():
-            global start_time
-            p = pyaudio.PyAudio()
-            stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
-            print("Listening...")
-            self.state = "Listening"
-            recording = False
-            audio_data = b""
-            while True:
-                data = stream.read(CHUNK)
-                fmt = f"{CHUNK}h"
-                data_int = np.array(struct.unpack(fmt, data))
-                energy = abs((np.sum(data_int ** 2) / len(data_int)))
-                if energy > THRESHOLD:
-                    print("Voice activity detected!")
-                    recording = True
-                    start_time = time.time()
-                if recording:
-                    audio_data += data
-                if recording and time.time() - start_time > RECORD_SECONDS:
-                    print("-> Silence <-")
-                    yield audio_data
-                    recording = False
-                    audio_data = b""
-                    clear_output(wait=True)
-                if self.ThreadActive is False:
-                    break
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+        # The writer thread opens the port at the fastest rate the firmware agrees to, a stalled port
+        # no longer holds up the listening
+        self.arm = writer.SerialWriter(f'COM{self.COM}', self.baud_rates)
+        self.arm.start()
+        # Pose, deadline, class and confidence of the last move until the arm reports reaching it
+        self.pending_move = None
 
-        for activity in voice_activity_detection():
-
-            predicted_class, confidence = predict(model, activity, 2, CHANNELS, RATE)
-            self.state = "Processing"
-            self.info_update_signal.emit(predicted_class, confidence, self.state)
-
-            if confidence >= 0.95:
-                self.state = "Moving arm"
-                
+        try:
+            # The voice stack is imported here, the process pipeline's spawned children re-import this
+            # module and never use it
+            import librosa
+            import tensorflow as tf
+            from IPython.display import clear_output
+            from audio.audio_helpers import butter_bandpass_filter
+            from audio.file_operations import create_temp_audio_file, create_temp_image_file
+
+            model = registry.get('voice')
+
+            def predict(model, audio_data, sample_width, channels, rate):
+                self.state = "Predicting"
+                audio_file = create_temp_audio_file(audio_data, sample_width, channels, rate)
+                print(audio_file)
+                y_1, sr_1 = librosa.load(audio_file)
+                y_1_f = butter_bandpass_filter(y_1, 100, 10000, sr_1, order=5)
+                y_1_f_trimmed, _ = librosa.effects.trim(y_1_f, top_db=20)
+                amp_y_1 = librosa.stft(y_1_f_trimmed)
+                y_1_db = librosa.amplitude_to_db(np.abs(amp_y_1), ref=np.max)
+
+                temp_image_filename = create_temp_image_file(y_1_db)
+
+                image = cv2.imread(temp_image_filename)
+                image_tensor = tf.convert_to_tensor(image, dtype=tf.float32) / 255.0
+                image_tensor = tf.expand_dims(image_tensor, axis=0)
+                prediction = model.predict(image_tensor)
+                confidence = np.max(prediction)
+                label_pred = np.argmax(prediction, axis=1)
+                command = self.commands[label_pred[0]]
+                os.remove(temp_image_filename)
+                os.remove(audio_file)
+                return command, confidence
+
+            def move_arm(arm: writer.SerialWriter, COM: int, pos: tuple):
+                # Framed and numbered by the writer like the gesture commands, the firmware drops anything else
+                arm.submit(pos)
+
+            def check_move():
+                # Called between audio chunks so listening goes on while the arm moves. The move is reported
+                # once the arm got there or MOVE_TIMEOUT ran out, firmware that does not report is not waited for
+                if self.pending_move is None:
+                    return
+                pos, deadline, predicted_class, confidence = self.pending_move
+                arm_state = self.arm.arm_state
+                # A late periodic report is asked for instead of waited for
+                report_age = arm_state.snapshot().report_age
+                if report_age is None or report_age > telemetry.STATE_INTERVAL:
+                    self.arm.request_state()
+                if arm_state.reached(pos):
+                    self.state = "Arm in position"
+                elif not arm_state.available():
+                    self.state = "Arm moved, no telemetry"
+                elif time.perf_counter() > deadline:
+                    print("Arm did not report reaching", pos, "within", telemetry.MOVE_TIMEOUT, "s")
+                    self.state = "Arm did not reach position"
+                else:
+                    return
+                self.pending_move = None
+                self.info_update_signal.emit(predicted_class, confidence, self.state)
+
+            def set_gripper_angle(current_position: tuple, predicted_class: str) -> tuple:
+                if predicted_class == "open":
+                    self.current_position= (current_position[0], 120, current_position[2], current_position[3])
+                elif predicted_class == "close":
+                    self.current_position= (current_position[0], 10, current_position[2], current_position[3])
+                return current_position
+
+            def voice_activity_detection():
+                global start_time
+                p = pyaudio.PyAudio()
+                stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
+                print("Listening...")
+                self.state = "Listening"
+                recording = False
+                audio_data = b""
                 while True:
-                    # Trata the arm position based on the predicted class
-                    if self.current_position_key == "initial":
+                    data = stream.read(CHUNK)
+                    check_move()
+                    fmt = f"{CHUNK}h"
+                    data_int = np.array(struct.unpack(fmt, data))
+                    energy = abs((np.sum(data_int ** 2) / len(data_int)))
+                    if energy > THRESHOLD:
+                        print("Voice activity detected!")
+                        recording = True
+                        start_time = time.time()
+                    if recording:
+                        audio_data += data
+                    if recording and time.time() - start_time > RECORD_SECONDS:
+                        print("-> Silence <-")
+                        yield audio_data
+                        recording = False
+                        audio_data = b""
+                        clear_output(wait=True)
+                    if self.ThreadActive is False:
+                        break
+                stream.stop_stream()
+                stream.close()
+                p.terminate()
+
+            for activity in voice_activity_detection():
+
+                predicted_class, confidence = predict(model, activity, 2, CHANNELS, RATE)
+                self.state = "Processing"
+                self.info_update_signal.emit(predicted_class, confidence, self.state)
+
+                if confidence >= 0.95:
+                    self.state = "Moving arm"
+                
+                    while True:
+                        # Trata the arm position based on the predicted class
+                        if self.current_position_key == "initial":
     
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "left"
-                            self.current_position = self.positions[self.current_position_key]
+                                self.current_position_key = "left"
+                                self.current_position = self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "right"
-                            self.current_position = self.positions[self.current_position_key]
+                                self.current_position_key = "right"
+                                self.current_position = self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "up"
-                            self.current_position = self.positions[self.current_position_key]
+                                self.current_position_key = "up"
+                                self.current_position = self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "down"
-                            self.current_position = self.positions[self.current_position_key]
+                                self.current_position_key = "down"
+                                self.current_position = self.positions[self.current_position_key]
     
-                        # Move the arm
-                        self.current_position = set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position = set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "left":
+                        elif self.current_position_key == "left":
     
-                        if predicted_class == "left":
-                            pass
+                            if predicted_class == "left":
+                                pass
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "initial"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "initial"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "upper_left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "upper_left"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "lower_left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "lower_left"
+                                self.current_position= self.positions[self.current_position_key]
     
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
     
-                    elif self.current_position_key == "lower_left":
+                        elif self.current_position_key == "lower_left":
 
-                        if predicted_class == "left":
-                            pass
+                            if predicted_class == "left":
+                                pass
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "down"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "down"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "left"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
-                            pass
+                            elif predicted_class == "down":
+                                pass
     
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "upper_left":
+                        elif self.current_position_key == "upper_left":
     
-                        if predicted_class == "left":
-                            pass
+                            if predicted_class == "left":
+                                pass
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "up"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "up"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
-                            pass
+                            elif predicted_class == "up":
+                                pass
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "left"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "right":
+                        elif self.current_position_key == "right":
 
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "initial"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "initial"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
-                            pass
+                            elif predicted_class == "right":
+                                pass
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "upper_right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "upper_right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "lower_right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "lower_right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "lower_right":
+                        elif self.current_position_key == "lower_right":
     
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "down"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "down"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
-                            pass
+                            elif predicted_class == "right":
+                                pass
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
-                            pass
+                            elif predicted_class == "down":
+                                pass
 
-                    elif self.current_position_key == "upper_right":
+                        elif self.current_position_key == "upper_right":
 
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "up"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "up"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
-                            pass
+                            elif predicted_class == "right":
+                                pass
         
-                        elif predicted_class == "up":
-                            pass
+                            elif predicted_class == "up":
+                                pass
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "up":
+                        elif self.current_position_key == "up":
     
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "upper_left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "upper_left"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "upper_right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "upper_right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
-                            pass
+                            elif predicted_class == "up":
+                                pass
         
-                        elif predicted_class == "down":
+                            elif predicted_class == "down":
         
-                            self.current_position_key = "initial"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "initial"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        # Move o braço
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
+                            # Move o braço
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
 
-                    elif self.current_position_key == "down":
+                        elif self.current_position_key == "down":
 
-                        if predicted_class == "left":
+                            if predicted_class == "left":
         
-                            self.current_position_key = "lower_left"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "lower_left"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "right":
+                            elif predicted_class == "right":
         
-                            self.current_position_key = "lower_right"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "lower_right"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "up":
+                            elif predicted_class == "up":
         
-                            self.current_position_key = "initial"
-                            self.current_position= self.positions[self.current_position_key]
+                                self.current_position_key = "initial"
+                                self.current_position= self.positions[self.current_position_key]
         
-                        elif predicted_class == "down":
-                            pass
+                            elif predicted_class == "down":
+                                pass
     
-                        # Move the arm
-                        self.current_position= set_gripper_angle(self.current_position, predicted_class)
-                        move_arm(self.arm, self.COM, self.current_position)
-
-                    break
+                            # Move the arm
+                            self.current_position= set_gripper_angle(self.current_position, predicted_class)
+                            move_arm(self.arm, self.COM, self.current_position)
+
+                        break
+
+                    # Shown as moving until check_move() sees the arm report the pose
+                    self.pending_move = (self.current_position, time.perf_counter() + telemetry.MOVE_TIMEOUT,
+                                         predicted_class, confidence)
+                    self.info_update_signal.emit(predicted_class, confidence, self.state)
+        finally:
+            # Listening stopped or failed, the writer closes the port
+            self.arm.stop()
 
     def stop(self):
         with QMutexLocker(self.mutex):
@@ -0,0 +1,91 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class ModelEntry:
+    loader: Callable[[], Any]
+    warmup: Optional[Callable[[Any], None]] = None
+    model: Any = None
+    error: Optional[BaseException] = None
+    state: str = 'registered'
+    load_time: float = 0.0
+    warmup_time: float = 0.0
+    ready: threading.Event = field(default_factory=threading.Event)
+
+
+# Process-wide models, loaded once and warmed up with a dummy input, then handed to every thread that
+# asks for them. Loading starts in the background with preload() or on the first get().
+class ModelRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        with self.lock:
+            if name not in self.entries:
+                self.entries[name] = ModelEntry(loader, warmup)
+
+    def claim(self, name: str) -> bool:
+        # True for the one caller that has to load the model
+        with self.lock:
+            entry = self.entries[name]
+            if entry.state not in ('registered', 'failed'):
+                return False
+            # A failed load is tried again by the next caller
+            entry.ready.clear()
+            entry.error = None
+            entry.state = 'loading'
+            return True
+
+    def load(self, name: str):
+        entry = self.entries[name]
+        try:
+            start_time = time.perf_counter()
+            model = entry.loader()
+            entry.load_time = time.perf_counter() - start_time
+
+            if entry.warmup is not None:
+                entry.state = 'warming up'
+                start_time = time.perf_counter()
+                entry.warmup(model)
+                entry.warmup_time = time.perf_counter() - start_time
+
+            entry.model = model
+            entry.state = 'ready'
+            print(f"Model {name} loaded in {entry.load_time:.2f} s, warm-up {entry.warmup_time:.2f} s")
+        except Exception as e:
+            entry.error = e
+            entry.state = 'failed'
+            print(f"Error while loading model {name}:", e)
+        finally:
+            entry.ready.set()
+
+    def preload(self, name: str):
+        if self.claim(name):
+            threading.Thread(target=self.load, args=(name,), name=f'load-{name}', daemon=True).start()
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        # Loads in the calling thread when nobody started it yet, otherwise waits for the loader
+        if self.claim(name):
+            self.load(name)
+        entry = self.entries[name]
+        if not entry.ready.wait(timeout):
+            raise TimeoutError(f'Model {name} is still loading')
+        if entry.error is not None:
+            raise entry.error
+        return entry.model
+
+    def stats(self, name: str) -> Dict[str, Any]:
+        entry = self.entries[name]
+        return {
+            'state': entry.state,
+            'load_time': round(entry.load_time, 2),
+            'warmup_time': round(entry.warmup_time, 2),
+        }
+
+
+registry = ModelRegistry()
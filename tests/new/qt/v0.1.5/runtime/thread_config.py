@@ -0,0 +1,95 @@
+import ctypes
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import cv2
+
+
+# setup.txt keys read by from_settings()
+THREAD_SETTINGS = ('intra_op_threads', 'inter_op_threads', 'opencv_threads', 'capture_cores', 'inference_cores')
+
+
+# Thread counts and core pinning of the gesture worker. 0 threads (or -1 for OpenCV) keeps the library
+# default and an empty core list leaves the thread free to run anywhere
+@dataclass
+class ThreadConfig:
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    opencv_threads: int = -1
+    capture_cores: Tuple[int, ...] = field(default_factory=tuple)
+    inference_cores: Tuple[int, ...] = field(default_factory=tuple)
+
+    def __str__(self) -> str:
+        return (f'intra {self.intra_op_threads or "default"}, inter {self.inter_op_threads or "default"}, '
+                f'opencv {self.opencv_threads if self.opencv_threads >= 0 else "default"}, '
+                f'capture cores {format_cores(self.capture_cores)}, '
+                f'inference cores {format_cores(self.inference_cores)}')
+
+
+def parse_cores(text: str) -> Tuple[int, ...]:
+    # "2,3", "0-1" or "" (no pinning)
+    cores = []
+    for part in text.replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return tuple(sorted(set(cores)))
+
+
+def format_cores(cores: Tuple[int, ...]) -> str:
+    return ','.join(str(core) for core in cores) or 'any'
+
+
+def from_settings(settings: Dict[str, str]) -> ThreadConfig:
+    # Keys of setup.txt, every one of them optional
+    return ThreadConfig(int(settings.get('intra_op_threads', 0)),
+                        int(settings.get('inter_op_threads', 0)),
+                        int(settings.get('opencv_threads', -1)),
+                        parse_cores(settings.get('capture_cores', '')),
+                        parse_cores(settings.get('inference_cores', '')))
+
+
+def apply_library_threads(config: ThreadConfig):
+    # Process-wide thread pools, to be called before the first inference
+    if config.opencv_threads >= 0:
+        cv2.setNumThreads(config.opencv_threads)
+
+    if config.intra_op_threads > 0 or config.inter_op_threads > 0:
+        try:
+            import torch
+        except ImportError:
+            return
+        if config.intra_op_threads > 0:
+            torch.set_num_threads(config.intra_op_threads)
+        if config.inter_op_threads > 0 and torch.get_num_interop_threads() != config.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(config.inter_op_threads)
+            except RuntimeError as e:
+                # Only possible before PyTorch ran anything in parallel, the next process start applies it
+                print("Error while setting the inter-op threads:", e)
+
+
+def pin_current_thread(cores: Tuple[int, ...]) -> bool:
+    # Restricts the calling thread to the given cores, False when the platform does not allow it
+    if not cores:
+        return False
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            # On Linux pid 0 is the calling thread, not the whole process
+            os.sched_setaffinity(0, cores)
+            return True
+        if sys.platform == 'win32':
+            mask = sum(1 << core for core in cores)
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentThread.restype = ctypes.c_void_p
+            kernel32.SetThreadAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+            return kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask) != 0
+    except (OSError, ValueError) as e:
+        print("Error while pinning the thread:", e)
+    return False
@@ -0,0 +1,108 @@
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+from serial_link import protocol
+
+# Every board starts at DEFAULT_BAUD, the fast rates are tried from the highest down
+DEFAULT_BAUD = 9600
+FAST_BAUD_RATES = (1000000, 500000, 250000, 115200)
+
+# setup.txt key, comma separated rates, 9600 alone turns the negotiation off
+BAUD_SETTING = 'baud_rates'
+
+# The firmware switches once its acknowledgement left, and goes back to DEFAULT_BAUD when no valid
+# frame arrives at the new rate within a second
+SWITCH_DELAY = 0.02
+FALLBACK_DELAY = 1.1
+REPLY_TIMEOUT = 0.25
+# Opening the port resets most Arduino boards, the first request is repeated while they boot
+HANDSHAKE_TIMEOUT = 2.5
+
+
+def parse_baud_rates(text: str) -> Tuple[int, ...]:
+    return tuple(int(rate) for rate in text.replace(' ', '').split(',') if rate)
+
+
+def exchange(port: Any, encoder: protocol.FrameEncoder, decoder: protocol.FrameDecoder, frame_type: int,
+             payload: bytes, reply_type: int, timeout: float = REPLY_TIMEOUT) -> Optional[protocol.Frame]:
+    # Sends one frame and waits for the first frame of reply_type, None on timeout
+    port.reset_input_buffer()
+    decoder.reset()
+    port.write(encoder.frame(frame_type, payload))
+    read_timeout = port.timeout
+    port.timeout = 0.005
+    try:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            for frame in decoder.feed(port.read(max(1, port.in_waiting))):
+                if frame.type == reply_type:
+                    return frame
+    finally:
+        port.timeout = read_timeout
+    return None
+
+
+def request_baud(port: Any, rate: int, encoder: protocol.FrameEncoder,
+                 decoder: protocol.FrameDecoder) -> Optional[bool]:
+    # Asks the firmware at the current rate to switch and confirms with a ping at the new one.
+    # True when both run at rate, False when it was refused or failed, None when nothing answered
+    reply = exchange(port, encoder, decoder, protocol.BAUD_REQUEST, rate.to_bytes(4, 'big'), protocol.BAUD_ACK)
+    if reply is None:
+        return None
+    if int.from_bytes(reply.payload, 'big') != rate:
+        return False
+
+    port.baudrate = rate
+    time.sleep(SWITCH_DELAY)
+    if exchange(port, encoder, decoder, protocol.PING, b'', protocol.PONG) is not None:
+        return True
+
+    # Garbled at this rate, the firmware falls back on its own
+    port.baudrate = DEFAULT_BAUD
+    time.sleep(FALLBACK_DELAY)
+    return False
+
+
+def negotiate_baud(port: Any, baud_rates: Iterable[int] = FAST_BAUD_RATES,
+                   handshake_timeout: float = HANDSHAKE_TIMEOUT) -> int:
+    # Highest rate of baud_rates the firmware supports, DEFAULT_BAUD for firmware without negotiation
+    rates = sorted({rate for rate in baud_rates if rate > DEFAULT_BAUD}, reverse=True)
+    if not rates:
+        return port.baudrate
+    encoder, decoder = protocol.FrameEncoder(), protocol.FrameDecoder()
+
+    deadline = time.perf_counter() + handshake_timeout
+    accepted = request_baud(port, rates[0], encoder, decoder)
+    while accepted is None and time.perf_counter() < deadline:
+        accepted = request_baud(port, rates[0], encoder, decoder)
+
+    if accepted is None:
+        # Nothing at 9600: firmware without negotiation, or one still at a fast rate from the last session
+        for rate in rates:
+            port.baudrate = rate
+            if exchange(port, encoder, decoder, protocol.PING, b'', protocol.PONG, 0.1) is not None:
+                return rate
+        port.baudrate = DEFAULT_BAUD
+        return DEFAULT_BAUD
+
+    if accepted:
+        return rates[0]
+    for rate in rates[1:]:
+        if request_baud(port, rate, encoder, decoder):
+            return rate
+    return port.baudrate
+
+
+def open_port(name: str, baud_rates: Iterable[int] = FAST_BAUD_RATES, timeout: float = 0.2) -> Tuple[Any, int]:
+    # Opens the port at DEFAULT_BAUD and moves it to the fastest rate the firmware agrees to
+    import serial
+
+    port = serial.Serial(name, DEFAULT_BAUD, timeout=timeout)
+    if not port.isOpen():
+        port.open()
+    try:
+        return port, negotiate_baud(port, baud_rates)
+    except Exception as e:
+        print("Error while negotiating the baud rate:", e)
+        port.baudrate = DEFAULT_BAUD
+        return port, DEFAULT_BAUD
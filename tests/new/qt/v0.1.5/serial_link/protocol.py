@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Frame layout, all fields one byte except the CRC:
+#
+#   SYNC  VERSION  TYPE  SEQ  LENGTH  PAYLOAD[LENGTH]  CRC16 (big endian)
+#
+# The CRC (CRC-16/CCITT-FALSE) covers VERSION up to the end of the payload. A receiver that loses
+# a byte or starts mid-stream scans for SYNC and checks the CRC, a bad frame costs one byte of
+# rescanning. serial-port-command-receiver.cpp implements the same format on the Arduino.
+SYNC = 0xA5
+VERSION = 1
+HEADER_BYTES = 5
+CRC_BYTES = 2
+MAX_PAYLOAD = 16
+
+# Frame types, host to arm below 0x80 and arm to host from 0x80
+POSE = 0x01
+BAUD_REQUEST = 0x02
+PING = 0x03
+STATE_REQUEST = 0x04
+BAUD_ACK = 0x82
+PONG = 0x83
+STATE = 0x84
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) & 0xFFFF if crc & 0x8000 else (crc << 1) & 0xFFFF
+    return crc
+
+
+def frame_bytes(payload_bytes: int) -> int:
+    return HEADER_BYTES + payload_bytes + CRC_BYTES
+
+
+@dataclass
+class Frame:
+    type: int
+    seq: int
+    payload: bytes
+
+
+def encode(frame_type: int, seq: int, payload: bytes) -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f'payload of {len(payload)} bytes, at most {MAX_PAYLOAD}')
+    body = bytes((VERSION, frame_type, seq & 0xFF, len(payload))) + bytes(payload)
+    crc = crc16(body)
+    return bytes((SYNC,)) + body + bytes((crc >> 8, crc & 0xFF))
+
+
+# Numbers the frames of one sender, the receiver tells lost frames from the gaps
+class FrameEncoder:
+
+    def __init__(self):
+        self.seq = 0
+
+    def frame(self, frame_type: int, payload: bytes) -> bytes:
+        data = encode(frame_type, self.seq, payload)
+        self.seq = (self.seq + 1) & 0xFF
+        return data
+
+    def pose(self, pose: Tuple[int, int, int, int]) -> bytes:
+        # base, gripper, arm1, arm2 in degrees
+        return self.frame(POSE, bytes(int(angle) & 0xFF for angle in pose))
+
+
+# Incremental decoder, feed() takes whatever the port returned and gives back the complete frames
+class FrameDecoder:
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.last_seq = None
+
+        # Counters
+        self.frames = 0
+        self.crc_errors = 0
+        self.skipped_bytes = 0
+        self.lost_frames = 0
+
+    def feed(self, data: bytes) -> List[Frame]:
+        self.buffer += data
+        frames = []
+        buffer = self.buffer
+        while True:
+            start = buffer.find(SYNC)
+            if start < 0:
+                self.skipped_bytes += len(buffer)
+                buffer.clear()
+                break
+            if start > 0:
+                self.skipped_bytes += start
+                del buffer[:start]
+
+            if len(buffer) < HEADER_BYTES:
+                break
+            version, frame_type, seq, length = buffer[1:HEADER_BYTES]
+            if version != VERSION or length > MAX_PAYLOAD:
+                # Not a header, the SYNC value was part of something else
+                self.skipped_bytes += 1
+                del buffer[:1]
+                continue
+
+            size = frame_bytes(length)
+            if len(buffer) < size:
+                break
+            crc = (buffer[size - 2] << 8) | buffer[size - 1]
+            if crc16(buffer[1:size - CRC_BYTES]) != crc:
+                self.crc_errors += 1
+                self.skipped_bytes += 1
+                del buffer[:1]
+                continue
+
+            frames.append(Frame(frame_type, seq, bytes(buffer[HEADER_BYTES:size - CRC_BYTES])))
+            del buffer[:size]
+            self.count(seq)
+        return frames
+
+    def count(self, seq: int):
+        if self.last_seq is not None:
+            self.lost_frames += (seq - self.last_seq - 1) & 0xFF
+        self.last_seq = seq
+        self.frames += 1
+
+    def reset(self):
+        self.buffer.clear()
+        self.last_seq = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'frames': self.frames,
+            'crc_errors': self.crc_errors,
+            'skipped_bytes': self.skipped_bytes,
+            'lost_frames': self.lost_frames,
+        }
@@ -0,0 +1,144 @@
+import collections
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from serial_link import protocol
+
+# STATE payload: base, gripper, arm1, arm2 angles the servos are at, flags, and the sequence number of
+# the last pose frame the firmware received. The firmware sends one every STATE_INTERVAL, one as soon
+# as the servos stop, one per STATE_REQUEST and one right after every pose (flagged ECHO)
+STATE_PAYLOAD_BYTES = 6
+MOTION_COMPLETE = 0x01
+ECHO = 0x02
+STATE_INTERVAL = 0.1
+# Without a report for this long the firmware is taken as silent (old firmware or unplugged)
+STALE_AFTER = 5 * STATE_INTERVAL
+# Longest a move may take before the arm counts as not reaching its pose
+MOVE_TIMEOUT = 3.0
+# Round trips kept for the statistics
+ROUND_TRIP_WINDOW = 200
+
+
+@dataclass
+class ArmSnapshot:
+    commanded: Optional[Tuple[int, int, int, int]]
+    actual: Optional[Tuple[int, int, int, int]]
+    motion_complete: bool
+    reached: bool
+    report_age: Optional[float]
+
+
+# What the host sent and what the firmware reports, shared between the serial writer (which fills it)
+# and the loops and panels that read it. The round trip of a pose is timed from its write to the echo
+# carrying its sequence number; echoes that were not sent right away only arrive with a periodic report
+# and are not timed.
+class ArmState:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commanded = None
+        self.commanded_seq = None
+        self.actual = None
+        self.motion_complete = False
+        self.echo_seq = None
+        self.report_time = None
+        self.send_times = [None] * 256
+        self.round_trips = collections.deque(maxlen=ROUND_TRIP_WINDOW)
+
+        # Counters
+        self.reports = 0
+        self.echoes = 0
+        self.bad_reports = 0
+
+    def sent(self, seq: int, pose: Tuple[int, int, int, int], now: Optional[float] = None):
+        # Called by the writer just before the pose frame goes out
+        with self.lock:
+            self.commanded = tuple(pose)
+            self.commanded_seq = seq
+            self.send_times[seq] = time.perf_counter() if now is None else now
+
+    def update(self, frame: protocol.Frame, now: Optional[float] = None) -> bool:
+        # Takes a frame from the port, False for anything but a state report
+        if frame.type != protocol.STATE:
+            return False
+        if len(frame.payload) != STATE_PAYLOAD_BYTES:
+            self.bad_reports += 1
+            return False
+        now = time.perf_counter() if now is None else now
+        base, gripper, arm1, arm2, flags, echo_seq = frame.payload
+        with self.lock:
+            self.actual = (base, gripper, arm1, arm2)
+            self.motion_complete = bool(flags & MOTION_COMPLETE)
+            self.echo_seq = echo_seq
+            self.report_time = now
+            self.reports += 1
+            if flags & ECHO:
+                self.echoes += 1
+                send_time, self.send_times[echo_seq] = self.send_times[echo_seq], None
+                if send_time is not None:
+                    self.round_trips.append(now - send_time)
+        return True
+
+    def reset(self):
+        # The board restarted with the port, what it had received is gone
+        with self.lock:
+            self.actual = None
+            self.echo_seq = None
+            self.report_time = None
+            self.send_times = [None] * 256
+
+    def available(self, now: Optional[float] = None) -> bool:
+        # True while the firmware keeps reporting
+        now = time.perf_counter() if now is None else now
+        return self.report_time is not None and now - self.report_time < STALE_AFTER
+
+    def reached(self, pose: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        # The firmware received the last commanded pose (or pose, when given) and its servos stopped
+        return (self.commanded is not None and self.echo_seq == self.commanded_seq and self.motion_complete
+                and (pose is None or tuple(pose) == self.commanded))
+
+    def snapshot(self, now: Optional[float] = None) -> ArmSnapshot:
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            return ArmSnapshot(self.commanded, self.actual, self.motion_complete, self.reached(),
+                               None if self.report_time is None else now - self.report_time)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        with self.lock:
+            round_trips = np.array(self.round_trips, dtype=np.float64) * 1000
+        return {
+            'commanded': snapshot.commanded,
+            'actual': snapshot.actual,
+            'motion': describe_motion(snapshot),
+            'reports': self.reports,
+            'echoes': self.echoes,
+            'bad_reports': self.bad_reports,
+            'rtt_p50_ms': round(float(np.percentile(round_trips, 50)), 2) if round_trips.size else 0.0,
+            'rtt_max_ms': round(float(round_trips.max()), 2) if round_trips.size else 0.0,
+        }
+
+
+def describe_motion(snapshot: ArmSnapshot) -> str:
+    if snapshot.report_age is None or snapshot.report_age >= STALE_AFTER:
+        return 'no telemetry'
+    if snapshot.reached:
+        return 'reached'
+    return 'stopped' if snapshot.motion_complete else 'moving'
+
+
+def describe_pose(stats: Dict[str, Any]) -> str:
+    # Commanded / actual base, gripper, arm1, arm2
+    def pose_text(pose: Any) -> str:
+        return '-' if pose is None else ','.join(str(angle) for angle in pose)
+    return f"{pose_text(stats['commanded'])} / {pose_text(stats['actual'])} ({stats['motion']})"
+
+
+def describe_round_trip(stats: Dict[str, Any]) -> str:
+    if not stats['echoes']:
+        return 'no echoes'
+    return f"{stats['rtt_p50_ms']} ms p50, {stats['rtt_max_ms']} ms max"
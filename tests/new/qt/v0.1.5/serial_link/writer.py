@@ -0,0 +1,222 @@
+import collections
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from serial_link import link, protocol
+from serial_link.telemetry import ArmState
+
+# Waits between attempts to open the port, doubled after every failure up to the maximum
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 8.0
+# A write the port cannot take within this time counts as a stalled link and reopens the port
+WRITE_TIMEOUT = 0.5
+# Write latencies kept for the statistics
+LATENCY_WINDOW = 200
+
+
+# Owns the serial port in its own thread so a slow, stalled or unplugged port never holds up the
+# capture, inference or voice loops. Producers call submit(), which only replaces the pending pose and
+# returns at once: the queue holds a single pose and the newest one wins, older ones are obsolete by
+# the time the port is free again. The port is opened (and the baud rate negotiated) in the thread,
+# reopened after a write error, and the last pose is sent again since the board resets on reopening.
+# A second thread reads the firmware's state reports into arm_state.
+class SerialWriter(threading.Thread):
+
+    def __init__(self, port_name: str, baud_rates: Iterable[int] = link.FAST_BAUD_RATES,
+                 write_timeout: float = WRITE_TIMEOUT, opener: Optional[Callable[..., Tuple[Any, int]]] = None,
+                 name: str = 'serial-writer'):
+        super().__init__(name=name, daemon=True)
+        self.port_name = port_name
+        self.baud_rates = tuple(baud_rates)
+        self.write_timeout = write_timeout
+        self.opener = opener or link.open_port
+        self.encoder = protocol.FrameEncoder()
+        self.condition = threading.Condition()
+        self.port = None
+        self.baudrate = link.DEFAULT_BAUD
+        self.pending = None
+        self.pending_time = 0.0
+        self.state_requested = False
+        self.last_pose = None
+        self.running = True
+        self.arm_state = ArmState()
+        self.reader = threading.Thread(target=self.read_reports, name=f'{name}-reader', daemon=True)
+
+        # Counters
+        self.submitted = 0
+        self.written = 0
+        self.replaced = 0
+        self.errors = 0
+        self.connects = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.write_times = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def submit(self, pose: Tuple[int, int, int, int]) -> bool:
+        # Never blocks, False once the writer was stopped
+        with self.condition:
+            if not self.running:
+                return False
+            if self.pending is not None:
+                self.replaced += 1
+            else:
+                self.pending_time = time.perf_counter()
+            self.pending = tuple(pose)
+            self.submitted += 1
+            self.condition.notify()
+        return True
+
+    def request_state(self):
+        # Asks the firmware for a state report right away instead of waiting for the periodic one
+        with self.condition:
+            self.state_requested = True
+            self.condition.notify()
+
+    def connected(self) -> bool:
+        return self.port is not None
+
+    def queue_depth(self) -> int:
+        return 0 if self.pending is None else 1
+
+    def run(self):
+        self.reader.start()
+        delay = RECONNECT_DELAY
+        try:
+            while self.running:
+                if self.port is None:
+                    if self.connect():
+                        delay = RECONNECT_DELAY
+                    else:
+                        self.wait(delay)
+                        delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                    continue
+
+                with self.condition:
+                    if self.pending is None and not self.state_requested:
+                        self.condition.wait(0.5)
+                    pose, submit_time = self.pending, self.pending_time
+                    state_requested = self.state_requested
+                    self.pending = None
+                    self.state_requested = False
+                if pose is not None:
+                    self.write(pose, submit_time)
+                if state_requested and self.port is not None:
+                    self.send(self.encoder.frame(protocol.STATE_REQUEST, b''))
+        finally:
+            self.close()
+            self.reader.join(1.0)
+
+    def read_reports(self):
+        decoder = protocol.FrameDecoder()
+        while self.running:
+            port = self.port
+            if port is None:
+                decoder.reset()
+                time.sleep(0.05)
+                continue
+            try:
+                data = port.read(max(1, port.in_waiting))
+            except Exception as e:
+                if port is self.port:
+                    self.errors += 1
+                    print("Error while reading from the serial port:", e)
+                    self.close()
+                continue
+            now = time.perf_counter()
+            for frame in decoder.feed(data):
+                self.arm_state.update(frame, now)
+
+    def connect(self) -> bool:
+        try:
+            port, self.baudrate = self.opener(self.port_name, self.baud_rates)
+            port.write_timeout = self.write_timeout
+        except Exception as e:
+            print("Error while opening serial port:", e)
+            return False
+        self.arm_state.reset()
+        self.port = port
+        self.connects += 1
+        with self.condition:
+            # The board restarts when the port opens, it needs the pose again
+            if self.pending is None and self.last_pose is not None:
+                self.pending = self.last_pose
+                self.pending_time = time.perf_counter()
+        return True
+
+    def send(self, data: bytes) -> bool:
+        port = self.port
+        if port is None:
+            # Closed by the reader after a read error, the reconnect follows
+            return False
+        try:
+            port.write(data)
+        except Exception as e:
+            self.errors += 1
+            print("Error while writing to the serial port:", e)
+            if port is self.port:
+                self.close()
+            return False
+        return True
+
+    def write(self, pose: Tuple[int, int, int, int], submit_time: float):
+        start_time = time.perf_counter()
+        # Registered first, the echo may come back before write() returns
+        self.arm_state.sent(self.encoder.seq, pose, start_time)
+        if not self.send(self.encoder.pose(pose)):
+            with self.condition:
+                # Sent again after reconnecting unless something newer arrives first
+                if self.pending is None:
+                    self.pending, self.pending_time = pose, submit_time
+            return
+        end_time = time.perf_counter()
+        with self.condition:
+            self.write_times.append(end_time - start_time)
+            self.latencies.append(end_time - submit_time)
+        self.last_pose = pose
+        self.written += 1
+
+    def wait(self, delay: float):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running, delay)
+
+    def close(self):
+        port, self.port = self.port, None
+        if port is not None:
+            try:
+                port.close()
+            except Exception as e:
+                print("Error while closing serial port:", e)
+
+    def stop(self, timeout: float = 1.0):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            latencies = np.array(self.latencies, dtype=np.float64) * 1000
+            write_times = np.array(self.write_times, dtype=np.float64) * 1000
+        return {
+            'connected': self.connected(),
+            'baudrate': self.baudrate,
+            'submitted': self.submitted,
+            'written': self.written,
+            'replaced': self.replaced,
+            'queue_depth': self.queue_depth(),
+            'errors': self.errors,
+            'reconnects': max(0, self.connects - 1),
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2) if latencies.size else 0.0,
+            'latency_max_ms': round(float(latencies.max()), 2) if latencies.size else 0.0,
+            'write_p50_ms': round(float(np.percentile(write_times, 50)), 2) if write_times.size else 0.0,
+        }
+
+
+def describe(stats: Dict[str, Any]) -> str:
+    if not stats['connected']:
+        return f"not connected, {stats['errors']} errors, {stats['reconnects']} reconnects"
+    return (f"{stats['latency_p50_ms']} ms p50, {stats['latency_max_ms']} ms max, depth {stats['queue_depth']}, "
+            f"{stats['errors']} errors, {stats['reconnects']} reconnects")
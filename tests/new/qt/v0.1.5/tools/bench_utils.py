@@ -0,0 +1,50 @@
+import json
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+DEFAULT_WEIGHTS = './src/misc/weight-hand-segmentation-v14.pt'
+
+
+def summarize(times: Iterable[float]) -> Dict[str, float]:
+    # Per-frame times in seconds -> milliseconds statistics
+    times = np.asarray(list(times), dtype=np.float64) * 1000
+    if times.size == 0:
+        return {'frames': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'fps': 0.0}
+    return {
+        'frames': int(times.size),
+        'mean_ms': round(float(times.mean()), 3),
+        'p50_ms': round(float(np.percentile(times, 50)), 3),
+        'p95_ms': round(float(np.percentile(times, 95)), 3),
+        'p99_ms': round(float(np.percentile(times, 99)), 3),
+        'fps': round(float(1000 / times.mean()), 2) if times.mean() > 0 else 0.0,
+    }
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Pairwise IoU between (N, 4) and (M, 4) boxes in x1, y1, x2, y2
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def print_table(rows: List[Dict], columns: List[str]):
+    widths = [max(len(column), *(len(str(row.get(column, ''))) for row in rows)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(width) for column, width in zip(columns, widths)))
+
+
+def save_json(path: str, data: Dict):
+    with open(path, 'w') as json_file:
+        json.dump(data, json_file, indent=2)
+
+
+def load_json(path: str) -> Dict:
+    with open(path, 'r') as json_file:
+        return json.load(json_file)
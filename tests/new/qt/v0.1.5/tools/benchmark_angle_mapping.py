@@ -0,0 +1,89 @@
+"""Times the pixel-to-angle mapping of the arm against the previous np.interp path.
+
+    python -m tools.benchmark_angle_mapping --calls 100000 --batch 64
+
+The previous functions are kept here as the reference. Before timing, every integer centroid
+from -50 to 50 pixels past the calibrated range is checked to give the same base, arm1 and
+arm2 angles. The report gives nanoseconds per centroid for the scalar path used once per frame
+and for the batch API on --batch centroids at a time.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gestures import robotic_arm
+from gestures.robotic_arm import AngleMapper, ArmCalibration
+from tools.bench_utils import print_table
+
+
+def interp_base_angle(m_coord_x: float) -> int:
+    rotating_base_angle = robotic_arm.map(m_coord_x, 110, 530, 0, 180)
+    return int(rotating_base_angle)
+
+
+def interp_arm_angles(m_coord_y: float):
+    arm2_angle = robotic_arm.map(m_coord_y, 80, 400, 95, 180)
+    aux_h1 = (180 * 95) // arm2_angle
+    return int(aux_h1), int(arm2_angle)
+
+
+def check(mapper: AngleMapper, calibration: ArmCalibration):
+    for m_coord_x in range(calibration.x_min - 50, calibration.x_max + 50):
+        if mapper.base_angle(m_coord_x) != interp_base_angle(m_coord_x):
+            raise SystemExit(f'Base angle differs at x={m_coord_x}')
+    for m_coord_y in range(calibration.y_min - 50, calibration.y_max + 50):
+        if mapper.arm_angles(m_coord_y) != interp_arm_angles(m_coord_y):
+            raise SystemExit(f'Arm angles differ at y={m_coord_y}')
+
+    centroids = np.stack([np.arange(0, 640), np.arange(0, 640) * 480 // 640], axis=1)
+    expected = [(interp_base_angle(x), *interp_arm_angles(y)) for x, y in centroids]
+    if mapper.angles(centroids).tolist() != [list(row) for row in expected]:
+        raise SystemExit('Batch angles differ from the scalar path')
+
+
+def time_per_call(step, values) -> float:
+    start_time = time.perf_counter()
+    for value in values:
+        step(value)
+    return (time.perf_counter() - start_time) / len(values) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    calibration = ArmCalibration()
+    build_start_time = time.perf_counter()
+    mapper = AngleMapper(calibration)
+    build_time = time.perf_counter() - build_start_time
+    check(mapper, calibration)
+
+    rng = np.random.default_rng(args.seed)
+    xs = rng.integers(0, 640, args.calls).tolist()
+    ys = rng.integers(0, 480, args.calls).tolist()
+    batches = [rng.integers(0, [640, 480], (args.batch, 2)) for _ in range(max(1, args.calls // args.batch))]
+
+    def interp_batch(centroids):
+        return [(interp_base_angle(x), *interp_arm_angles(y)) for x, y in centroids.tolist()]
+
+    rows = [
+        dict(path='base angle', interp_ns=round(time_per_call(interp_base_angle, xs)),
+             table_ns=round(time_per_call(mapper.base_angle, xs))),
+        dict(path='arm angles', interp_ns=round(time_per_call(interp_arm_angles, ys)),
+             table_ns=round(time_per_call(mapper.arm_angles, ys))),
+        dict(path=f'batch of {args.batch}', interp_ns=round(time_per_call(interp_batch, batches) / args.batch),
+             table_ns=round(time_per_call(mapper.angles, batches) / args.batch)),
+    ]
+    for row in rows:
+        row['speedup'] = round(row['interp_ns'] / row['table_ns'], 1) if row['table_ns'] > 0 else None
+
+    print(f'Tables built in {build_time * 1000:.2f} ms')
+    print_table(rows, ['path', 'interp_ns', 'table_ns', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
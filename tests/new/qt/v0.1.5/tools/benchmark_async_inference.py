@@ -0,0 +1,104 @@
+"""Measures the throughput gained by overlapping inference with drawing, on a recorded clip.
+
+    python -m tools.benchmark_async_inference --source clip.mp4 --depths 1,2 --frames 300
+    python -m tools.benchmark_async_inference --source clip.mp4 --output-mode boxes --save async.json
+
+Each depth replays the clip through a FrameGrabber and an AsyncInference worker, while the main
+thread does what thread_1 does with every result: overlay and display conversion. Depth 1 is the
+sequential loop, depth 2 lets the next forward pass run while the previous frame is drawn. The
+clip is read as fast as possible and looped, so the grabber always has a fresh frame and the
+report gives the consumer FPS, the capture-to-display latency and the frames the grabber dropped.
+Results are checked to arrive in capture order.
+"""
+import argparse
+import time
+
+from gestures import frame_sources
+from gestures.async_inference import AsyncInference
+from gestures.frame_grabber import FrameGrabber
+from gestures.gesture_pipeline import build_pipeline
+from gestures.inference_backends import BACKENDS, OUTPUT_MODES, load_model
+from gestures.presentation import FramePresenter
+from tools.bench_utils import DEFAULT_WEIGHTS, print_table, save_json, summarize
+
+
+def replay(model, args: argparse.Namespace, depth: int) -> dict:
+    pipeline = build_pipeline(model, output_mode=args.output_mode, inference_size=args.inference_size)
+    presenter = FramePresenter(640, 480)
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source),
+                                             realtime=args.realtime, loop=True)
+    grabber = FrameGrabber(source)
+    inference = AsyncInference(pipeline, grabber, depth=depth)
+    grabber.start()
+    inference.start()
+
+    latencies = []
+    processed = 0
+    last_index = 0
+    dropped_at_start = 0
+    start_time = time.perf_counter()
+    try:
+        while processed < args.frames + args.warmup:
+            result = inference.next_result(timeout=1.0)
+            if result is None:
+                if inference.finished():
+                    break
+                continue
+            if result.frame_index <= last_index:
+                raise SystemExit(f'Frame {result.frame_index} arrived after frame {last_index}')
+            last_index = result.frame_index
+
+            presented = presenter.present(pipeline.annotate(result.frame, result.gesture))
+            if presented is not None:
+                presenter.release(presented[0])
+            inference.release()
+
+            processed += 1
+            if processed == args.warmup:
+                start_time = time.perf_counter()
+                dropped_at_start = grabber.stats()['dropped_frames']
+            elif processed > args.warmup:
+                latencies.append(time.perf_counter() - result.frame_time)
+        wall_time = time.perf_counter() - start_time
+    finally:
+        inference.stop()
+        grabber.stop()
+        source.release()
+
+    return {
+        'depth': depth,
+        'fps': round(len(latencies) / wall_time, 2) if wall_time > 0 else 0.0,
+        'latency': summarize(latencies),
+        'dropped_frames': grabber.stats()['dropped_frames'] - dropped_at_start if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic', help='video file, image directory, camera index or synthetic')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backend', choices=BACKENDS, default='pytorch')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='masks')
+    parser.add_argument('--inference-size', type=int, default=640)
+    parser.add_argument('--depths', default='1,2')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--realtime', action='store_true', help='pace offline sources like a camera')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    model = load_model(args.weights, args.backend, args.output_mode)
+    reports = [replay(model, args, int(depth)) for depth in args.depths.split(',')]
+
+    base_fps = reports[0]['fps']
+    rows = [dict(depth=report['depth'], fps=report['fps'],
+                 gain=f"{(report['fps'] / base_fps - 1) * 100:+.1f}%" if base_fps > 0 else '',
+                 latency_p50_ms=report['latency']['p50_ms'], latency_p99_ms=report['latency']['p99_ms'],
+                 dropped_frames=report['dropped_frames']) for report in reports]
+    print_table(rows, ['depth', 'fps', 'gain', 'latency_p50_ms', 'latency_p99_ms', 'dropped_frames'])
+    if args.save:
+        save_json(args.save, {'source': args.source, 'depths': reports})
+
+
+if __name__ == '__main__':
+    main()
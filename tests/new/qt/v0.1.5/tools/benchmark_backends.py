@@ -0,0 +1,96 @@
+"""Compares the CPU inference backends for the hand segmentation weights on a recorded clip.
+
+    python -m tools.benchmark_backends --source clip.mp4 --backends pytorch,onnx,openvino
+
+Every backend runs the model on the same in-memory frames. The first backend in the list is the
+reference. For the others the report counts how many boxes match a reference box of the same class
+(IoU of at least --iou) and gives their mean IoU. Backends whose runtime is not installed are
+reported and skipped. Models are exported on first use and cached under src/misc/exported.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gestures import frame_sources
+from gestures.inference_backends import load_model
+from tools.bench_utils import DEFAULT_WEIGHTS, box_iou, print_table, save_json, summarize
+
+
+def agreement(reference: list, detections: list, iou_threshold: float) -> dict:
+    matched, total, ious = 0, 0, []
+    for expected, found in zip(reference, detections):
+        total += len(expected)
+        if len(expected) == 0 or len(found) == 0:
+            continue
+        iou = box_iou(expected[:, :4], found[:, :4])
+        iou[expected[:, None, 5] != found[None, :, 5]] = 0
+        best = iou.max(axis=1)
+        matched += int((best >= iou_threshold).sum())
+        ious.extend(best[best >= iou_threshold].tolist())
+    return {
+        'matched_boxes': f'{matched}/{total}',
+        'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+    }
+
+
+def run_backend(model, frames: list, conf: float, warmup: int) -> tuple:
+    for frame in frames[:warmup]:
+        model(source=frame, conf=conf, verbose=False)
+
+    times, detections = [], []
+    start_time = time.perf_counter()
+    for frame in frames:
+        frame_start_time = time.perf_counter()
+        results = model(source=frame, conf=conf, verbose=False)
+        times.append(time.perf_counter() - frame_start_time)
+        detections.append(results[0].boxes.data.cpu().numpy())
+    return times, detections, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backends', default='pytorch,onnx,openvino')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--conf', type=float, default=0.6)
+    parser.add_argument('--iou', type=float, default=0.9)
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    # Frames are kept in memory so decoding does not count and every backend sees the same images
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source), realtime=False)
+    frames = []
+    while len(frames) < args.frames:
+        read, frame = source.read()
+        if not read:
+            break
+        frames.append(frame)
+    source.release()
+
+    rows, reference = [], None
+    for backend in args.backends.split(','):
+        try:
+            model = load_model(args.weights, backend)
+        except Exception as e:
+            print(f"Error while loading the {backend} backend:", e)
+            continue
+
+        times, detections, elapsed = run_backend(model, frames, args.conf, args.warmup)
+        row = dict(backend=backend, throughput_fps=round(len(frames) / elapsed, 1), **summarize(times))
+        if reference is None:
+            reference = detections
+            row.update(matched_boxes='reference', mean_iou=1.0)
+        else:
+            row.update(agreement(reference, detections, args.iou))
+        rows.append(row)
+
+    print_table(rows, ['backend', 'mean_ms', 'p50_ms', 'p95_ms', 'throughput_fps', 'matched_boxes', 'mean_iou'])
+    if args.save:
+        save_json(args.save, {'source': args.source, 'frames': len(frames), 'backends': rows})
+
+
+if __name__ == '__main__':
+    main()
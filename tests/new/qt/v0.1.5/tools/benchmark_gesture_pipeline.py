@@ -0,0 +1,121 @@
+"""Replays a frame source through the gesture pipeline and reports FPS and per-frame latency.
+
+Run from the application directory, no camera or Arduino needed:
+
+    python -m tools.benchmark_gesture_pipeline --source synthetic --frames 300
+    python -m tools.benchmark_gesture_pipeline --source clip.mp4 --save bench.json
+    python -m tools.benchmark_gesture_pipeline --source clip.mp4 --baseline bench.json --max-regression 0.15
+    python -m tools.benchmark_gesture_pipeline --source clip.mp4 --inference-region roi
+    python -m tools.benchmark_gesture_pipeline --source clip.mp4 --output-mode boxes --baseline masks.json
+
+By default frames are replayed as fast as possible and in order, so two runs on the same
+machine process exactly the same frames. The total per-frame time includes drawing the overlay,
+so an output mode run against a masks baseline gives the time saved per frame. The exit code is
+1 when --baseline is given and the mean total latency regressed by more than --max-regression.
+"""
+import argparse
+import sys
+import time
+
+from gestures import frame_sources
+from gestures.gesture_pipeline import GesturePipeline
+from gestures.inference_backends import BACKENDS, OUTPUT_MODES, load_model
+from gestures.motion_gate import MotionGate
+from gestures.roi_inference import RoiInference
+from tools.bench_utils import DEFAULT_WEIGHTS, load_json, print_table, save_json, summarize
+
+
+def replay(pipeline: GesturePipeline, source: frame_sources.FrameSource, frames: int, warmup: int) -> dict:
+    inference_times = []
+    postprocess_times = []
+    annotation_times = []
+    total_times = []
+    packets = 0
+    detections = 0
+
+    index = 0
+    start_time = time.perf_counter()
+    while frames <= 0 or index < frames + warmup:
+        read, frame = source.read()
+        if not read:
+            break
+
+        frame_start_time = time.perf_counter()
+        gesture = pipeline.process(frame)
+        annotation_start_time = time.perf_counter()
+        pipeline.annotate(frame, gesture)
+        frame_end_time = time.perf_counter()
+        frame_time = frame_end_time - frame_start_time
+
+        if index >= warmup:
+            inference_times.append(gesture.inference_time)
+            postprocess_times.append(gesture.postprocess_time)
+            annotation_times.append(frame_end_time - annotation_start_time)
+            total_times.append(frame_time)
+            packets += len(gesture.packets)
+            detections += int(gesture.detected)
+        elif index == warmup - 1:
+            start_time = time.perf_counter()
+        index += 1
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        'source': source.description(),
+        'inference': summarize(inference_times),
+        'postprocess': summarize(postprocess_times),
+        'annotation': summarize(annotation_times),
+        'total': summarize(total_times),
+        'wall_fps': round(len(total_times) / wall_time, 2) if wall_time > 0 else 0.0,
+        'detections': detections,
+        'packets': packets,
+        'roi': pipeline.roi.stats() if pipeline.roi is not None else None,
+        'inference_runs': pipeline.inference_runs,
+        'reused_frames': pipeline.reused_frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic', help='camera index, video file, image directory or synthetic[:WxH[:FRAMES]]')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--frames', type=int, default=300, help='frames to measure, 0 = whole source')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--inference-region', choices=['full', 'roi'], default='full')
+    parser.add_argument('--backend', choices=BACKENDS, default='pytorch')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='masks',
+                        help='boxes and control skip the masks and their overlay')
+    parser.add_argument('--motion-gating', action='store_true', help='skip the model while the scene does not change')
+    parser.add_argument('--realtime', action='store_true', help='pace offline sources at their nominal frame rate')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    args = parser.parse_args()
+
+    roi = RoiInference() if args.inference_region == 'roi' else None
+    motion_gate = MotionGate() if args.motion_gating else None
+    pipeline = GesturePipeline(load_model(args.weights, args.backend, args.output_mode), roi=roi,
+                               motion_gate=motion_gate, output_mode=args.output_mode)
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source), realtime=args.realtime)
+    try:
+        report = replay(pipeline, source, args.frames, args.warmup)
+    finally:
+        source.release()
+
+    print(f"Source: {report['source']}  frames: {report['total']['frames']}  wall FPS: {report['wall_fps']}")
+    print_table([dict(stage=stage, **report[stage]) for stage in ('inference', 'postprocess', 'annotation', 'total')],
+                ['stage', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'fps'])
+
+    if args.save:
+        save_json(args.save, report)
+
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        change = report['total']['mean_ms'] / baseline['total']['mean_ms'] - 1
+        print(f'Mean latency change against baseline: {change * 100:+.1f}%')
+        if change > args.max_regression:
+            print('Regression above the allowed limit')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
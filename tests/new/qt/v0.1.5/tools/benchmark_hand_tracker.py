@@ -0,0 +1,72 @@
+"""Compares detect-every-N + tracking against running the hand model on every frame.
+
+    python -m tools.benchmark_hand_tracker --source clip.mp4 --detect-every 3,5,10
+
+The clip is first replayed with the model on every frame, which gives the reference centroid of
+each frame. It is then replayed once per N with the tracker filling the frames in between. For
+each N the report gives the control loop rate, how many frames ran the model and the centroid
+error against the reference in pixels.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gestures import frame_sources
+from gestures.gesture_pipeline import GesturePipeline
+from gestures.hand_tracker import HandTracker
+from tools.bench_utils import DEFAULT_WEIGHTS, print_table
+
+
+def replay(pipeline: GesturePipeline, frames: list) -> tuple:
+    centroids = []
+    start_time = time.perf_counter()
+    for frame in frames:
+        gesture = pipeline.process(frame)
+        centroids.append(gesture.hand_position if gesture.detected else None)
+    return centroids, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--detect-every', default='2,3,5,10')
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.weights)
+
+    # Frames are kept in memory so decoding does not count and every mode sees the same images
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source), realtime=False)
+    frames = []
+    while len(frames) < args.frames:
+        read, frame = source.read()
+        if not read:
+            break
+        frames.append(frame)
+    source.release()
+
+    model(source=frames[0], conf=0.6)
+    reference, elapsed = replay(GesturePipeline(model), frames)
+    rows = [dict(mode='every frame', loop_fps=round(len(frames) / elapsed, 1), model_runs=len(frames),
+                 mean_error_px=0.0, p95_error_px=0.0, max_error_px=0.0)]
+
+    for detect_every in (int(n) for n in args.detect_every.split(',')):
+        pipeline = GesturePipeline(model, tracker=HandTracker(detect_every=detect_every))
+        centroids, elapsed = replay(pipeline, frames)
+
+        errors = np.array([np.hypot(c[0] - r[0], c[1] - r[1]) for c, r in zip(centroids, reference)
+                           if c is not None and r is not None])
+        rows.append(dict(mode=f'detect every {detect_every}', loop_fps=round(len(frames) / elapsed, 1),
+                         model_runs=pipeline.inference_runs,
+                         mean_error_px=round(float(errors.mean()), 2) if errors.size else None,
+                         p95_error_px=round(float(np.percentile(errors, 95)), 2) if errors.size else None,
+                         max_error_px=round(float(errors.max()), 2) if errors.size else None))
+
+    print_table(rows, ['mode', 'loop_fps', 'model_runs', 'mean_error_px', 'p95_error_px', 'max_error_px'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Times the per-frame detection post-processing against the number of hands in the frame.
+
+    python -m tools.benchmark_postprocess --hands 0,1,2,4,8,16,32 --frames 2000
+
+The previous per-box Python loop is kept here as the reference. Both run on the same random
+(N, 6) detection arrays and the report gives microseconds per frame for each hand count. With a
+single hand both must produce the same packets and centroid, which is checked before timing.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gestures import detection_infos
+from gestures import robotic_arm
+from gestures.gesture_pipeline import GesturePipeline
+from tools.bench_utils import print_table
+
+
+# The post-processing as it was before the vectorized version, one Python iteration per box
+class LoopPostprocess:
+
+    def __init__(self, pixel_threshold: int = 5):
+        self.pixel_threshold = pixel_threshold
+        self.prev_m_coord_x = 0
+        self.prev_m_coord_y = 0
+        self.rotating_base_angle = None
+        self.arm1_angle = None
+        self.arm2_angle = None
+        self.gripper_angle = None
+        self.hand_position = (0, 0)
+
+    def postprocess(self, detections: np.ndarray) -> list:
+        packets = []
+        best_detection = None
+        best_score = 0
+        for detection in detections:
+            if detection[5] in [0, 1]:
+                area = (detection[2] - detection[0]) * (detection[3] - detection[1])
+                m_coord_x = int((detection[2] + detection[0]) / 2)
+                m_coord_y = int((detection[1] + detection[3]) / 2)
+                self.hand_position = (m_coord_x, m_coord_y)
+                in_range = (detection_infos.rect_top_left_x < m_coord_x < detection_infos.rect_bottom_right_x and
+                            detection_infos.rect_top_left_y < m_coord_y < detection_infos.rect_bottom_right_y)
+                score = detection_infos.calculate_score(area, detection[4])
+                detection_infos.calculate_direction(self.pixel_threshold, m_coord_x, m_coord_y,
+                                                    self.prev_m_coord_x, self.prev_m_coord_y)
+                if robotic_arm.is_moving_axis_x(self.pixel_threshold, self.prev_m_coord_x, m_coord_x):
+                    self.rotating_base_angle = robotic_arm.calculate_rotating_base_angle(m_coord_x)
+                    self.prev_m_coord_x = m_coord_x
+                if robotic_arm.is_moving_axis_y(self.pixel_threshold, self.prev_m_coord_y, m_coord_y):
+                    self.arm1_angle, self.arm2_angle = robotic_arm.calculate_angle_hastes(m_coord_y)
+                    self.prev_m_coord_y = m_coord_y
+                if score > best_score:
+                    best_score = score
+                    best_detection = detection
+                if best_detection is not None:
+                    self.gripper_angle, _ = robotic_arm.calculate_gripper_angle(int(best_detection[5]))
+                if in_range and self.rotating_base_angle is not None and self.arm1_angle is not None:
+                    packets.append((self.rotating_base_angle, self.gripper_angle, self.arm1_angle, self.arm2_angle))
+        return packets
+
+
+def random_detections(rng: np.random.Generator, hands: int) -> np.ndarray:
+    x1 = rng.uniform(0, 560, hands)
+    y1 = rng.uniform(0, 400, hands)
+    width = rng.uniform(40, 200, hands)
+    height = rng.uniform(40, 200, hands)
+    return np.stack([x1, y1, x1 + width, y1 + height, rng.uniform(0.6, 1.0, hands),
+                     rng.integers(0, 2, hands)], axis=1).astype(np.float32)
+
+
+def time_postprocess(postprocess, frames: list) -> float:
+    start_time = time.perf_counter()
+    for detections in frames:
+        postprocess(detections)
+    return (time.perf_counter() - start_time) / len(frames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hands', default='0,1,2,4,8,16,32')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    # Same decisions as the loop for the usual case of one hand
+    loop, pipeline = LoopPostprocess(), GesturePipeline(model=None)
+    for detections in (random_detections(rng, 1) for _ in range(500)):
+        if loop.postprocess(detections) != pipeline.postprocess(detections) or loop.hand_position != pipeline.hand_position:
+            raise SystemExit(f'Vectorized post-processing disagrees with the loop on {detections.tolist()}')
+
+    rows = []
+    for hands in (int(n) for n in args.hands.split(',')):
+        frames = [random_detections(rng, hands) for _ in range(args.frames)]
+        loop_us = time_postprocess(LoopPostprocess().postprocess, frames)
+        vectorized_us = time_postprocess(GesturePipeline(model=None).postprocess, frames)
+        rows.append(dict(hands=hands, loop_us=round(loop_us, 1), vectorized_us=round(vectorized_us, 1),
+                         speedup=round(loop_us / vectorized_us, 2) if vectorized_us > 0 else None))
+
+    print_table(rows, ['hands', 'loop_us', 'vectorized_us', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
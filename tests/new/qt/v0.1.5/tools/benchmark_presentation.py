@@ -0,0 +1,104 @@
+"""Micro-benchmark of the frame presentation stage of thread_1.
+
+Compares the previous flip/cvtColor/flip/QImage/scaled chain with gestures.presentation.FramePresenter
+for a few camera resolutions:
+
+    python -m tools.benchmark_presentation --frames 500
+
+Allocations are measured with tracemalloc as the peak memory allocated while presenting one
+frame, reported both in kB and in full-frame equivalents. Memory allocated inside Qt
+(QImage.scaled in the old chain) is not seen by tracemalloc, so the old chain is reported
+with one more copy than it really makes whenever the frame is not already 640x480.
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from gestures.frame_sources import SyntheticSource
+from gestures.presentation import FramePresenter
+from tools.bench_utils import print_table, summarize
+
+try:
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtGui import QImage
+except ImportError:
+    QImage = None
+
+
+def old_chain(annotated_frame: np.ndarray):
+    flipped_annotated_frame = cv2.flip(annotated_frame, 1)
+    image = cv2.cvtColor(flipped_annotated_frame, cv2.COLOR_BGR2RGB)
+    flipped_image = cv2.flip(image, 1)
+    if QImage is None:
+        return flipped_image
+    converted_image = QImage(flipped_image.data, flipped_image.shape[1], flipped_image.shape[0],
+                             QImage.Format.Format_RGB888)
+    return converted_image.scaled(640, 480, Qt.AspectRatioMode.KeepAspectRatio)
+
+
+def new_chain(presenter: FramePresenter):
+    def present(annotated_frame: np.ndarray):
+        buffer_index, display_image = presenter.present(annotated_frame)
+        if QImage is not None:
+            QImage(display_image.data, display_image.shape[1], display_image.shape[0],
+                   display_image.strides[0], QImage.Format.Format_RGB888)
+        # The GUI releases the buffer once the pixmap is made
+        presenter.release(buffer_index)
+        return display_image
+    return present
+
+
+def measure(step, frames: list) -> dict:
+    # Timing pass
+    times = []
+    for frame in frames:
+        start_time = time.perf_counter()
+        step(frame)
+        times.append(time.perf_counter() - start_time)
+
+    # Allocation pass
+    frame_bytes = frames[0].nbytes
+    peaks = []
+    tracemalloc.start()
+    for frame in frames[:50]:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        step(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    report = summarize(times)
+    peak = float(np.median(peaks))
+    report['alloc_kb'] = round(peak / 1024, 1)
+    report['frame_allocs'] = round(peak / frame_bytes, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--sizes', default='640x480,1280x720,1920x1080')
+    args = parser.parse_args()
+
+    if QImage is None:
+        print('PyQt6 not available, the QImage steps are left out of both chains')
+
+    rows = []
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.split('x'))
+        source = SyntheticSource(width, height, frames=30, realtime=False, loop=True)
+        frames = [source.read()[1] for _ in range(30)] * max(1, args.frames // 30)
+
+        presenter = FramePresenter(640, 480)
+        for name, step in (('old', old_chain), ('new', new_chain(presenter))):
+            step(frames[0])
+            rows.append(dict(size=size, chain=name, **measure(step, frames)))
+
+    print_table(rows, ['size', 'chain', 'mean_ms', 'p50_ms', 'p99_ms', 'alloc_kb', 'frame_allocs'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Measures the round-trip latency of the serial link at each baud rate.
+
+    python -m tools.benchmark_serial_link --port COM3
+    python -m tools.benchmark_serial_link --port /dev/ttyUSB0 --rates 9600,115200,1000000 --pings 500
+    python -m tools.benchmark_serial_link --port COM5 --loopback
+
+With the arm firmware on the other end, every rate is negotiated like the application does it
+and the firmware answers pings with pongs carrying the same payload. The payload is the size of
+a pose, so the round trip is one command plus its echo. With --loopback the port has TX wired to RX
+(or is a loop:// URL), no firmware is needed and every ping comes back as itself. Rates the
+firmware refuses are reported as unsupported. The wire time column is the theoretical time of one
+frame each way.
+"""
+import argparse
+import time
+
+import serial
+
+from gestures.arm_output import BITS_PER_BYTE, POSE_FRAME_BYTES, link_packet_rate
+from serial_link import link, protocol
+from tools.bench_utils import print_table, save_json, summarize
+
+
+def wait_for_firmware(port) -> bool:
+    # Opening the port resets most boards, they answer once booted
+    encoder, decoder = protocol.FrameEncoder(), protocol.FrameDecoder()
+    deadline = time.perf_counter() + link.HANDSHAKE_TIMEOUT
+    while time.perf_counter() < deadline:
+        if link.exchange(port, encoder, decoder, protocol.PING, b'', protocol.PONG) is not None:
+            return True
+    return False
+
+
+def measure(port, pings: int, reply_type: int) -> dict:
+    encoder, decoder = protocol.FrameEncoder(), protocol.FrameDecoder()
+    round_trips = []
+    lost = 0
+    for index in range(pings):
+        start_time = time.perf_counter()
+        reply = link.exchange(port, encoder, decoder, protocol.PING, bytes((index & 0xFF, 0, 0, 0)), reply_type)
+        if reply is None:
+            lost += 1
+        else:
+            round_trips.append(time.perf_counter() - start_time)
+    return {'round_trip': summarize(round_trips), 'lost': lost}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', required=True, help='COM3, /dev/ttyACM0 or a pyserial URL such as loop://')
+    parser.add_argument('--rates', default='9600,' + ','.join(str(rate) for rate in sorted(link.FAST_BAUD_RATES)))
+    parser.add_argument('--pings', type=int, default=200)
+    parser.add_argument('--loopback', action='store_true', help='TX wired to RX, no firmware')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    port = serial.serial_for_url(args.port, link.DEFAULT_BAUD, timeout=0.2)
+    rows = []
+    try:
+        if not args.loopback and not wait_for_firmware(port):
+            raise SystemExit(f'No answer from the firmware on {args.port} at {link.DEFAULT_BAUD} baud')
+        for rate in link.parse_baud_rates(args.rates):
+            if args.loopback:
+                port.baudrate = rate
+            elif rate != port.baudrate:
+                if not link.request_baud(port, rate, protocol.FrameEncoder(), protocol.FrameDecoder()):
+                    rows.append(dict(baudrate=rate, status='unsupported'))
+                    continue
+            report = measure(port, args.pings, protocol.PING if args.loopback else protocol.PONG)
+            rows.append(dict(baudrate=rate, status='ok',
+                             wire_ms=round(POSE_FRAME_BYTES * BITS_PER_BYTE / rate * 1000, 3),
+                             max_poses_per_s=round(link_packet_rate(rate)),
+                             rtt_p50_ms=report['round_trip']['p50_ms'], rtt_p99_ms=report['round_trip']['p99_ms'],
+                             lost=report['lost']))
+            print(f"{rate} baud: p50 {rows[-1]['rtt_p50_ms']} ms, p99 {rows[-1]['rtt_p99_ms']} ms, lost {report['lost']}")
+    finally:
+        if not args.loopback and port.baudrate != link.DEFAULT_BAUD:
+            link.request_baud(port, link.DEFAULT_BAUD, protocol.FrameEncoder(), protocol.FrameDecoder())
+        port.close()
+
+    print_table(rows, ['baudrate', 'status', 'wire_ms', 'max_poses_per_s', 'rtt_p50_ms', 'rtt_p99_ms', 'lost'])
+    if args.save:
+        save_json(args.save, {'port': args.port, 'loopback': args.loopback, 'rates': rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Measures how long the producer loop waits on serial writes, direct and through the writer thread.
+
+    python -m tools.benchmark_serial_writer
+    python -m tools.benchmark_serial_writer --write-ms 5 --stall-every 100 --stall-ms 500
+    python -m tools.benchmark_serial_writer --port COM3 --rate 60
+
+A simulated port takes --write-ms per write and every --stall-every-th write blocks for --stall-ms
+then fails, like a port whose write timeout expired or a board that was unplugged. With --port the
+real port is used instead (no stalls are injected). The producer submits --poses poses at --rate per
+second; the report compares its time per submit with direct writes against the writer thread,
+together with the writer's own latency, replaced poses, errors and reconnects.
+"""
+import argparse
+import threading
+import time
+
+from serial_link import link, protocol
+from serial_link.writer import SerialWriter
+from tools.bench_utils import print_table, save_json, summarize
+
+
+# Stands in for the serial port, slow writes and a stall that ends in a write timeout
+class SimulatedPort:
+
+    def __init__(self, write_time: float, stall_every: int, stall_time: float):
+        self.write_time = write_time
+        self.stall_every = stall_every
+        self.stall_time = stall_time
+        self.writes = 0
+        self.write_timeout = None
+        self.in_waiting = 0
+        self.lock = threading.Lock()
+
+    def write(self, data: bytes) -> int:
+        with self.lock:
+            self.writes += 1
+            stalled = self.stall_every > 0 and self.writes % self.stall_every == 0
+        if stalled:
+            time.sleep(self.stall_time)
+            raise OSError('Write timeout')
+        time.sleep(self.write_time)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        # No firmware behind it, no state reports come back
+        time.sleep(0.05)
+        return b''
+
+    def close(self):
+        pass
+
+
+def poses(count: int):
+    for index in range(count):
+        yield 90 + index % 40, 10, 100 + index % 30, 150
+
+
+def run_direct(port, count: int, rate: float) -> dict:
+    encoder = protocol.FrameEncoder()
+    submit_times = []
+    errors = 0
+    for pose in poses(count):
+        start_time = time.perf_counter()
+        try:
+            port.write(encoder.pose(pose))
+        except Exception:
+            errors += 1
+        submit_times.append(time.perf_counter() - start_time)
+        time.sleep(max(0.0, 1.0 / rate - submit_times[-1]))
+    return {'submit': summarize(submit_times), 'submit_max_ms': round(max(submit_times) * 1000, 3), 'errors': errors}
+
+
+def run_writer(opener, count: int, rate: float) -> dict:
+    writer = SerialWriter('benchmark', opener=opener)
+    writer.start()
+    submit_times = []
+    for pose in poses(count):
+        start_time = time.perf_counter()
+        writer.submit(pose)
+        submit_times.append(time.perf_counter() - start_time)
+        time.sleep(max(0.0, 1.0 / rate - submit_times[-1]))
+    time.sleep(0.2)
+    writer.stop()
+    return {'submit': summarize(submit_times), 'submit_max_ms': round(max(submit_times) * 1000, 3),
+            'writer': writer.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', help='real serial port instead of the simulated one')
+    parser.add_argument('--rates', default=','.join(str(rate) for rate in link.FAST_BAUD_RATES),
+                        help='baud rates negotiated on a real port')
+    parser.add_argument('--poses', type=int, default=600)
+    parser.add_argument('--rate', type=float, default=30.0, help='poses per second, the camera frame rate')
+    parser.add_argument('--write-ms', type=float, default=2.0)
+    parser.add_argument('--stall-every', type=int, default=150, help='0 turns the stalls off')
+    parser.add_argument('--stall-ms', type=float, default=500.0)
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    if args.port:
+        baud_rates = link.parse_baud_rates(args.rates)
+        port, baudrate = link.open_port(args.port, baud_rates)
+        print(f'{args.port} at {baudrate} baud')
+        try:
+            direct = run_direct(port, args.poses, args.rate)
+        finally:
+            port.close()
+        threaded = run_writer(lambda name, rates: link.open_port(args.port, baud_rates), args.poses, args.rate)
+    else:
+        def simulated_port():
+            return SimulatedPort(args.write_ms / 1000, args.stall_every, args.stall_ms / 1000)
+
+        direct = run_direct(simulated_port(), args.poses, args.rate)
+        threaded = run_writer(lambda name, rates: (simulated_port(), link.DEFAULT_BAUD), args.poses, args.rate)
+
+    rows = [
+        dict(mode='direct', submit_p50_ms=direct['submit']['p50_ms'], submit_p99_ms=direct['submit']['p99_ms'],
+             submit_max_ms=direct['submit_max_ms'], errors=direct['errors']),
+        dict(mode='writer thread', submit_p50_ms=threaded['submit']['p50_ms'],
+             submit_p99_ms=threaded['submit']['p99_ms'], submit_max_ms=threaded['submit_max_ms'],
+             errors=threaded['writer']['errors'], written=threaded['writer']['written'],
+             replaced=threaded['writer']['replaced'], reconnects=threaded['writer']['reconnects'],
+             latency_p50_ms=threaded['writer']['latency_p50_ms'], latency_max_ms=threaded['writer']['latency_max_ms']),
+    ]
+    print_table(rows, ['mode', 'submit_p50_ms', 'submit_p99_ms', 'submit_max_ms', 'errors', 'written', 'replaced',
+                       'reconnects', 'latency_p50_ms', 'latency_max_ms'])
+    if args.save:
+        save_json(args.save, {'port': args.port or 'simulated', 'direct': direct, 'writer': threaded})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Feeds corrupted frame streams to the serial frame decoder and checks that it recovers.
+
+    python -m tools.fuzz_serial_protocol --frames 20000 --corruption 0.2
+    python -m tools.fuzz_serial_protocol --seeds 0-49 --max-chunk 1
+
+The stream starts mid-frame, like a port opened while the host is sending, and every frame is
+corrupted with the given probability. A corruption flips a bit, drops bytes, inserts garbage,
+duplicates part of the frame, cuts the frame short or inserts a run of sync bytes or a fake
+header that announces the longest payload. The stream is fed in random chunks of 1 to --max-chunk
+bytes. The run fails when a frame that came through untouched is not decoded, or when the decoder
+returns a frame that was never sent. The exit code is 1 on failure.
+
+A frame cut short right before bytes that the next frame starts with (its last CRC byte equal to
+the sync byte) still passes the CRC, borrowing them. It is decoded as sent and the next frame
+is lost; the report counts such frames as absorbed instead of missing.
+"""
+import argparse
+import random
+import sys
+import time
+
+from serial_link import protocol
+
+
+def corrupt(frame: bytearray, rng: random.Random) -> bytearray:
+    kind = rng.randrange(7)
+    position = rng.randrange(len(frame))
+    if kind == 0:
+        frame[position] ^= 1 << rng.randrange(8)
+    elif kind == 1:
+        del frame[position:position + rng.randint(1, 3)]
+    elif kind == 2:
+        frame[position:position] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+    elif kind == 3:
+        frame[position:position] = frame[rng.randrange(len(frame)):][:rng.randint(1, 6)]
+    elif kind == 4:
+        del frame[position:]
+    elif kind == 5:
+        frame[position:position] = bytes((protocol.SYNC,)) * rng.randint(1, 8)
+    else:
+        frame[position:position] = bytes((protocol.SYNC, protocol.VERSION, protocol.POSE, 0, protocol.MAX_PAYLOAD))
+    return frame
+
+
+def run(seed: int, frames: int, corruption: float, max_chunk: int) -> dict:
+    rng = random.Random(seed)
+    encoder = protocol.FrameEncoder()
+
+    # Second half of a frame first, as if the port was opened mid-stream
+    stream = bytearray(encoder.pose((90, 10, 90, 90))[rng.randint(1, 10):])
+    sent = []
+    intact = []
+    corrupted = set()
+    for _ in range(frames):
+        pose = tuple(rng.randrange(181) for _ in range(4))
+        seq = encoder.seq
+        frame = bytearray(encoder.pose(pose))
+        sent.append((seq, pose))
+        if rng.random() < corruption:
+            frame = corrupt(frame, rng)
+            corrupted.add((seq, pose))
+        else:
+            intact.append((seq, pose))
+        stream += frame
+
+    decoder = protocol.FrameDecoder()
+    decoded = []
+    position = 0
+    start_time = time.perf_counter()
+    while position < len(stream):
+        chunk = rng.randint(1, max_chunk)
+        decoded.extend((frame.seq, tuple(frame.payload)) for frame in decoder.feed(bytes(stream[position:position + chunk])))
+        position += chunk
+    decode_time = time.perf_counter() - start_time
+
+    # Intact frames must come out in order, among the frames the corrupted ones may have left
+    missing = 0
+    absorbed = 0
+    index = 0
+    decoded_set = set(decoded)
+    sent_set = set(sent)
+    previous = {frame: sent[i - 1] for i, frame in enumerate(sent) if i > 0}
+    for frame in intact:
+        try:
+            index = decoded.index(frame, index) + 1
+        except ValueError:
+            if previous.get(frame) in corrupted and previous.get(frame) in decoded_set:
+                absorbed += 1
+            else:
+                missing += 1
+    return {
+        'seed': seed,
+        'bytes': len(stream),
+        'intact': len(intact),
+        'decoded': len(decoded),
+        'missing': missing,
+        'absorbed': absorbed,
+        'spurious': sum(1 for frame in decoded if frame not in sent_set),
+        'crc_errors': decoder.crc_errors,
+        'skipped_bytes': decoder.skipped_bytes,
+        'kb_per_s': round(len(stream) / decode_time / 1000, 1) if decode_time > 0 else 0.0,
+    }
+
+
+def parse_seeds(text: str) -> list:
+    if '-' in text:
+        first, last = text.split('-')
+        return list(range(int(first), int(last) + 1))
+    return [int(seed) for seed in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--corruption', type=float, default=0.2, help='probability that a frame is corrupted')
+    parser.add_argument('--max-chunk', type=int, default=32, help='largest number of bytes fed at once')
+    parser.add_argument('--seeds', default='0-9')
+    args = parser.parse_args()
+
+    failed = False
+    for seed in parse_seeds(args.seeds):
+        report = run(seed, args.frames, args.corruption, args.max_chunk)
+        print(', '.join(f'{key} {value}' for key, value in report.items()))
+        if report['missing'] or report['spurious']:
+            failed = True
+            print(f'Seed {seed}: decoder did not recover')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Measures achieved frame rate and read latency of a camera for every capture profile.
+
+    python -m tools.probe_capture_profiles --device 0
+    python -m tools.probe_capture_profiles --device 1 --profiles "640x480@30 MJPG buf1,640x480@30 YUYV"
+
+The profile with the lowest median read latency that still delivers frames is printed at the
+end, it can be selected as "Capture Profile" in the setup window.
+"""
+import argparse
+
+from gestures import capture_profiles
+from tools.bench_utils import print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--device', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=90)
+    parser.add_argument('--profiles', default=','.join(capture_profiles.PROFILES))
+    args = parser.parse_args()
+
+    rows = []
+    for text in args.profiles.split(','):
+        profile = capture_profiles.parse_profile(text)
+        print(f'Probing {profile}...')
+        rows.append(capture_profiles.probe_profile(args.device, profile, frames=args.frames))
+
+    print_table(rows, ['requested', 'granted', 'frames', 'fps', 'read_p50_ms', 'read_p99_ms'])
+
+    working = [row for row in rows if row['frames'] > 0]
+    if working:
+        best = min(working, key=lambda row: row['read_p50_ms'])
+        print(f"Lowest latency profile: {best['requested']} (granted {best['granted']})")
+    else:
+        print('The device did not deliver frames with any profile')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Accuracy and latency of the full-precision hand model against its INT8 variant.
+
+    python -m tools.quantization_report --images dataset/images/val --labels dataset/labels/val
+    python -m tools.quantization_report --source recordings/station1.mp4
+
+With --labels the detections are scored against YOLO-format labels (boxes or segmentation
+polygons, named after the images). Without labels the first variant stands in for the ground
+truth, which measures how far the INT8 model drifts from it rather than absolute accuracy. The
+report gives precision and recall for closed (class 0) and open (class 1) hands at IoU 0.5,
+along with the per-frame latency of each variant.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from gestures import frame_sources
+from gestures.inference_backends import load_model
+from tools.bench_utils import DEFAULT_WEIGHTS, box_iou, print_table, save_json, summarize
+
+CLASS_NAMES = {0: 'closed', 1: 'open'}
+
+
+def read_labels(path: str, width: int, height: int) -> np.ndarray:
+    # (N, 6) boxes in pixels with conf 1, from "cls cx cy w h" or "cls x1 y1 x2 y2 ..." polygon lines
+    boxes = []
+    if os.path.exists(path):
+        with open(path, 'r') as label_file:
+            for line in label_file:
+                values = [float(v) for v in line.split()]
+                if len(values) == 5:
+                    cls, cx, cy, w, h = values
+                    x1, y1, x2, y2 = cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+                elif len(values) > 5:
+                    cls, points = values[0], np.array(values[1:]).reshape(-1, 2)
+                    (x1, y1), (x2, y2) = points.min(axis=0), points.max(axis=0)
+                else:
+                    continue
+                boxes.append((x1 * width, y1 * height, x2 * width, y2 * height, 1.0, cls))
+    return np.array(boxes, dtype=np.float32).reshape(-1, 6)
+
+
+def load_frames(args) -> tuple:
+    # Frames and, when labels are given, the matching ground truth
+    if args.images:
+        source = frame_sources.ImageDirectorySource(args.images, realtime=False)
+        frames, truth = [], []
+        for path in source.files[:args.frames]:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            frames.append(frame)
+            if args.labels:
+                stem = os.path.splitext(os.path.basename(path))[0]
+                truth.append(read_labels(os.path.join(args.labels, stem + '.txt'), frame.shape[1], frame.shape[0]))
+        return frames, truth or None
+
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source), realtime=False)
+    frames = []
+    while len(frames) < args.frames:
+        read, frame = source.read()
+        if not read:
+            break
+        frames.append(frame)
+    source.release()
+    return frames, None
+
+
+def precision_recall(truth: list, detections: list, iou_threshold: float = 0.5) -> dict:
+    # Greedy matching by confidence, per class
+    counts = {cls: [0, 0, 0] for cls in CLASS_NAMES}  # true positives, false positives, false negatives
+    for expected, found in zip(truth, detections):
+        for cls in CLASS_NAMES:
+            expected_cls = expected[expected[:, 5] == cls]
+            found_cls = found[found[:, 5] == cls]
+            found_cls = found_cls[np.argsort(-found_cls[:, 4])]
+            matched = np.zeros(len(expected_cls), dtype=bool)
+            if len(expected_cls) and len(found_cls):
+                iou = box_iou(found_cls[:, :4], expected_cls[:, :4])
+                for row in iou:
+                    row = np.where(matched, 0, row)
+                    if row.size and row.max() >= iou_threshold:
+                        matched[row.argmax()] = True
+                        counts[cls][0] += 1
+                    else:
+                        counts[cls][1] += 1
+            else:
+                counts[cls][1] += len(found_cls)
+            counts[cls][2] += int((~matched).sum())
+
+    report = {}
+    for cls, (tp, fp, fn) in counts.items():
+        report[f'{CLASS_NAMES[cls]}_precision'] = round(tp / (tp + fp), 3) if tp + fp else None
+        report[f'{CLASS_NAMES[cls]}_recall'] = round(tp / (tp + fn), 3) if tp + fn else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic', help='clip or camera spec when --images is not given')
+    parser.add_argument('--images', help='directory of images')
+    parser.add_argument('--labels', help='directory of YOLO-format labels for --images')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--variants', default='pytorch,onnx-int8')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--conf', type=float, default=0.6)
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    frames, truth = load_frames(args)
+    print(f"{len(frames)} frames, " + ('scored against labels' if truth else 'scored against the first variant'))
+
+    rows = []
+    for variant in args.variants.split(','):
+        model = load_model(args.weights, variant)
+        for frame in frames[:args.warmup]:
+            model(source=frame, conf=args.conf, verbose=False)
+
+        times, detections = [], []
+        for frame in frames:
+            frame_start_time = time.perf_counter()
+            results = model(source=frame, conf=args.conf, verbose=False)
+            times.append(time.perf_counter() - frame_start_time)
+            detections.append(results[0].boxes.data.cpu().numpy().reshape(-1, 6))
+
+        if truth is None:
+            truth = detections
+        latency = summarize(times)
+        rows.append(dict(variant=variant, mean_ms=latency['mean_ms'], p50_ms=latency['p50_ms'],
+                         p95_ms=latency['p95_ms'], fps=latency['fps'], **precision_recall(truth, detections)))
+
+    print_table(rows, ['variant', 'mean_ms', 'p50_ms', 'p95_ms', 'fps', 'closed_precision', 'closed_recall',
+                       'open_precision', 'open_recall'])
+    if args.save:
+        save_json(args.save, {'frames': len(frames), 'labelled': bool(args.labels), 'variants': rows})
+
+
+if __name__ == '__main__':
+    main()
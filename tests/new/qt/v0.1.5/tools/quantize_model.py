@@ -0,0 +1,41 @@
+"""Produces the INT8 variant of the hand segmentation weights used by the onnx-int8 backend.
+
+    python -m tools.quantize_model --mode dynamic
+    python -m tools.quantize_model --mode static --calibration recordings/station1.mp4 --frames 200
+
+Dynamic mode only quantizes the weights. Static mode also calibrates the activation ranges on
+frames drawn from a recorded clip or image directory, which is usually faster and should be
+checked with tools.quantization_report. The result is cached next to the ONNX export, and the
+onnx-int8 backend prefers the static model when both exist.
+"""
+import argparse
+import time
+
+from gestures import frame_sources
+from gestures.quantization import QUANTIZATION_MODES, calibration_frames, quantize_weights
+from tools.bench_utils import DEFAULT_WEIGHTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--mode', choices=QUANTIZATION_MODES, default='dynamic')
+    parser.add_argument('--calibration', help='recorded clip or image directory for static mode')
+    parser.add_argument('--frames', type=int, default=100, help='number of calibration frames')
+    parser.add_argument('--stride', type=int, default=5, help='take every Nth frame of the recording')
+    args = parser.parse_args()
+
+    frames = None
+    if args.mode == 'static':
+        if not args.calibration:
+            parser.error('--calibration is required for static quantization')
+        frames = calibration_frames(frame_sources.parse_capture_device(args.calibration), args.frames, args.stride)
+        print(f"Calibrating on {len(frames)} frames")
+
+    start_time = time.perf_counter()
+    path = quantize_weights(args.weights, args.mode, frames)
+    print(f"Wrote {path} in {time.perf_counter() - start_time:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
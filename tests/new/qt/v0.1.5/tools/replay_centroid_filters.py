@@ -0,0 +1,165 @@
+"""Replays a hand centroid trace through every centroid filter and reports jitter, lag and serial traffic.
+
+    python -m tools.replay_centroid_filters
+    python -m tools.replay_centroid_filters --noise 3 --min-cutoff 0.5 --beta 0.05
+    python -m tools.replay_centroid_filters --source clip.mp4 --write one-euro
+
+The default trace is synthetic: the hand holds still, moves, holds and sweeps left and right,
+with Gaussian detector noise added to the known true path. With --source the centroids come from
+the hand model on a recorded clip and a centered 5-frame moving average stands in for the true
+path. For each filter the report gives:
+
+    jitter_px      RMS frame-to-frame movement of the filtered centroid while the hand holds still
+    lag_ms         delay that best aligns the filtered centroid with the true path while it moves
+    packets_per_s  poses the gesture pipeline produces (one per frame with the hand in range)
+    sent_per_s     packets the arm output writes to the serial port after suppressing repeats
+
+--write stores the selected filter and the given parameters in setup.txt. A running gesture
+window applies them within a second.
+"""
+import argparse
+
+import numpy as np
+
+from gestures import centroid_filters
+from gestures.arm_output import ArmOutput
+from gestures.gesture_pipeline import GesturePipeline
+from tools.bench_utils import DEFAULT_WEIGHTS, print_table, save_json
+from tools.setup_file import write_setup_value
+
+HAND_SIZE = 150
+
+
+# Stands in for the serial writer, the arm output counts what it submits
+class NullWriter:
+
+    def submit(self, pose) -> bool:
+        return True
+
+
+def synthetic_trace(fps: float, noise: float, seed: int):
+    # Hold, ease to a new spot, hold, 0.5 Hz sweep, hold
+    t = np.arange(int(fps * 9)) / fps
+    x = np.full(t.shape, 320.0)
+    y = np.full(t.shape, 240.0)
+    move = (t >= 2) & (t < 3)
+    ease = (1 - np.cos(np.pi * (t[move] - 2))) / 2
+    x[move], y[move] = 320 + 130 * ease, 240 + 60 * ease
+    x[t >= 3], y[t >= 3] = 450.0, 300.0
+    sweep = (t >= 4) & (t < 8)
+    x[sweep] = 450 - 120 * np.sin(np.pi * (t[sweep] - 4))
+    truth = np.stack([x, y], axis=1)
+    measured = truth + np.random.default_rng(seed).normal(0, noise, truth.shape)
+    return t, truth, measured
+
+
+def clip_trace(source: str, weights: str, fps: float):
+    from gestures import frame_sources
+    from gestures.inference_backends import load_model
+
+    pipeline = GesturePipeline(load_model(weights))
+    capture = frame_sources.open_frame_source(frame_sources.parse_capture_device(source), realtime=False)
+    times, centroids = [], []
+    index = 0
+    try:
+        while True:
+            read, frame = capture.read()
+            if not read:
+                break
+            gesture = pipeline.process(frame)
+            if gesture.detected:
+                times.append(index / fps)
+                centroids.append((gesture.m_coord_x, gesture.m_coord_y))
+            index += 1
+    finally:
+        capture.release()
+
+    measured = np.asarray(centroids, dtype=np.float64)
+    kernel = np.ones(5) / 5
+    reference = np.stack([np.convolve(np.pad(measured[:, axis], 2, mode='edge'), kernel, mode='valid')
+                          for axis in range(2)], axis=1)
+    return np.asarray(times), reference, measured
+
+
+def replay(centroid_filter, t: np.ndarray, truth: np.ndarray, measured: np.ndarray) -> dict:
+    pipeline = GesturePipeline(model=None, centroid_filter=centroid_filter)
+    filtered = np.zeros_like(measured)
+    arm_commands = ArmOutput(NullWriter())
+    packets = 0
+    for i, (x, y) in enumerate(measured):
+        detections = np.array([[x - HAND_SIZE / 2, y - HAND_SIZE / 2, x + HAND_SIZE / 2, y + HAND_SIZE / 2, 0.9, 1]],
+                              dtype=np.float32)
+        for packet in pipeline.postprocess(detections, frame_time=t[i]):
+            packets += 1
+            arm_commands.submit(packet, now=t[i])
+        arm_commands.poll(now=t[i])
+        filtered[i] = pipeline.m_coord_x, pipeline.m_coord_y
+
+    # Holds and moves are told apart on the true path
+    speed = np.r_[0.0, np.hypot(*np.diff(truth, axis=0).T)]
+    still = speed < 0.5
+    steps = np.hypot(*np.diff(filtered, axis=0).T)
+    jitter = float(np.sqrt(np.mean(steps[still[1:]] ** 2))) if still[1:].any() else 0.0
+
+    # Delay in ms, 1 ms steps, that minimizes the error against the delayed true path
+    moving = ~still
+    lag = 0
+    if moving.any():
+        errors = [np.mean((np.interp(t[moving] - lag_ms / 1000, t, truth[:, 0]) - filtered[moving, 0]) ** 2 +
+                          (np.interp(t[moving] - lag_ms / 1000, t, truth[:, 1]) - filtered[moving, 1]) ** 2)
+                  for lag_ms in range(0, 501)]
+        lag = int(np.argmin(errors))
+
+    duration = t[-1] - t[0] if len(t) > 1 else 1.0
+    return {'jitter_px': round(jitter, 2), 'lag_ms': lag, 'packets_per_s': round(packets / duration, 1),
+            'sent_per_s': round(arm_commands.sent / duration, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', help='recorded clip instead of the synthetic trace')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--noise', type=float, default=2.0, help='detector noise of the synthetic trace, pixels')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alpha', type=float)
+    parser.add_argument('--min-cutoff', type=float)
+    parser.add_argument('--beta', type=float)
+    parser.add_argument('--d-cutoff', type=float)
+    parser.add_argument('--process-noise', type=float)
+    parser.add_argument('--measurement-noise', type=float)
+    parser.add_argument('--write', choices=centroid_filters.FILTERS, help='store this filter and the parameters in setup.txt')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    params = {name: value for name, value in (('alpha', args.alpha), ('min_cutoff', args.min_cutoff),
+                                              ('beta', args.beta), ('d_cutoff', args.d_cutoff),
+                                              ('process_noise', args.process_noise),
+                                              ('measurement_noise', args.measurement_noise)) if value is not None}
+    if args.source:
+        t, truth, measured = clip_trace(args.source, args.weights, args.fps)
+    else:
+        t, truth, measured = synthetic_trace(args.fps, args.noise, args.seed)
+
+    rows = []
+    for name in centroid_filters.FILTERS:
+        centroid_filter = centroid_filters.make_filter(name, params)
+        rows.append(dict(filter=name, params=', '.join(f'{key} {value:g}' for key, value in
+                                                       (centroid_filter.params() if centroid_filter else {}).items()),
+                         **replay(centroid_filter, t, truth, measured)))
+
+    print(f'{len(t)} frames, {t[-1] - t[0]:.1f} s')
+    print_table(rows, ['filter', 'params', 'jitter_px', 'lag_ms', 'packets_per_s', 'sent_per_s'])
+    if args.save:
+        save_json(args.save, {'source': args.source or 'synthetic', 'filters': rows})
+
+    if args.write:
+        write_setup_value('centroid_filter', args.write)
+        centroid_filter = centroid_filters.make_filter(args.write, params)
+        for key, value in (centroid_filter.params() if centroid_filter else {}).items():
+            write_setup_value(f'filter_{key}', value)
+        print(f'setup.txt: centroid_filter={args.write}')
+
+
+if __name__ == '__main__':
+    main()
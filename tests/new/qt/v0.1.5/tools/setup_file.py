@@ -0,0 +1,25 @@
+import os
+from typing import Dict
+
+SETUP_FILE = 'setup.txt'
+
+
+def read_setup(path: str = SETUP_FILE) -> Dict[str, str]:
+    # key=value lines of the station's setup.txt, as written by the setup window
+    settings = {}
+    if os.path.exists(path):
+        with open(path, 'r') as setup_file:
+            for line in setup_file:
+                line = line.strip()
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    settings[key] = value
+    return settings
+
+
+def write_setup_value(key: str, value, path: str = SETUP_FILE):
+    # Replaces or appends one key, every other line is kept in order
+    settings = read_setup(path)
+    settings[key] = str(value)
+    with open(path, 'w') as setup_file:
+        setup_file.write('\n'.join(f'{k}={v}' for k, v in settings.items()))
@@ -0,0 +1,154 @@
+"""Sweeps thread counts and core pinning of the gesture worker and reports FPS and frame-time jitter.
+
+    python -m tools.sweep_thread_config --source clip.mp4 --realtime
+    python -m tools.sweep_thread_config --source 0 --intra 1,2,3,4 --inter 1 --opencv 0,1 --pinning none,split
+
+Every configuration runs in a fresh process, because PyTorch only accepts the inter-op thread
+count once. It is set up like thread_1: the capture runs in a FrameGrabber thread, the gesture
+pipeline in an AsyncInference worker with --depth frames in flight (2, as in the app), and the loop
+draws the overlay and converts for display while the worker runs the model on the next frame.
+"split" pinning puts the capture thread on the last core and the inference worker on the others,
+the drawing loop is not pinned. The report gives the mean FPS and the p50/p99
+time between two processed frames. Use the best row for intra_op_threads, inter_op_threads,
+opencv_threads, capture_cores and inference_cores in setup.txt.
+"""
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import numpy as np
+
+from runtime.thread_config import ThreadConfig, format_cores
+from tools.bench_utils import DEFAULT_WEIGHTS, print_table, save_json
+
+
+def split_cores() -> tuple:
+    # Capture on the last core, inference on the rest
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    if len(cores) < 2:
+        return (), ()
+    return (cores[-1],), tuple(cores[:-1])
+
+
+def run_config(config: ThreadConfig, args: argparse.Namespace, results):
+    from gestures import frame_sources
+    from gestures.async_inference import AsyncInference
+    from gestures.frame_grabber import FrameGrabber
+    from gestures.gesture_pipeline import build_pipeline
+    from gestures.inference_backends import load_model
+    from gestures.presentation import FramePresenter
+    from runtime.thread_config import apply_library_threads
+
+    apply_library_threads(config)
+    pipeline = build_pipeline(load_model(args.weights, args.backend, args.output_mode), output_mode=args.output_mode)
+    presenter = FramePresenter(640, 480)
+
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source),
+                                             realtime=args.realtime, loop=True)
+    grabber = FrameGrabber(source, cores=config.capture_cores)
+    grabber.start()
+    inference = AsyncInference(pipeline, grabber, depth=args.depth, cores=config.inference_cores)
+    inference.start()
+
+    intervals = []
+    processed = 0
+    last_time = None
+    start_time = None
+    try:
+        while processed < args.frames + args.warmup:
+            result = inference.next_result(timeout=1.0)
+            if result is None:
+                if inference.finished():
+                    break
+                continue
+            presented = presenter.present(pipeline.annotate(result.frame, result.gesture))
+            if presented is not None:
+                presenter.release(presented[0])
+            inference.release()
+
+            now = time.perf_counter()
+            processed += 1
+            if processed == args.warmup:
+                start_time = now
+            elif processed > args.warmup:
+                intervals.append(now - last_time)
+            last_time = now
+    finally:
+        inference.stop()
+        grabber.stop()
+        source.release()
+
+    intervals = np.asarray(intervals) * 1000
+    elapsed = last_time - start_time if start_time is not None and intervals.size else 0.0
+    results.put({
+        'fps': round(intervals.size / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(float(np.percentile(intervals, 50)), 2) if intervals.size else None,
+        'p99_ms': round(float(np.percentile(intervals, 99)), 2) if intervals.size else None,
+        'dropped_frames': grabber.stats()['dropped_frames'],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--output-mode', default='masks')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=2, help='frames in flight in the inference worker')
+    parser.add_argument('--intra', default='0,1,2,4', help='intra-op thread counts, 0 = library default')
+    parser.add_argument('--inter', default='0,1', help='inter-op thread counts, 0 = library default')
+    parser.add_argument('--opencv', default='-1,0,1', help='OpenCV thread counts, -1 = library default (write --opencv=-1,0)')
+    parser.add_argument('--pinning', default='none,split')
+    parser.add_argument('--realtime', action='store_true', help='pace offline sources like a camera')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    capture_cores, inference_cores = split_cores()
+    context = mp.get_context('spawn')
+    rows = []
+    for intra, inter, opencv, pinning in itertools.product([int(n) for n in args.intra.split(',')],
+                                                           [int(n) for n in args.inter.split(',')],
+                                                           [int(n) for n in args.opencv.split(',')],
+                                                           args.pinning.split(',')):
+        config = ThreadConfig(intra, inter, opencv,
+                              capture_cores if pinning == 'split' else (),
+                              inference_cores if pinning == 'split' else ())
+        results = context.Queue()
+        process = context.Process(target=run_config, args=(config, args, results))
+        process.start()
+        result = None
+        while result is None and process.is_alive():
+            try:
+                result = results.get(timeout=0.5)
+            except queue.Empty:
+                pass
+        process.join()
+        if result is None:
+            try:
+                result = results.get(timeout=1.0)
+            except queue.Empty:
+                pass
+        if result is None:
+            print(f"Error while running {config}")
+            continue
+
+        rows.append(dict(intra=intra or 'default', inter=inter or 'default',
+                         opencv=opencv if opencv >= 0 else 'default', pinning=pinning,
+                         capture_cores=format_cores(config.capture_cores),
+                         inference_cores=format_cores(config.inference_cores), **result))
+        print(f"{config}: {rows[-1]['fps']} fps, p99 {rows[-1]['p99_ms']} ms")
+
+    rows.sort(key=lambda row: (-row['fps'], row['p99_ms'] or 0))
+    print_table(rows, ['intra', 'inter', 'opencv', 'pinning', 'capture_cores', 'inference_cores', 'fps', 'p50_ms', 'p99_ms',
+                       'dropped_frames'])
+    if args.save:
+        save_json(args.save, {'source': args.source, 'configs': rows})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Finds the smallest hand model input size that keeps the centroid within an error budget.
+
+    python -m tools.tune_inference_size --source recordings/station1.mp4
+    python -m tools.tune_inference_size --source clip.mp4 --sizes 256,320,416,512,640 --max-error 5 --dry-run
+
+The clip is replayed once per input size (multiples of 32). The largest size is the reference.
+For every other size the report gives the latency and the centroid error against the reference
+(p95, in pixels), plus the share of frames where only one of the two runs found a hand. The smallest
+size that, like every size above it, stays within --max-error and --max-miss is written to
+setup.txt as inference_size, and thread_1 uses it from the next Start. The backend and output
+mode are taken from setup.txt, so the latency is the one the station will see.
+"""
+import argparse
+
+import numpy as np
+
+from gestures import frame_sources
+from gestures.gesture_pipeline import GesturePipeline
+from gestures.inference_backends import load_model
+from gestures.roi_inference import STRIDE
+from tools.bench_utils import DEFAULT_WEIGHTS, print_table, save_json, summarize
+from tools.setup_file import SETUP_FILE, read_setup, write_setup_value
+
+
+def replay(pipeline: GesturePipeline, frames: list, warmup: int) -> tuple:
+    for frame in frames[:warmup]:
+        pipeline.process(frame)
+
+    centroids, times = [], []
+    for frame in frames:
+        gesture = pipeline.process(frame)
+        centroids.append(gesture.hand_position if gesture.detected else None)
+        times.append(gesture.inference_time + gesture.postprocess_time)
+    return centroids, times
+
+
+def compare(reference: list, centroids: list) -> dict:
+    errors = [np.hypot(c[0] - r[0], c[1] - r[1]) for c, r in zip(centroids, reference) if c is not None and r is not None]
+    misses = sum((c is None) != (r is None) for c, r in zip(centroids, reference))
+    return {
+        'p95_error_px': round(float(np.percentile(errors, 95)), 2) if errors else None,
+        'mean_error_px': round(float(np.mean(errors)), 2) if errors else None,
+        'miss_rate': round(misses / max(1, len(reference)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--sizes', default='192,256,320,384,448,512,576,640')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--max-error', type=float, default=5.0, help='p95 centroid error budget in pixels')
+    parser.add_argument('--max-miss', type=float, default=0.02, help='allowed share of frames with a missed/extra hand')
+    parser.add_argument('--setup', default=SETUP_FILE)
+    parser.add_argument('--dry-run', action='store_true', help='report only, do not write setup.txt')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    sizes = sorted({max(STRIDE, int(size) // STRIDE * STRIDE) for size in args.sizes.split(',')}, reverse=True)
+    settings = read_setup(args.setup)
+    backend = settings.get('inference_backend', 'pytorch')
+    output_mode = settings.get('output_mode', 'masks')
+    model = load_model(args.weights, backend, output_mode)
+
+    # Frames are kept in memory so decoding does not count and every size sees the same images
+    source = frame_sources.open_frame_source(frame_sources.parse_capture_device(args.source), realtime=False)
+    frames = []
+    while len(frames) < args.frames:
+        read, frame = source.read()
+        if not read:
+            break
+        frames.append(frame)
+    source.release()
+
+    rows, reference, chosen = [], None, None
+    for size in sizes:
+        centroids, times = replay(GesturePipeline(model, imgsz=size), frames, args.warmup)
+        latency = summarize(times)
+        row = dict(size=size, mean_ms=latency['mean_ms'], p95_ms=latency['p95_ms'], fps=latency['fps'])
+        if reference is None:
+            reference = centroids
+            row.update(p95_error_px=0.0, mean_error_px=0.0, miss_rate=0.0)
+        else:
+            row.update(compare(reference, centroids))
+
+        error = row['p95_error_px']
+        row['within_budget'] = error is not None and error <= args.max_error and row['miss_rate'] <= args.max_miss
+        rows.append(row)
+
+    # Sizes are tried from the largest down, the choice stops at the first one over budget
+    for row in rows:
+        if not row['within_budget']:
+            break
+        chosen = row['size']
+
+    print(f"{len(frames)} frames, backend {backend}, output mode {output_mode}")
+    print_table(rows[::-1], ['size', 'mean_ms', 'p95_ms', 'fps', 'p95_error_px', 'mean_error_px', 'miss_rate',
+                             'within_budget'])
+    if args.save:
+        save_json(args.save, {'source': args.source, 'backend': backend, 'output_mode': output_mode,
+                              'max_error': args.max_error, 'max_miss': args.max_miss, 'sizes': rows,
+                              'chosen': chosen})
+
+    print(f"Smallest size within budget: {chosen}")
+    if chosen is not None and not args.dry_run:
+        write_setup_value('inference_size', chosen, args.setup)
+        print(f"Saved inference_size={chosen} to {args.setup}")
+
+
+if __name__ == '__main__':
+    main()